@@ -5,10 +5,14 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
+import json
 import os
 from flask import Flask
-from database import init_database, add_sample_data, clear_database
+from database import init_database, add_sample_data, clear_database, init_app
 from routes import register_blueprints
+from commands import register_commands
+from services.library_service import configure_search_cache, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+from services.fee_policy import configure_fee_schedule, DEFAULT_FEE_SCHEDULE
 
 
 def create_app():
@@ -20,6 +24,23 @@ def create_app():
     """
     app = Flask(__name__)
     app.secret_key = "super secret key"
+    app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", "production")
+
+    app.config["SEARCH_CACHE_SIZE"] = int(os.environ.get("SEARCH_CACHE_SIZE", SEARCH_CACHE_SIZE))
+    app.config["SEARCH_CACHE_TTL"] = float(os.environ.get("SEARCH_CACHE_TTL", SEARCH_CACHE_TTL))
+
+    # Late-fee schedule: JSON file shaped like DEFAULT_FEE_SCHEDULE
+    fee_schedule_file = os.environ.get("FEE_SCHEDULE_FILE")
+    if fee_schedule_file:
+        with open(fee_schedule_file, encoding="utf-8") as f:
+            app.config["FEE_SCHEDULE"] = json.load(f)
+    else:
+        app.config["FEE_SCHEDULE"] = DEFAULT_FEE_SCHEDULE
+
+    # Reuse one SQLite connection per worker thread across requests
+    init_app(app)
+    configure_search_cache(app.config["SEARCH_CACHE_SIZE"], app.config["SEARCH_CACHE_TTL"])
+    configure_fee_schedule(app.config["FEE_SCHEDULE"])
     
     if os.environ.get("RESET_DB") == "1":
         clear_database()
@@ -32,6 +53,9 @@ def create_app():
     
     # Register all route blueprints
     register_blueprints(app)
+
+    # Register CLI commands (flask import-books ...)
+    register_commands(app)
     
     return app
 
@@ -0,0 +1,132 @@
+"""
+In-process caching utilities for the Library Management System
+Bounded, thread-safe LRU cache used in front of hot database lookups
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+# Returned by LRUCache.get() when the key is not cached (None is a valid cached value)
+MISSING = object()
+
+class LRUCache:
+    """
+    Least-recently-used cache holding at most `capacity` entries, each
+    optionally expiring `ttl` seconds after it was stored.
+
+    Fill pattern that is safe against concurrent writers:
+
+        token = cache.token()
+        value = cache.get(key)
+        if value is MISSING:
+            value = load(key)
+            cache.put(key, value, token)
+
+    put() drops the value if invalidate()/clear() ran after token() was taken,
+    so a read that raced with a write can never re-cache the old row.
+    """
+
+    def __init__(self, capacity: int, ttl: Optional[float] = None):
+        if capacity < 0:
+            raise ValueError('capacity must be >= 0')
+        self.capacity = capacity
+        self.ttl = ttl
+        # key -> (value, monotonic expiry time or None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def token(self) -> int:
+        """Write counter to pass to put(); changes on every invalidation."""
+        return self._writes
+
+    def get(self, key: Hashable, default=MISSING):
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            if expires is not None and time.monotonic() >= expires:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def _store(self, key: Hashable, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def put(self, key: Hashable, value, token: int = None):
+        with self._lock:
+            if self.capacity == 0 or (token is not None and token != self._writes):
+                return
+            self._store(key, value)
+
+    def update(self, key: Hashable, value, token: int):
+        """
+        Write-through after a committed write: store the new value unless
+        another invalidation ran since token(), in which case drop the key.
+        Either way, fills started before this call are discarded.
+        """
+        with self._lock:
+            stale = token != self._writes
+            self._writes += 1
+            if stale or self.capacity == 0:
+                self._entries.pop(key, None)
+                return
+            self._store(key, value)
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            self._writes += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def resize(self, capacity: int, ttl: Optional[float] = None):
+        """Change the capacity (and ttl, if given); shrinking evicts least-recently-used entries."""
+        if capacity < 0:
+            raise ValueError('capacity must be >= 0')
+        with self._lock:
+            self.capacity = capacity
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss/eviction/expiration counters, hit rate and the current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'size': len(self._entries),
+                'capacity': self.capacity,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = self._evictions = self._expirations = 0
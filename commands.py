@@ -0,0 +1,55 @@
+"""
+Flask CLI commands for the Library Management System.
+
+Run with ``flask --app app <command>``.
+"""
+
+from datetime import datetime
+
+import click
+
+from services.fee_service import FEE_LEDGER_BATCH_SIZE, FEE_LEDGER_TIME_BUDGET, refresh_fee_ledger
+from services.import_service import IMPORT_BATCH_SIZE, import_books, read_book_records
+
+# Rejected rows echoed to the terminal; the rest are summarized as a count
+MAX_REPORTED_REJECTIONS = 20
+
+
+@click.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, type=click.IntRange(min=1),
+              help='Rows per batched insert.')
+def import_books_command(path, batch_size):
+    """Bulk-import books from a .csv or .jsonl file."""
+    try:
+        records = read_book_records(path)
+        result = import_books(records, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    rejected = result['rejected']
+    click.echo(f"Imported {result['inserted']} book(s); rejected {len(rejected)}.")
+    for item in rejected[:MAX_REPORTED_REJECTIONS]:
+        click.echo(f"  row {item['row']} ({item['isbn']}): {item['error']}")
+    if len(rejected) > MAX_REPORTED_REJECTIONS:
+        click.echo(f"  ... and {len(rejected) - MAX_REPORTED_REJECTIONS} more.")
+
+
+@click.command('refresh-fee-ledger')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Day to compute fees for (default: today).')
+@click.option('--time-budget', default=FEE_LEDGER_TIME_BUDGET, show_default=True, type=click.FloatRange(min=0),
+              help='Seconds to run before stopping; the next run resumes where this one stopped.')
+@click.option('--batch-size', default=FEE_LEDGER_BATCH_SIZE, show_default=True, type=click.IntRange(min=1),
+              help='Loans per committed batch.')
+def refresh_fee_ledger_command(as_of, time_budget, batch_size):
+    """Update the fee_ledger table with the late fees accrued by overdue loans."""
+    result = refresh_fee_ledger(as_of or datetime.now(), time_budget=time_budget, batch_size=batch_size)
+    state = 'complete' if result['complete'] else 'incomplete, run again to resume'
+    click.echo(f"Fee ledger as of {result['as_of']}: {result['updated']} loan(s) updated ({state}).")
+
+
+def register_commands(app):
+    """Attach the CLI commands to the Flask app."""
+    app.cli.add_command(import_books_command)
+    app.cli.add_command(refresh_fee_ledger_command)
@@ -4,23 +4,366 @@ Handles all database operations and connections
 """
 
 import os
+import re
 import sqlite3
+import threading
+import unicodedata
+import weakref
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cache import MISSING, LRUCache
+from models import Book, BorrowRecord
 
 # Database configuration
 DATABASE = 'library.db'
 
-def get_db_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
+# Named PRAGMA profiles, applied in order to every new connection
+PRAGMA_PROFILES: Dict[str, Dict[str, object]] = {
+    # SQLite defaults: rollback journal, synchronous=FULL
+    'default': {},
+    # Readers no longer block behind writers; fsync only at checkpoints
+    'production': {
+        'busy_timeout': 5000,       # ms to wait on a locked database
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,       # negative = KiB, so ~20 MB page cache
+        'mmap_size': 268435456,     # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+    },
+}
+
+# borrow_records keeps each date both as ISO text and as integer epoch
+# seconds (*_ts columns). Datetimes are naive local times and are stored as
+# if they were UTC, so they round-trip exactly to the second.
+_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = timedelta(seconds=1)
+
+def _to_epoch(dt: datetime) -> int:
+    """Seconds from 1970-01-01T00:00:00 to a naive datetime."""
+    return (dt - _EPOCH) // _ONE_SECOND
+
+def search_key(text: Optional[str]) -> Optional[str]:
+    """
+    Normalized form used for matching titles and authors: compatibility
+    caseless (NFKD + casefold), accents removed, whitespace collapsed.
+    "García  Márquez" -> "garcia marquez". Stored in books.title_key /
+    author_key, always computed in Python (see fill_search_keys).
+    """
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', unicodedata.normalize('NFKD', text).casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+# Connection pool configuration (see configure_connections)
+_pragmas: Dict[str, object] = {}
+_pooling_enabled = True
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pooled_connections: 'weakref.WeakSet[_PooledConnection]' = weakref.WeakSet()
+_generation = 0
+_stats = {'opened': 0}
+
+# Book lookup cache (see get_book_by_id / get_book_by_isbn)
+# ('id', book_id) -> tuple of BOOK_COLUMNS values, or None if no such book
+# ('isbn', isbn)  -> book id, or None if no such book
+BOOK_CACHE_SIZE = 4096
+_book_cache = LRUCache(BOOK_CACHE_SIZE)
+
+# Catalog version (migration v6): triggers bump catalog_version.version on
+# every write to books or borrow_records, from any connection or process.
+# Registered caches are dropped whenever the version moves for a reason other
+# than this process's own write-through updates (see sync_catalog_version).
+_versioned_caches: List[LRUCache] = [_book_cache]
+_reset_hooks: List[Callable[[], None]] = []
+_version_lock = threading.Lock()
+_seen_version: Optional[int] = None
+
+def _open_connection() -> sqlite3.Connection:
+    """Open a new connection to DATABASE and apply the configured PRAGMAs."""
+    conn = sqlite3.connect(DATABASE, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # This enables column access by name
+    # Used by migration v8's backfill; no trigger calls it (migration v12)
+    conn.create_function('search_key', 1, search_key, deterministic=True)
+    for name, value in _pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    with _pool_lock:
+        _stats['opened'] += 1
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = get_db_connection()
-    
+def get_db_connection():
+    """Get a new, unpooled database connection. The caller must close it."""
+    return _open_connection()
+
+class _PooledConnection:
+    """
+    A thread's pooled connection and the settings it was opened with. Only
+    that thread's _local refers to it, so it is dropped when the thread
+    ends, and its finalizer then closes the connection.
+    """
+
+    __slots__ = ('conn', 'path', 'generation', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.path = DATABASE
+        self.generation = _generation
+        weakref.finalize(self, conn.close)
+
+def _current_pooled() -> Optional[_PooledConnection]:
+    """This thread's pooled connection, unless close_all_connections() retired it."""
+    pooled = getattr(_local, 'pooled', None)
+    if pooled is not None and pooled.generation == _generation:
+        return pooled
+    return None
+
+def get_pooled_connection() -> sqlite3.Connection:
+    """
+    Get this thread's reusable connection, opening it on first use.
+    Pooled connections must not be closed by callers; use
+    release_connection() / close_all_connections() instead.
+    """
+    pooled = _current_pooled()
+    if pooled is not None:
+        if pooled.path == DATABASE:
+            return pooled.conn
+        _discard_connection(pooled)
+    pooled = _PooledConnection(_open_connection())
+    _local.pooled = pooled
+    with _pool_lock:
+        _pooled_connections.add(pooled)
+    return pooled.conn
+
+def _discard_connection(pooled: _PooledConnection):
+    with _pool_lock:
+        _pooled_connections.discard(pooled)
+    pooled.conn.close()
+
+@contextmanager
+def _connection() -> Iterator[sqlite3.Connection]:
+    """
+    Yield the connection helpers should use: the open transaction() connection,
+    the thread's pooled connection, or a short-lived one when pooling is disabled.
+    """
+    txn_conn = getattr(_local, 'txn_conn', None)
+    if txn_conn is not None:
+        yield txn_conn
+        return
+    if _pooling_enabled:
+        yield get_pooled_connection()
+        return
+    conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Run several helper calls in one BEGIN IMMEDIATE transaction.
+    Commits when the block exits normally and rolls back on any exception.
+    Only use non-committing helpers (get_existing_isbns, insert_books_many, ...)
+    inside; helpers like insert_book commit on their own.
+    """
+    with _connection() as conn:
+        start_version = _begin_write(conn)
+        _local.txn_conn = conn
+        try:
+            yield conn
+            _commit_write(conn, start_version)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            _local.txn_conn = None
+            # Lookups made inside the block may have cached uncommitted rows
+            _clear_caches()
+
+def release_connection(exc: Optional[BaseException] = None):
+    """
+    Return this thread's pooled connection to a clean state at the end of a
+    request. The connection stays open for the next request on this thread.
+    """
+    _local.version_synced = False
+    pooled = _current_pooled()
+    if pooled is not None and pooled.conn.in_transaction:
+        pooled.conn.rollback()
+
+def close_all_connections():
+    """Close every pooled connection (all threads)."""
+    global _generation
+    with _pool_lock:
+        retired = list(_pooled_connections)
+        _pooled_connections.clear()
+        _generation += 1
+    for pooled in retired:
+        pooled.conn.close()
+    # The next connection may point at a different database file
+    _clear_caches()
+    for hook in _reset_hooks:
+        hook()
+    global _seen_version
+    with _version_lock:
+        _seen_version = None
+
+def configure_connections(pragmas: Optional[Dict[str, object]] = None, pooling: Optional[bool] = None,
+                          profile: Optional[str] = None):
+    """
+    Configure how connections are created.
+
+    Args:
+        pragmas: PRAGMA name -> value, applied to every new connection
+        pooling: reuse one connection per thread (True) or open/close per call (False)
+        profile: name from PRAGMA_PROFILES; explicit pragmas override its values
+    """
+    global _pragmas, _pooling_enabled
+    if profile is not None:
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f'Unknown PRAGMA profile: {profile!r}')
+        pragmas = {**PRAGMA_PROFILES[profile], **(pragmas or {})}
+    if pragmas is not None:
+        for name in pragmas:
+            if not re.fullmatch(r'[A-Za-z_]+', name):
+                raise ValueError(f'Invalid PRAGMA name: {name!r}')
+        _pragmas = dict(pragmas)
+    if pooling is not None:
+        _pooling_enabled = pooling
+    # Existing connections were opened with the old settings
+    close_all_connections()
+
+def register_cache(cache: LRUCache):
+    """Drop `cache` whenever the catalog changes outside this process's write-through paths."""
+    _versioned_caches.append(cache)
+
+def register_reset_hook(hook: Callable[[], None]):
+    """
+    Call `hook` whenever pooled connections are closed (e.g. DATABASE was
+    repointed or the file deleted). For in-memory structures that update
+    incrementally and must only be rebuilt when the database itself changes.
+    """
+    _reset_hooks.append(hook)
+
+def _clear_caches():
+    for cache in _versioned_caches:
+        cache.clear()
+
+def _read_catalog_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('SELECT version FROM catalog_version').fetchone()[0]
+
+def _observe_catalog_version(version: int) -> bool:
+    """Caches must reflect `version`; drop them (and return True) if it differs from the last one seen."""
+    global _seen_version
+    with _version_lock:
+        if version != _seen_version:
+            _clear_caches()
+            _seen_version = version
+            return True
+    return False
+
+def sync_catalog_version() -> int:
+    """
+    Read the catalog version and drop every registered cache if another
+    connection or process has written since this process last looked.
+    Cached lookups call this before serving; within a Flask request it runs
+    once, at the start of the request.
+    """
+    with _connection() as conn:
+        version = _read_catalog_version(conn)
+        if _observe_catalog_version(version) and not conn.in_transaction:
+            version = fill_search_keys(conn, version)
+    return version
+
+def fill_search_keys(conn: sqlite3.Connection, version: int) -> int:
+    """
+    Compute title_key / author_key for books another client wrote without
+    them (plain inserts, or title/author updates; see migration v12).
+    A lookup on an empty partial index when there are none. Returns the
+    catalog version after the fill.
+    """
+    if conn.execute('SELECT 1 FROM books WHERE title_key IS NULL OR author_key IS NULL LIMIT 1').fetchone() is None:
+        return version
+    start_version = _begin_write(conn)
+    rows = conn.execute('SELECT id, title, author FROM books WHERE title_key IS NULL OR author_key IS NULL').fetchall()
+    conn.executemany('UPDATE books SET title_key = ?, author_key = ? WHERE id = ?',
+                     ((search_key(title), search_key(author), book_id) for book_id, title, author in rows))
+    version = _read_catalog_version(conn)
+    _commit_write(conn, start_version)
+    return version
+
+def catalog_version() -> int:
+    """
+    Catalog version this process's caches currently reflect (synced the same
+    way as cached lookups). Caches of derived data, such as search results,
+    can stamp entries with it: it changes on every catalog write, including
+    this process's own.
+    """
+    _ensure_catalog_synced()
+    return _seen_version
+
+def _ensure_catalog_synced():
+    if not getattr(_local, 'version_synced', False):
+        sync_catalog_version()
+
+def _sync_catalog_version_for_request():
+    """before_request hook: check the catalog version once per request."""
+    sync_catalog_version()
+    _local.version_synced = True
+
+def _begin_write(conn: sqlite3.Connection) -> int:
+    """
+    BEGIN IMMEDIATE and return the catalog version. Holding the write lock,
+    nobody else can move the version until _commit_write().
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    version = _read_catalog_version(conn)
+    _observe_catalog_version(version)
+    return version
+
+def _commit_write(conn: sqlite3.Connection, start_version: int):
+    """Commit and record the version bumps made by this transaction's own writes."""
+    global _seen_version
+    version = _read_catalog_version(conn)
+    conn.commit()
+    with _version_lock:
+        if _seen_version == start_version:
+            _seen_version = version
+
+def configure_book_cache(capacity: int):
+    """Set how many entries the book lookup cache holds (0 disables it)."""
+    _book_cache.resize(capacity)
+
+def book_cache_stats() -> Dict[str, int]:
+    """Return book lookup cache counters: hits, misses, evictions, size, capacity."""
+    return _book_cache.stats()
+
+def connection_stats() -> Dict[str, int]:
+    """
+    Return connection counters: connections opened so far, and pooled
+    connections currently open (one per live thread that used the pool).
+    """
+    with _pool_lock:
+        return {**_stats, 'pooled': len(_pooled_connections)}
+
+def init_app(app):
+    """
+    Apply app.config['SQLITE_PROFILE'] / ['SQLITE_PRAGMAS'] / ['BOOK_CACHE_SIZE']
+    and tie pooled connections to the request lifecycle.
+    """
+    configure_connections(pragmas=app.config.get('SQLITE_PRAGMAS', {}),
+                          profile=app.config.get('SQLITE_PROFILE', 'default'))
+    configure_book_cache(app.config.get('BOOK_CACHE_SIZE', BOOK_CACHE_SIZE))
+    app.before_request(_sync_catalog_version_for_request)
+    app.teardown_appcontext(release_connection)
+
+# Schema migrations
+# Each migration runs once, in order; PRAGMA user_version records how many
+# have been applied to the database file.
+
+def _migration_base_schema(conn: sqlite3.Connection):
+    """v1: books and borrow_records tables."""
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -32,7 +375,7 @@ def init_database():
             available_copies INTEGER NOT NULL
         )
     ''')
-    
+
     # Create borrow_records table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS borrow_records (
@@ -45,234 +388,1162 @@ def init_database():
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
+
+def _migration_borrow_record_indexes(conn: sqlite3.Connection):
+    """v2: indexes for the per-patron and per-book borrow_records lookups."""
+    # Patron history / borrowed list, already in borrow_date order
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_borrow_date
+        ON borrow_records (patron_id, borrow_date)
+    ''')
+    # Loans of a given book
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_book_return
+        ON borrow_records (book_id, return_date)
+    ''')
+    # Active loans only: loan-limit counts, active record lookup, check-in
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_active
+        ON borrow_records (patron_id, book_id, borrow_date)
+        WHERE return_date IS NULL
+    ''')
+
+def _migration_books_fulltext(conn: sqlite3.Connection):
+    """v3: FTS5 index over books.title/author, kept in sync by triggers."""
+    if not _fts5_compiled(conn):
+        # Search falls back to substring matching (see fulltext_search_available)
+        return
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts
+        USING fts5(title, author, content='books', content_rowid='id')
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+        END
+    ''')
+    # Only title/author changes touch the index, not availability updates
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author)
+            VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+def _fts5_compiled(conn: sqlite3.Connection) -> bool:
+    options = {row[0] for row in conn.execute('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in options
+
+def _migration_books_title_index(conn: sqlite3.Connection):
+    """v4: (title, id) order for keyset-paginated catalog listing."""
+    # The rowid (id) is implicitly the last column of every index
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_title ON books (title)')
+
+# SQL equivalent of _to_epoch() for an ISO text date (fractional seconds dropped)
+_EPOCH_SQL = "CAST(strftime('%s', substr({0}, 1, 19)) AS INTEGER)"
+
+def _migration_borrow_record_epoch_columns(conn: sqlite3.Connection):
+    """
+    v5: integer epoch-second copies of the borrow_records dates so SQL can
+    compare and do arithmetic on them (see _to_epoch).
+    """
+    for column in ('borrow_ts', 'due_ts', 'return_ts'):
+        conn.execute(f'ALTER TABLE borrow_records ADD COLUMN {column} INTEGER')
+    conn.execute(f'''
+        UPDATE borrow_records SET
+            borrow_ts = {_EPOCH_SQL.format('borrow_date')},
+            due_ts = {_EPOCH_SQL.format('due_date')},
+            return_ts = {_EPOCH_SQL.format('return_date')}
+    ''')
+    # Helpers write the *_ts columns themselves; these triggers fill them in
+    # for writers that only set the text columns.
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS borrow_records_epoch_insert AFTER INSERT ON borrow_records
+        WHEN NEW.borrow_ts IS NULL OR NEW.due_ts IS NULL
+             OR (NEW.return_date IS NOT NULL AND NEW.return_ts IS NULL)
+        BEGIN
+            UPDATE borrow_records SET
+                borrow_ts = {_EPOCH_SQL.format('NEW.borrow_date')},
+                due_ts = {_EPOCH_SQL.format('NEW.due_date')},
+                return_ts = {_EPOCH_SQL.format('NEW.return_date')}
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS borrow_records_epoch_return AFTER UPDATE OF return_date ON borrow_records
+        WHEN NEW.return_ts IS OLD.return_ts
+        BEGIN
+            UPDATE borrow_records SET return_ts = {_EPOCH_SQL.format('NEW.return_date')}
+            WHERE id = NEW.id;
+        END
+    ''')
+
+def _migration_catalog_version(conn: sqlite3.Connection):
+    """
+    v6: single-row catalog_version table, bumped by triggers on every books
+    and borrow_records write so other processes can tell their caches are stale.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)')
+    for table in ('books', 'borrow_records'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+
+def _migration_books_author_index(conn: sqlite3.Connection):
+    """v7: (author, id) order for author-sorted search pages."""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_author ON books (author)')
+
+def _migration_books_search_keys(conn: sqlite3.Connection):
+    """
+    v8: title_key / author_key columns holding search_key(title / author),
+    and the FTS index rebuilt over them so every search mode matches
+    accent- and case-insensitively without normalizing rows per query.
+    """
+    for column in ('title_key', 'author_key'):
+        conn.execute(f'ALTER TABLE books ADD COLUMN {column} TEXT')
+    conn.execute('UPDATE books SET title_key = search_key(title), author_key = search_key(author)')
+    # Helpers write the keys themselves; these triggers fill them in for
+    # writers that only set title/author.
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_search_keys_insert AFTER INSERT ON books
+        WHEN NEW.title_key IS NULL OR NEW.author_key IS NULL
+        BEGIN
+            UPDATE books SET title_key = search_key(NEW.title), author_key = search_key(NEW.author)
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_search_keys_update AFTER UPDATE OF title, author ON books
+        WHEN NEW.title_key IS OLD.title_key AND NEW.author_key IS OLD.author_key
+        BEGIN
+            UPDATE books SET title_key = search_key(NEW.title), author_key = search_key(NEW.author)
+            WHERE id = NEW.id;
+        END
+    ''')
+
+    if not _fts5_compiled(conn):
+        return
+    for trigger in ('books_fts_insert', 'books_fts_delete', 'books_fts_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS books_fts')
+    conn.execute('''
+        CREATE VIRTUAL TABLE books_fts
+        USING fts5(title_key, author_key, content='books', content_rowid='id')
+    ''')
+    # Index search_key(title) rather than NEW.title_key: the key columns may
+    # only be filled by books_search_keys_insert, which can run after this.
+    conn.execute('''
+        CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, search_key(new.title), search_key(new.author));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, search_key(old.title), search_key(old.author));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER books_fts_update AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, search_key(old.title), search_key(old.author));
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, search_key(new.title), search_key(new.author));
+        END
+    ''')
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+def _migration_fee_ledger(conn: sqlite3.Connection):
+    """
+    v9: fee_ledger, the late fee accrued by each overdue active loan as of
+    a day, filled in by fee_service.refresh_fee_ledger. fee_ledger_state
+    holds the day being refreshed, a run number bumped whenever the refresh
+    restarts, a resume cursor and the last day completely refreshed.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger (
+            record_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            as_of_day INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            fee_cents INTEGER NOT NULL
+        )
+    ''')
+    # Covers the per-patron SUM(fee_cents)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_fee_ledger_patron ON fee_ledger (patron_id, fee_cents)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            as_of_day INTEGER,
+            run INTEGER NOT NULL DEFAULT 0,
+            cursor_ts INTEGER,
+            cursor_id INTEGER,
+            complete_day INTEGER
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO fee_ledger_state (id) VALUES (1)')
+    # Active loans in borrow order: the refresh only walks loans borrowed
+    # long enough ago to be overdue
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_active_borrow_ts
+        ON borrow_records (borrow_ts) WHERE return_date IS NULL
+    ''')
+
+    # Closed or deleted loans leave the ledger at once
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS fee_ledger_loan_returned
+        AFTER UPDATE OF return_date ON borrow_records WHEN NEW.return_date IS NOT NULL
+        BEGIN
+            DELETE FROM fee_ledger WHERE record_id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS fee_ledger_loan_deleted AFTER DELETE ON borrow_records
+        BEGIN
+            DELETE FROM fee_ledger WHERE record_id = OLD.id;
+        END
+    ''')
+    # A loan dated before the ledger's day may already be overdue: restart
+    # the refresh and stop serving totals from the ledger until it is done
+    for event, when in (('INSERT', ''), ('UPDATE OF borrow_ts', 'NEW.return_date IS NULL AND ')):
+        name = 'insert' if event == 'INSERT' else 'update'
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS fee_ledger_loan_backdated_{name} AFTER {event} ON borrow_records
+            WHEN {when}(NEW.borrow_ts IS NULL
+                  OR NEW.borrow_ts < (SELECT as_of_day FROM fee_ledger_state WHERE id = 1) * 86400)
+            BEGIN
+                UPDATE fee_ledger_state
+                SET run = run + 1, cursor_ts = NULL, cursor_id = NULL, complete_day = NULL
+                WHERE id = 1;
+            END
+        ''')
+
+def _migration_books_material_type(conn: sqlite3.Connection):
+    """v10: books.material_type, which selects the fee policy (see services/fee_policy.py)."""
+    conn.execute("ALTER TABLE books ADD COLUMN material_type TEXT NOT NULL DEFAULT 'book'")
+
+def _migration_fee_ledger_day_index(conn: sqlite3.Connection):
+    """v11: the per-patron ledger SUM only counts rows of the completed day."""
+    conn.execute('DROP INDEX IF EXISTS idx_fee_ledger_patron')
+    conn.execute('CREATE INDEX idx_fee_ledger_patron ON fee_ledger (patron_id, as_of_day, fee_cents)')
+
+def _migration_books_search_keys_python_only(conn: sqlite3.Connection):
+    """
+    v12: no trigger calls the Python-only search_key() any more, so plain
+    sqlite3 clients can write to books. A title/author change that leaves
+    the keys alone clears them instead; fill_search_keys() (run by
+    sync_catalog_version) computes missing keys in Python. The FTS index
+    covers the stored key columns, so its 'delete' entries repeat exactly
+    what was indexed.
+    """
+    for trigger in ('books_search_keys_insert', 'books_search_keys_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_search_keys_stale AFTER UPDATE OF title, author ON books
+        WHEN NEW.title_key IS OLD.title_key AND NEW.author_key IS OLD.author_key
+        BEGIN
+            UPDATE books SET title_key = NULL, author_key = NULL WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_missing_search_keys
+        ON books (id) WHERE title_key IS NULL OR author_key IS NULL
+    ''')
+
+    if not _fts5_compiled(conn):
+        return
+    for trigger in ('books_fts_insert', 'books_fts_delete', 'books_fts_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('''
+        CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, new.title_key, new.author_key);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, old.title_key, old.author_key);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER books_fts_update AFTER UPDATE OF title_key, author_key ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, old.title_key, old.author_key);
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, new.title_key, new.author_key);
+        END
+    ''')
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+def _migration_fee_ledger_due_dates(conn: sqlite3.Connection):
+    """
+    v13: fees count from each loan's stored due date (due_ts), so the
+    ledger refresh walks active loans in (due_ts, id) order. A loan that
+    is (or, after a due-date change, may be) overdue on the ledger's day
+    but behind the cursor restarts the refresh; a changed due date also
+    drops the loan's ledger row until the refresh rewrites it.
+    """
+    conn.execute('DROP INDEX IF EXISTS idx_borrow_records_active_borrow_ts')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_active_due_ts
+        ON borrow_records (due_ts) WHERE return_date IS NULL
+    ''')
+    for name in ('insert', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS fee_ledger_loan_backdated_{name}')
+    overdue = 'NEW.due_ts IS NULL OR NEW.due_ts < (SELECT as_of_day FROM fee_ledger_state WHERE id = 1) * 86400'
+    restart = '''
+        UPDATE fee_ledger_state
+        SET run = run + 1, cursor_ts = NULL, cursor_id = NULL, complete_day = NULL
+        WHERE id = 1;
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS fee_ledger_loan_overdue_insert AFTER INSERT ON borrow_records
+        WHEN {overdue}
+        BEGIN {restart} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS fee_ledger_loan_due_changed AFTER UPDATE OF due_ts ON borrow_records
+        WHEN NEW.return_date IS NULL AND NEW.due_ts IS NOT OLD.due_ts
+        BEGIN
+            DELETE FROM fee_ledger WHERE record_id = NEW.id;
+            UPDATE fee_ledger_state
+            SET run = run + 1, cursor_ts = NULL, cursor_id = NULL, complete_day = NULL
+            WHERE id = 1 AND ({overdue});
+        END
+    ''')
+    # The cursor held (borrow_ts, id) keys until now
+    conn.execute(restart)
+
+def _migration_fee_schedule_tables(conn: sqlite3.Connection):
+    """
+    v14: compiled fee schedules (services/fee_policy.py) as tables, so
+    PATRON_LATE_FEES_SQL can price loans in SQL. Rows are keyed by the
+    schedule's digest, so processes running different schedules never
+    overwrite each other's rows.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_schedule_policies (
+            schedule TEXT NOT NULL,
+            material_type TEXT NOT NULL,
+            last_day INTEGER NOT NULL,
+            tail_cents INTEGER NOT NULL,
+            PRIMARY KEY (schedule, material_type)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_schedule_fees (
+            schedule TEXT NOT NULL,
+            material_type TEXT NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            fee_cents INTEGER NOT NULL,
+            PRIMARY KEY (schedule, material_type, days_overdue)
+        ) WITHOUT ROWID
+    ''')
+
+def _migration_fee_ledger_schedule(conn: sqlite3.Connection):
+    """
+    v15: fee_ledger_state.schedule, the digest of the fee schedule that
+    priced the ledger; totals are only served under that same schedule.
+    A book changing material type may reprice any of its loans, so it
+    restarts the refresh.
+    """
+    conn.execute('ALTER TABLE fee_ledger_state ADD COLUMN schedule TEXT')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS fee_ledger_material_type_changed AFTER UPDATE OF material_type ON books
+        WHEN NEW.material_type IS NOT OLD.material_type
+        BEGIN
+            UPDATE fee_ledger_state
+            SET run = run + 1, cursor_ts = NULL, cursor_id = NULL, complete_day = NULL
+            WHERE id = 1;
+        END
+    ''')
+    # Rows already in the ledger were priced by an unknown schedule
+    conn.execute('UPDATE fee_ledger_state SET complete_day = NULL WHERE id = 1')
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_borrow_record_indexes,
+    _migration_books_fulltext,
+    _migration_books_title_index,
+    _migration_borrow_record_epoch_columns,
+    _migration_catalog_version,
+    _migration_books_author_index,
+    _migration_books_search_keys,
+    _migration_fee_ledger,
+    _migration_books_material_type,
+    _migration_fee_ledger_day_index,
+    _migration_books_search_keys_python_only,
+    _migration_fee_ledger_due_dates,
+    _migration_fee_schedule_tables,
+    _migration_fee_ledger_schedule,
+]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply any pending migrations and return the resulting schema version."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    while version < len(MIGRATIONS):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the lock
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+def init_database():
+    """Initialize the database with required tables, indexes and migrations."""
+    with _connection() as conn:
+        migrate(conn)
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
-    conn = get_db_connection()
-    book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
-    
-    if book_count == 0:
-        # Add sample books
-        sample_books = [
-            ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
-            ('To Kill a Mockingbird', 'Harper Lee', '9780061120084', 2),
-            ('1984', 'George Orwell', '9780451524935', 1)
-        ]
-        
-        for title, author, isbn, copies in sample_books:
+    with _connection() as conn:
+        book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
+
+        if book_count == 0:
+            # Add sample books
+            sample_books = [
+                ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
+                ('To Kill a Mockingbird', 'Harper Lee', '9780061120084', 2),
+                ('1984', 'George Orwell', '9780451524935', 1)
+            ]
+
+            for title, author, isbn, copies in sample_books:
+                conn.execute('''
+                    INSERT INTO books (title, author, isbn, total_copies, available_copies, title_key, author_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (title, author, isbn, copies, copies, search_key(title), search_key(author)))
+
+            # Make 1984 unavailable by adding a borrow record
+            borrow_date = datetime.now() - timedelta(days=5)
+            due_date = datetime.now() + timedelta(days=9)
             conn.execute('''
-                INSERT INTO books (title, author, isbn, total_copies, available_copies)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (title, author, isbn, copies, copies))
-        
-        # Make 1984 unavailable by adding a borrow record
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
-        
-        # Update available copies for 1984
-        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
-        
-        conn.commit()
-    
-    conn.close()
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', ('123456', 3, borrow_date.isoformat(), due_date.isoformat(),
+                  _to_epoch(borrow_date), _to_epoch(due_date)))
+
+            # Update available copies for 1984
+            conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
+
+            conn.commit()
+            _clear_caches()
 
 # Helper Functions for Database Operations
+# All helpers share the calling thread's pooled connection (see _connection).
+
+# Row factories: build record types straight from the cursor instead of
+# going through sqlite3.Row and dict(). Column order must match the fields.
+BOOK_COLUMNS = ', '.join(Book.__match_args__)
+_BOOK_COLUMNS_B = ', '.join(f'b.{column}' for column in Book.__match_args__)
+
+def _book_row(cursor: sqlite3.Cursor, row: tuple) -> Book:
+    return Book(*row)
+
+def _borrowed_book_row(cursor: sqlite3.Cursor, row: tuple) -> BorrowRecord:
+    # book_id, borrow_date, due_date, title, author, is_overdue
+    return BorrowRecord(row[0], datetime.fromisoformat(row[1]), datetime.fromisoformat(row[2]),
+                        None, None, row[3], row[4], bool(row[5]))
 
-def get_all_books() -> List[Dict]:
+def _active_record_row(cursor: sqlite3.Cursor, row: tuple) -> BorrowRecord:
+    # id, patron_id, book_id, borrow_date, due_date, return_date
+    return BorrowRecord(row[2], datetime.fromisoformat(row[3]), datetime.fromisoformat(row[4]),
+                        None, row[1])
+
+def _history_row(cursor: sqlite3.Cursor, row: tuple) -> BorrowRecord:
+    # book_id, borrow_date, due_date, return_date, title, author
+    return BorrowRecord(row[0], datetime.fromisoformat(row[1]), datetime.fromisoformat(row[2]),
+                        datetime.fromisoformat(row[3]) if row[3] else None, None, row[4], row[5])
+
+def _query(conn: sqlite3.Connection, sql: str, params=(), row_factory=None) -> sqlite3.Cursor:
+    """Execute sql on a fresh cursor that builds rows with row_factory."""
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(sql, params)
+
+# Hot borrow_records queries. tests/test_query_plans.py checks that each one
+# stays index-backed, so keep them in sync with the v2 migration indexes.
+PATRON_BORROWED_BOOKS_SQL = '''
+    SELECT br.book_id, br.borrow_date, br.due_date, b.title, b.author,
+           br.due_ts < :now_ts AS is_overdue
+    FROM borrow_records br 
+    JOIN books b ON br.book_id = b.id 
+    WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+    ORDER BY br.borrow_date
+'''
+
+PATRON_BORROW_COUNT_SQL = '''
+    SELECT COUNT(*) as count FROM borrow_records 
+    WHERE patron_id = ? AND return_date IS NULL
+'''
+
+ACTIVE_BORROW_RECORD_SQL = '''
+    SELECT id, patron_id, book_id, borrow_date, due_date, return_date
+    FROM borrow_records
+    WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+    ORDER BY borrow_date DESC
+    LIMIT 1
+'''
+
+PATRON_BORROW_HISTORY_SQL = '''
+    SELECT br.book_id, br.borrow_date, br.due_date, br.return_date,
+           b.title, b.author
+    FROM borrow_records br
+    JOIN books b ON br.book_id = b.id
+    WHERE br.patron_id = ?
+    ORDER BY br.borrow_date DESC
+'''
+
+# Late fees owed on a patron's active loans, summed in one aggregate row.
+# Each loan's days overdue (from its stored due date, as whole calendar days
+# since 1970-01-01) are priced by joining the fee schedule's compiled tables
+# (fee_schedule_policies / fee_schedule_fees rows of :schedule); material
+# types the schedule lacks use :default_type. Past a table's last day the
+# fee grows by tail_cents per day.
+PATRON_LATE_FEES_SQL = '''
+    SELECT COUNT(*) AS active_loans,
+           COALESCE(SUM(l.days_overdue > 0), 0) AS overdue_loans,
+           COALESCE(SUM(f.fee_cents + (l.days_overdue - f.days_overdue) * l.tail_cents), 0) AS fee_cents
+    FROM (
+        SELECT COALESCE(p.material_type, d.material_type) AS material_type,
+               COALESCE(p.last_day, d.last_day) AS last_day,
+               COALESCE(p.tail_cents, d.tail_cents) AS tail_cents,
+               MAX(:as_of_day - br.due_ts / 86400, 0) AS days_overdue
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+        JOIN fee_schedule_policies d ON d.schedule = :schedule AND d.material_type = :default_type
+        LEFT JOIN fee_schedule_policies p ON p.schedule = :schedule AND p.material_type = b.material_type
+        WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+    ) l
+    JOIN fee_schedule_fees f
+      ON f.schedule = :schedule AND f.material_type = l.material_type
+     AND f.days_overdue = MIN(l.days_overdue, l.last_day)
+'''
+
+# Rows fetched per fetchmany() call by the iter_* generators
+STREAM_BATCH_SIZE = 500
+
+# Max values bound into one IN (...) query, well under SQLITE_MAX_VARIABLE_NUMBER
+IN_LIST_CHUNK = 500
+
+def _iter_rows(sql: str, params, batch_size: int, row_factory) -> Iterator:
+    """Yield query rows lazily, holding at most batch_size of them in memory."""
+    with _connection() as conn:
+        cursor = _query(conn, sql, params, row_factory)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+def iter_all_books(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Book]:
+    """Stream all books ordered by title (see get_all_books)."""
+    return _iter_rows(f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title', (), batch_size, _book_row)
+
+def get_all_books() -> List[Book]:
     """Get all books from the database."""
-    conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
-    conn.close()
-    return [dict(book) for book in books]
-
-def get_book_by_id(book_id: int) -> Optional[Dict]:
-    """Get a specific book by ID."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
-    conn.close()
-    return dict(book) if book else None
-
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
-    conn.close()
-    return dict(book) if book else None
-
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+    return list(iter_all_books())
+
+def iter_book_search_keys_after(book_id: int, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[tuple]:
+    """Stream (id, title, author, title_key, author_key) for books with id > book_id, in id order."""
+    return _iter_rows('SELECT id, title, author, title_key, author_key FROM books WHERE id > ? ORDER BY id',
+                      (book_id,), batch_size, None)
+
+def get_books_by_ids(book_ids: List[int]) -> List[Book]:
+    """Return the books with the given ids, in the order given; unknown ids are skipped."""
+    found = {}
+    with _connection() as conn:
+        for start in range(0, len(book_ids), IN_LIST_CHUNK):
+            chunk = book_ids[start:start + IN_LIST_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            for book in _query(conn, f'SELECT {BOOK_COLUMNS} FROM books WHERE id IN ({placeholders})',
+                               chunk, _book_row):
+                found[book.id] = book
+    return [found[book_id] for book_id in book_ids if book_id in found]
+
+def get_books_page(limit: int, after: Optional[Tuple[str, int]] = None) -> Tuple[List[Book], Optional[Tuple[str, int]]]:
+    """
+    Get one page of the catalog in (title, id) order using keyset pagination.
+
+    Args:
+        limit: maximum number of books on the page
+        after: (title, id) of the last book on the previous page, None for the first page
+
+    Returns:
+        tuple: (books, (title, id) key for the next page or None on the last page)
+    """
+    with _connection() as conn:
+        if after is None:
+            rows = _query(conn, f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title, id LIMIT ?',
+                          (limit + 1,), _book_row).fetchall()
+        else:
+            rows = _query(conn, f'''
+                SELECT {BOOK_COLUMNS} FROM books WHERE (title, id) > (?, ?)
+                ORDER BY title, id LIMIT ?
+            ''', (after[0], after[1], limit + 1), _book_row).fetchall()
+    books = rows[:limit]
+    next_key = (books[-1].title, books[-1].id) if len(rows) > limit else None
+    return books, next_key
+
+def get_book_by_id(book_id: int) -> Optional[Book]:
+    """Get a specific book by ID. Served from the book cache when possible."""
+    _ensure_catalog_synced()
+    key = ('id', book_id)
+    token = _book_cache.token()
+    values = _book_cache.get(key)
+    if values is MISSING:
+        with _connection() as conn:
+            row = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books WHERE id = ?', (book_id,)).fetchone()
+        values = tuple(row) if row else None
+        _book_cache.put(key, values, token)
+    # Each caller gets its own record; the cache only holds immutable tuples
+    return Book(*values) if values else None
+
+def _cache_book_write(book_id: int, values: Optional[tuple], token: int):
+    """Write-through for a book row this thread just committed (token taken before the write)."""
+    if values is None:
+        _book_cache.invalidate(('id', book_id))
+    else:
+        _book_cache.update(('id', book_id), tuple(values), token)
+
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
+    """Get a specific book by ISBN. Served from the book cache when possible."""
+    _ensure_catalog_synced()
+    key = ('isbn', isbn)
+    token = _book_cache.token()
+    book_id = _book_cache.get(key)
+    if book_id is not MISSING:
+        return get_book_by_id(book_id) if book_id is not None else None
+
+    with _connection() as conn:
+        row = conn.execute(f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    if not row:
+        _book_cache.put(key, None, token)
+        return None
+    values = tuple(row)
+    _book_cache.put(key, values[0], token)
+    _book_cache.put(('id', values[0]), values, token)
+    return Book(*values)
+
+def fulltext_search_available() -> bool:
+    """True if the books_fts index exists (SQLite was built with FTS5)."""
+    with _connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+        ).fetchone()
+    return row is not None
+
+def _fts_match_expression(query: str, field: str) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression requiring every word of the normalized
+    query as a prefix in the field's key column,
+    e.g. 'Harry Pot' -> title_key : "harry"* AND title_key : "pot"*
+    """
+    words = re.findall(r'\w+', search_key(query))
+    if not words:
+        return None
+    return ' AND '.join(f'{field}_key : "{word}"*' for word in words)
+
+def _like_key_pattern(query: str) -> str:
+    """LIKE pattern matching search_key(query) anywhere in a key column."""
+    escaped = search_key(query).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def search_books_fulltext(query: str, field: str, limit: int) -> List[Book]:
+    """
+    Search books_fts by title or author with prefix matching.
+    Results are ordered by BM25 relevance, best match first.
+    """
+    if field not in ('title', 'author'):
+        raise ValueError(f'Unsupported search field: {field!r}')
+    match = _fts_match_expression(query, field)
+    if match is None:
+        return []
+    with _connection() as conn:
+        return _query(conn, f'''
+            SELECT {_BOOK_COLUMNS_B} FROM books_fts
+            JOIN books b ON b.id = books_fts.rowid
+            WHERE books_fts MATCH ?
+            ORDER BY books_fts.rank
+            LIMIT ?
+        ''', (match, limit), _book_row).fetchall()
+
+def search_books_substring(query: str, field: str, limit: int) -> List[Book]:
+    """
+    Search by title or author as a substring of the normalized key column,
+    ordered by title (the fallback when SQLite lacks FTS5).
+    """
+    if field not in ('title', 'author'):
+        raise ValueError(f'Unsupported search field: {field!r}')
+    with _connection() as conn:
+        return _query(conn, f'''
+            SELECT {BOOK_COLUMNS} FROM books
+            WHERE {field}_key LIKE ? ESCAPE '\\'
+            ORDER BY title, id
+            LIMIT ?
+        ''', (_like_key_pattern(query), limit), _book_row).fetchall()
+
+# search_books_page sort orders: keyset columns and their (shared) direction
+SEARCH_SORTS = {
+    'title': (('title', 'id'), 'ASC'),
+    'author': (('author', 'id'), 'ASC'),
+    'newest': (('id',), 'DESC'),
+}
+
+def search_books_page(title: Optional[str] = None, author: Optional[str] = None,
+                      available_only: bool = False, sort: str = 'title', limit: int = 50,
+                      after: Optional[Tuple] = None) -> Tuple[List[Book], Optional[Tuple]]:
+    """
+    One page of books matching every given criterion, in a single query.
+
+    Args:
+        title, author: word-prefix match via books_fts (substring LIKE without FTS5),
+            both on the search_key() columns
+        available_only: only books with available_copies > 0
+        sort: key of SEARCH_SORTS
+        limit: maximum number of books on the page
+        after: sort key of the last book on the previous page (keyset pagination)
+
+    Returns:
+        tuple: (books, sort key for the next page or None on the last page)
+    """
+    columns, direction = SEARCH_SORTS[sort]
+    clauses, params = [], []
+
+    use_fts = (title or author) and fulltext_search_available()
+    if use_fts:
+        parts = [_fts_match_expression(value, field)
+                 for field, value in (('title', title), ('author', author)) if value]
+        if None in parts:
+            return [], None
+        clauses.append('b.id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)')
+        params.append(' AND '.join(parts))
+    else:
+        for field, value in (('title', title), ('author', author)):
+            if value:
+                clauses.append(f"b.{field}_key LIKE ? ESCAPE '\\'")
+                params.append(_like_key_pattern(value))
+    if available_only:
+        clauses.append('b.available_copies > 0')
+    if after is not None:
+        operator = '>' if direction == 'ASC' else '<'
+        key_columns = ', '.join(f'b.{column}' for column in columns)
+        clauses.append(f'({key_columns}) {operator} ({", ".join("?" * len(columns))})')
+        params.extend(after)
+
+    where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+    order = ', '.join(f'b.{column} {direction}' for column in columns)
+    with _connection() as conn:
+        rows = _query(conn, f'SELECT {_BOOK_COLUMNS_B} FROM books b {where} ORDER BY {order} LIMIT ?',
+                      (*params, limit + 1), _book_row).fetchall()
+    books = rows[:limit]
+    next_key = tuple(getattr(books[-1], column) for column in columns) if len(rows) > limit else None
+    return books, next_key
+
+def iter_patron_borrowed_books(patron_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[BorrowRecord]:
+    """Stream currently borrowed books for a patron (see get_patron_borrowed_books)."""
+    params = {'patron_id': patron_id, 'now_ts': _to_epoch(datetime.now())}
+    return _iter_rows(PATRON_BORROWED_BOOKS_SQL, params, batch_size, _borrowed_book_row)
+
+def get_patron_borrowed_books(patron_id: str) -> List[BorrowRecord]:
     """Get currently borrowed books for a patron."""
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
-        JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ? AND br.return_date IS NULL
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
-    conn.close()
-    
-    borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
-    
-    return borrowed_books
+    return list(iter_patron_borrowed_books(patron_id))
 
 def get_patron_borrow_count(patron_id: str) -> int:
     """Get the number of books currently borrowed by a patron."""
-    conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
-    conn.close()
+    with _connection() as conn:
+        count = conn.execute(PATRON_BORROW_COUNT_SQL, (patron_id,)).fetchone()['count']
     return count
 
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            INSERT INTO books (title, author, isbn, total_copies, available_copies)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (title, author, isbn, total_copies, available_copies))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
+    with _connection() as conn:
+        try:
+            start_version = _begin_write(conn)
+            cursor = conn.execute('''
+                INSERT INTO books (title, author, isbn, total_copies, available_copies, title_key, author_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (title, author, isbn, total_copies, available_copies, search_key(title), search_key(author)))
+            _commit_write(conn, start_version)
+            # Drop cached "no such book" answers for the new ISBN and id
+            _book_cache.invalidate(('isbn', isbn), ('id', cursor.lastrowid))
+            return True
+        except Exception as e:
+            conn.rollback()
+            return False
+
+def get_books_by_isbns(isbns: List[str]) -> Dict[str, Book]:
+    """Map each catalogued isbn among isbns to its book, one IN query per chunk."""
+    found = {}
+    with _connection() as conn:
+        for start in range(0, len(isbns), IN_LIST_CHUNK):
+            chunk = isbns[start:start + IN_LIST_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            for book in _query(conn, f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn IN ({placeholders})',
+                               chunk, _book_row):
+                found[book.isbn] = book
+    return found
+
+def get_existing_isbns(isbns: List[str]) -> set:
+    """Return the subset of isbns already in the catalog, one IN query per chunk."""
+    existing = set()
+    with _connection() as conn:
+        for start in range(0, len(isbns), IN_LIST_CHUNK):
+            chunk = isbns[start:start + IN_LIST_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(f'SELECT isbn FROM books WHERE isbn IN ({placeholders})', chunk)
+            existing.update(row[0] for row in rows)
+    return existing
+
+def insert_books_many(books: List[Tuple[str, str, str, int, int]]):
+    """
+    Insert (title, author, isbn, total_copies, available_copies) rows with
+    executemany. Does not commit; call inside transaction(), which also
+    resets the book cache.
+    """
+    with _connection() as conn:
+        conn.executemany('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies, title_key, author_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((*book, search_key(book[0]), search_key(book[1])) for book in books))
 
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
+    with _connection() as conn:
+        try:
+            conn.execute('''
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat(),
+                  _to_epoch(borrow_date), _to_epoch(due_date)))
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            return False
 
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            UPDATE books SET available_copies = available_copies + ? WHERE id = ?
-        ''', (change, book_id))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
+    with _connection() as conn:
+        try:
+            start_version = _begin_write(conn)
+            token = _book_cache.token()
+            row = conn.execute(f'''
+                UPDATE books SET available_copies = available_copies + ? WHERE id = ?
+                RETURNING {BOOK_COLUMNS}
+            ''', (change, book_id)).fetchone()
+            _commit_write(conn, start_version)
+            _cache_book_write(book_id, row, token)
+            return True
+        except Exception as e:
+            conn.rollback()
+            return False
 
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            UPDATE borrow_records 
-            SET return_date = ? 
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
+    with _connection() as conn:
+        try:
+            conn.execute('''
+                UPDATE borrow_records 
+                SET return_date = ?, return_ts = ? 
+                WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+            ''', (return_date.isoformat(), _to_epoch(return_date), patron_id, book_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            return False
+
+def checkout_book(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime,
+                  max_borrowed: int = 5) -> str:
+    """
+    Atomically borrow a book: take a copy, enforce the patron's loan limit and
+    insert the borrow record in a single BEGIN IMMEDIATE transaction.
+
+    Returns one of: 'ok', 'not_found', 'unavailable', 'limit_reached', 'error'.
+    """
+    with _connection() as conn:
+        try:
+            start_version = _begin_write(conn)
+            token = _book_cache.token()
+            taken = conn.execute(f'''
+                UPDATE books SET available_copies = available_copies - 1
+                WHERE id = ? AND available_copies > 0
+                RETURNING {BOOK_COLUMNS}
+            ''', (book_id,)).fetchone()
+            if not taken:
+                exists = conn.execute('SELECT 1 FROM books WHERE id = ?', (book_id,)).fetchone()
+                conn.rollback()
+                return 'unavailable' if exists else 'not_found'
+
+            count = conn.execute(PATRON_BORROW_COUNT_SQL, (patron_id,)).fetchone()['count']
+            if count >= max_borrowed:
+                conn.rollback()
+                return 'limit_reached'
 
-def get_active_borrow_record(patron_id: str, book_id: int):
+            conn.execute('''
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat(),
+                  _to_epoch(borrow_date), _to_epoch(due_date)))
+            _commit_write(conn, start_version)
+            _cache_book_write(book_id, taken, token)
+            return 'ok'
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            return 'error'
+
+def checkin_book(patron_id: str, book_id: int, return_date: datetime) -> Tuple[str, Optional[datetime]]:
+    """
+    Atomically return a book: close the patron's active borrow record and give
+    the copy back in a single BEGIN IMMEDIATE transaction.
+
+    Returns (status, due_date of the closed loan); status is one of
+    'ok', 'no_active_borrow', 'error'.
+    """
+    with _connection() as conn:
+        try:
+            start_version = _begin_write(conn)
+            token = _book_cache.token()
+            row = conn.execute(ACTIVE_BORROW_RECORD_SQL, (patron_id, book_id)).fetchone()
+            if not row:
+                conn.rollback()
+                return 'no_active_borrow', None
+
+            conn.execute('UPDATE borrow_records SET return_date = ?, return_ts = ? WHERE id = ?',
+                         (return_date.isoformat(), _to_epoch(return_date), row['id']))
+            book = conn.execute(f'''
+                UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+                RETURNING {BOOK_COLUMNS}
+            ''', (book_id,)).fetchone()
+            _commit_write(conn, start_version)
+            _cache_book_write(book_id, book, token)
+            return 'ok', datetime.fromisoformat(row['due_date'])
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            return 'error', None
+
+def get_active_borrow_record(patron_id: str, book_id: int) -> Optional[BorrowRecord]:
     """
     Return the active borrow record for (patron_id, book_id) or None.
     Active means return_date IS NULL.
-    Shape:
-      {
-        'patron_id': str,
-        'book_id': int,
-        'borrow_date': datetime,
-        'due_date': datetime,
-        'return_date': None
-      }
-    """
-    conn = get_db_connection()
-    row = conn.execute(
-        '''
-        SELECT patron_id, book_id, borrow_date, due_date, return_date
-        FROM borrow_records
-        WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ORDER BY borrow_date DESC
-        LIMIT 1
-        ''',
-        (patron_id, book_id)
-    ).fetchone()
-    conn.close()
+    Fields set: patron_id, book_id, borrow_date, due_date (return_date is None)
+    """
+    with _connection() as conn:
+        return _query(conn, ACTIVE_BORROW_RECORD_SQL, (patron_id, book_id),
+                      _active_record_row).fetchone()
 
-    if not row:
-        return None
+def get_active_loans_for_pairs(pairs: List[Tuple[str, int]]) -> Dict[Tuple[str, int], Tuple[str, str, Optional[int]]]:
+    """
+    Map each (patron_id, book_id) whose book exists to (title, material_type,
+    due_ts of its latest active loan or None). One joined query per chunk
+    of pairs, answered from the active-loan partial index.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    found, latest = {}, {}
+    with _connection() as conn:
+        for start in range(0, len(pairs), IN_LIST_CHUNK):
+            chunk = pairs[start:start + IN_LIST_CHUNK]
+            rows = conn.execute(f'''
+                WITH pairs (patron_id, book_id) AS (VALUES {', '.join(['(?, ?)'] * len(chunk))})
+                SELECT p.patron_id, p.book_id, b.title, b.material_type, br.borrow_ts, br.due_ts
+                FROM pairs p
+                JOIN books b ON b.id = p.book_id
+                LEFT JOIN borrow_records br
+                  ON br.patron_id = p.patron_id AND br.book_id = p.book_id AND br.return_date IS NULL
+            ''', [value for pair in chunk for value in pair])
+            for patron_id, book_id, title, material_type, borrow_ts, due_ts in rows:
+                key = (patron_id, book_id)
+                if key not in found or (borrow_ts or 0) > latest[key]:
+                    found[key] = (title, material_type, due_ts)
+                    latest[key] = borrow_ts or 0
+    return found
+
+def get_patron_late_fees(patron_id: str, as_of_day: int, schedule: str,
+                         default_type: str) -> Tuple[int, int, float]:
+    """
+    Return (active loans, overdue loans, total late fee) for a patron as of
+    a day, priced with the stored fee schedule `schedule` (see store_fee_schedule).
+    """
+    params = {'patron_id': patron_id, 'as_of_day': as_of_day, 'schedule': schedule, 'default_type': default_type}
+    with _connection() as conn:
+        active, overdue, fee_cents = conn.execute(PATRON_LATE_FEES_SQL, params).fetchone()
+    return active, overdue, fee_cents / 100
+
+def store_fee_schedule(schedule: str, policies: List[Tuple[str, int, int]], fees: Iterable[Tuple[str, int, int]]):
+    """
+    Write a compiled fee schedule's (material_type, last_day, tail_cents)
+    and (material_type, days_overdue, fee_cents) rows under the name
+    `schedule`. Idempotent: a schedule already stored is left as it is.
+    """
+    with _connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT OR IGNORE INTO fee_schedule_policies VALUES (?, ?, ?, ?)',
+                             ((schedule, *row) for row in policies))
+            conn.executemany('INSERT OR IGNORE INTO fee_schedule_fees VALUES (?, ?, ?, ?)',
+                             ((schedule, *row) for row in fees))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def get_fee_ledger_state() -> Tuple[Optional[int], int, Optional[Tuple[int, int]], Optional[int], Optional[str]]:
+    """
+    Return (day being refreshed, run number, resume cursor (due_ts, id)
+    or None, last completely refreshed day, digest of the pricing fee schedule).
+    """
+    with _connection() as conn:
+        as_of_day, run, cursor_ts, cursor_id, complete_day, schedule = conn.execute(
+            'SELECT as_of_day, run, cursor_ts, cursor_id, complete_day, schedule FROM fee_ledger_state WHERE id = 1'
+        ).fetchone()
+    cursor = (cursor_ts, cursor_id) if cursor_id is not None else None
+    return as_of_day, run, cursor, complete_day, schedule
+
+def start_fee_ledger_refresh(as_of_day: int, schedule: str) -> int:
+    """
+    Begin refreshing the ledger for as_of_day under the fee schedule with
+    digest `schedule`, from the first loan; returns the new run number. The
+    ledger stops serving totals until the run completes, since its rows are
+    about to move to another day or schedule.
+    """
+    with _connection() as conn:
+        run = conn.execute('''
+            UPDATE fee_ledger_state
+            SET as_of_day = ?, schedule = ?, run = run + 1, cursor_ts = NULL, cursor_id = NULL, complete_day = NULL
+            WHERE id = 1 RETURNING run
+        ''', (as_of_day, schedule)).fetchone()[0]
+        conn.commit()
+    return run
 
-    return {
-        'patron_id': row['patron_id'],
-        'book_id': row['book_id'],
-        'borrow_date': datetime.fromisoformat(row['borrow_date']),
-        'due_date': datetime.fromisoformat(row['due_date']),
-        'return_date': None
-    }
+def get_loans_due_before(due_ts: int, after: Optional[Tuple[int, int]],
+                         limit: int) -> List[Tuple[int, int, str]]:
+    """
+    Up to limit active loans due before due_ts, as (due_ts, id,
+    material_type) tuples in (due_ts, id) order, starting after the `after` key.
+    """
+    clauses, params = ['br.return_date IS NULL', 'br.due_ts < ?'], [due_ts]
+    if after is not None:
+        clauses.append('(br.due_ts, br.id) > (?, ?)')
+        params.extend(after)
+    with _connection() as conn:
+        return _query(conn, f'''
+            SELECT br.due_ts, br.id, b.material_type FROM borrow_records br
+            JOIN books b ON b.id = br.book_id
+            WHERE {' AND '.join(clauses)}
+            ORDER BY br.due_ts, br.id
+            LIMIT ?
+        ''', (*params, limit)).fetchall()
 
-def get_patron_borrow_history(patron_id: str) -> List[Dict]:
+def write_fee_ledger_batch(as_of_day: int, run: int, rows: List[Tuple[int, int, int]],
+                           cursor: Optional[Tuple[int, int]], complete: bool) -> bool:
+    """
+    Upsert (record_id, days_overdue, fee_cents) ledger rows
+    for as_of_day and advance the refresh cursor, in one commit. Returns False
+    (writing nothing) if the refresh was restarted since `run` began.
+    """
+    with _connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            state = conn.execute('SELECT as_of_day, run FROM fee_ledger_state WHERE id = 1').fetchone()
+            if tuple(state) != (as_of_day, run):
+                conn.rollback()
+                return False
+            # Skip loans returned since they were read (the ledger only holds active loans)
+            conn.executemany('''
+                INSERT INTO fee_ledger (record_id, patron_id, book_id, as_of_day, days_overdue, fee_cents)
+                SELECT id, patron_id, book_id, ?, ?, ? FROM borrow_records
+                WHERE id = ? AND return_date IS NULL
+                ON CONFLICT (record_id) DO UPDATE SET
+                    as_of_day = excluded.as_of_day,
+                    days_overdue = excluded.days_overdue,
+                    fee_cents = excluded.fee_cents
+            ''', ((as_of_day, days, cents, record_id) for record_id, days, cents in rows))
+            conn.execute('''
+                UPDATE fee_ledger_state
+                SET cursor_ts = ?, cursor_id = ?, complete_day = CASE WHEN ? THEN as_of_day ELSE complete_day END
+                WHERE id = 1
+            ''', (*(cursor or (None, None)), complete))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return True
+
+# Rows left from another day (a loan no longer overdue, or an unfinished
+# run for a different day) are never counted
+PATRON_LEDGER_FEES_SQL = '''
+    SELECT COUNT(*) AS overdue_loans, COALESCE(SUM(fee_cents), 0) AS fee_cents
+    FROM fee_ledger WHERE patron_id = ? AND as_of_day = ?
+'''
+
+def get_patron_ledger_fees(patron_id: str, as_of_day: int) -> Tuple[int, float]:
+    """Return (overdue loans, total late fee) for a patron from the fee ledger rows of as_of_day."""
+    with _connection() as conn:
+        overdue, fee_cents = conn.execute(PATRON_LEDGER_FEES_SQL, (patron_id, as_of_day)).fetchone()
+    return overdue, fee_cents / 100
+
+def iter_active_loans(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Tuple[int, str, int, int, str]]:
+    """
+    Stream (record id, patron_id, book_id, due_ts, material_type) for
+    every active loan, in id order.
+    """
+    return _iter_rows('''
+        SELECT br.id, br.patron_id, br.book_id, br.due_ts, b.material_type
+        FROM borrow_records br JOIN books b ON b.id = br.book_id
+        WHERE br.return_date IS NULL ORDER BY br.id
+    ''', (), batch_size, None)
+
+def iter_patron_borrow_history(patron_id: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[BorrowRecord]:
+    """Stream a patron's borrow history, newest first (see get_patron_borrow_history)."""
+    return _iter_rows(PATRON_BORROW_HISTORY_SQL, (patron_id,), batch_size, _history_row)
+
+def get_patron_borrow_history(patron_id: str) -> List[BorrowRecord]:
     """
     Return full borrow history for a patron (past + active), newest first.
-    Each item: {book_id, title, author, borrow_date, due_date, return_date}
+    Each item sets: book_id, title, author, borrow_date, due_date, return_date
     """
-    conn = get_db_connection()
-    rows = conn.execute(
-        '''
-        SELECT br.book_id, br.borrow_date, br.due_date, br.return_date,
-               b.title, b.author
-        FROM borrow_records br
-        JOIN books b ON br.book_id = b.id
-        WHERE br.patron_id = ?
-        ORDER BY br.borrow_date DESC
-        ''',
-        (patron_id,)
-    ).fetchall()
-    conn.close()
-
-    history = []
-    for r in rows:
-        history.append({
-            'book_id': r['book_id'],
-            'title': r['title'],
-            'author': r['author'],
-            'borrow_date': datetime.fromisoformat(r['borrow_date']),
-            'due_date': datetime.fromisoformat(r['due_date']),
-            'return_date': datetime.fromisoformat(r['return_date']) if r['return_date'] else None,
-        })
-    return history
+    return list(iter_patron_borrow_history(patron_id))
 
 
 def clear_database():
     import os
     db_path = os.path.join(os.getcwd(), "library.db")
     print("Clearing database")
-    if os.path.exists(db_path):
-        os.remove(db_path)
\ No newline at end of file
+    # Pooled connections would otherwise keep the deleted file open
+    close_all_connections()
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,79 @@
+"""
+Record types for rows returned by the database module.
+
+Books and borrow records are compact __slots__ dataclasses instead of
+per-row dicts. They keep a read-only dict view (record['title'],
+record.get('title'), dict(record)) so templates, jsonify and existing
+callers work unchanged.
+
+Records are treated as read-only once built. They are not frozen=True
+because frozen dataclasses are about 4x slower to construct per row.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+class _Record:
+    """Read-only mapping view over a dataclass record's fields."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key in self.__match_args__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.__match_args__:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in self.__match_args__
+
+    def __iter__(self):
+        return iter(self.__match_args__)
+
+    def __len__(self):
+        return len(self.__match_args__)
+
+    def keys(self):
+        return self.__match_args__
+
+    def values(self):
+        return [getattr(self, key) for key in self.__match_args__]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__match_args__]
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__match_args__}
+
+
+@dataclass(slots=True)
+class Book(_Record):
+    """A row of the books table."""
+    id: int
+    title: str
+    author: str
+    isbn: str
+    total_copies: int
+    available_copies: int
+    material_type: str = 'book'
+
+
+@dataclass(slots=True)
+class BorrowRecord(_Record):
+    """
+    A borrow_records row, optionally joined with its book's title/author.
+    Fields a query does not select are None.
+    """
+    book_id: int
+    borrow_date: datetime
+    due_date: datetime
+    return_date: Optional[datetime] = None
+    patron_id: Optional[str] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+    is_overdue: Optional[bool] = None
@@ -2,11 +2,66 @@
 API Routes - JSON API endpoints
 """
 
+from datetime import datetime
+
 from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from services.library_service import (
+    calculate_late_fee_for_book, search_books_in_catalog, get_catalog_page,
+    add_books_to_catalog, search_catalog, search_books_in_catalog_batch,
+    SEARCH_RESULT_LIMIT, CATALOG_PAGE_SIZE, MAX_BULK_BOOKS, MAX_BATCH_SEARCH_QUERIES
+)
+from services.fee_service import (
+    get_overdue_report, get_late_fees_for_loans,
+    OVERDUE_REPORT_LIMIT, MAX_OVERDUE_REPORT_LIMIT, MAX_LATE_FEE_PAIRS
+)
+from services.search_service import suggest, SUGGEST_LIMIT, MAX_SUGGEST_LIMIT
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+@api_bp.route('/books')
+def list_books_api():
+    """
+    List catalog books one page at a time, ordered by title.
+    Pass the returned next_cursor as ?cursor= to fetch the following page.
+    """
+    cursor = request.args.get('cursor', '').strip() or None
+    per_page = request.args.get('per_page', CATALOG_PAGE_SIZE, type=int)
+    
+    try:
+        books, next_cursor = get_catalog_page(cursor, per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'books': books,
+        'count': len(books),
+        'per_page': per_page,
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/books/bulk', methods=['POST'])
+def add_books_bulk_api():
+    """
+    Add an array of books in one request and one transaction.
+    Each item is validated like R1; the response carries one result per item.
+    """
+    books = request.get_json(silent=True)
+    
+    if not isinstance(books, list) or not books:
+        return jsonify({'error': 'Request body must be a non-empty JSON array of books'}), 400
+    
+    if len(books) > MAX_BULK_BOOKS:
+        return jsonify({'error': f'At most {MAX_BULK_BOOKS} books per request'}), 400
+    
+    results = add_books_to_catalog(books)
+    added = sum(1 for result in results if result['success'])
+    
+    return jsonify({
+        'results': results,
+        'added': added,
+        'rejected': len(results) - added
+    })
+
 @api_bp.route('/late_fee/<patron_id>/<int:book_id>')
 def get_late_fee(patron_id, book_id):
     """
@@ -16,20 +71,80 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/late_fees', methods=['POST'])
+def get_late_fees_bulk():
+    """
+    Late fees for an array of {patron_id, book_id} loans in one request.
+    Results are keyed by "<patron_id>/<book_id>"; each carries the status
+    /api/late_fee/<patron_id>/<book_id> would return.
+    """
+    loans = request.get_json(silent=True)
+    
+    if not isinstance(loans, list) or not loans:
+        return jsonify({'error': 'Request body must be a non-empty JSON array of loans'}), 400
+    
+    if len(loans) > MAX_LATE_FEE_PAIRS:
+        return jsonify({'error': f'At most {MAX_LATE_FEE_PAIRS} loans per request'}), 400
+    
+    pairs = []
+    for loan in loans:
+        patron_id = loan.get('patron_id') if isinstance(loan, dict) else None
+        book_id = loan.get('book_id') if isinstance(loan, dict) else None
+        if not isinstance(patron_id, str) or not isinstance(book_id, int) or isinstance(book_id, bool):
+            return jsonify({'error': 'Each loan must be a JSON object with string patron_id and integer book_id'}), 400
+        if not -2**63 <= book_id < 2**63:
+            return jsonify({'error': f'book_id {book_id} is out of range'}), 400
+        pairs.append((patron_id, book_id))
+    
+    as_of = datetime.now()
+    results = get_late_fees_for_loans(pairs, as_of)
+    
+    return jsonify({
+        'as_of': as_of.strftime('%Y-%m-%d'),
+        'results': results,
+        'count': len(results)
+    })
+
+@api_bp.route('/reports/overdue')
+def overdue_report_api():
+    """
+    Library-wide overdue report: totals over every active loan plus the
+    `limit` most overdue loans with their late fees.
+    """
+    limit = request.args.get('limit', OVERDUE_REPORT_LIMIT, type=int)
+    
+    if limit <= 0 or limit > MAX_OVERDUE_REPORT_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_OVERDUE_REPORT_LIMIT}'}), 400
+    
+    return jsonify(get_overdue_report(limit=limit))
+
 @api_bp.route('/search')
 def search_books_api():
     """
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
+    
+    Single search: ?q=...&type=title|author|isbn|fuzzy
+    Combined search: any of ?title=&author=&available_only=1, with sort=title|author|newest,
+    paged with limit and the returned next_cursor (?cursor=)
     """
+    if any(name in request.args for name in ('title', 'author', 'available_only')):
+        if 'q' in request.args:
+            return jsonify({'error': 'Use either q or title/author/available_only, not both'}), 400
+        return _combined_search()
+    
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    limit = request.args.get('limit', SEARCH_RESULT_LIMIT, type=int)
     
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
     
+    if limit <= 0 or limit > SEARCH_RESULT_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {SEARCH_RESULT_LIMIT}'}), 400
+    
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    books = search_books_in_catalog(search_term, search_type, limit)
     
     return jsonify({
         'search_term': search_term,
@@ -37,3 +152,79 @@ def search_books_api():
         'results': books,
         'count': len(books)
     })
+
+def _combined_search():
+    """Combined title AND author / availability search for search_books_api."""
+    title = request.args.get('title', '').strip()
+    author = request.args.get('author', '').strip()
+    available_only = request.args.get('available_only', '').lower() in ('1', 'true', 'yes')
+    sort = request.args.get('sort', 'title')
+    cursor = request.args.get('cursor', '').strip() or None
+    limit = request.args.get('limit', SEARCH_RESULT_LIMIT, type=int)
+    
+    if not title and not author and not available_only:
+        return jsonify({'error': 'Give at least one of title, author or available_only'}), 400
+    
+    try:
+        books, next_cursor = search_catalog(title, author, available_only, sort, cursor, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'title': title,
+        'author': author,
+        'available_only': available_only,
+        'sort': sort,
+        'results': books,
+        'count': len(books),
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/search/batch', methods=['POST'])
+def search_books_batch_api():
+    """
+    Run an array of {q, type} searches in one request.
+    Results come back one entry per query, in order, tagged with its index, q and type.
+    """
+    queries = request.get_json(silent=True)
+    limit = request.args.get('limit', SEARCH_RESULT_LIMIT, type=int)
+    
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'Request body must be a non-empty JSON array of queries'}), 400
+    
+    if len(queries) > MAX_BATCH_SEARCH_QUERIES:
+        return jsonify({'error': f'At most {MAX_BATCH_SEARCH_QUERIES} queries per request'}), 400
+    
+    if limit <= 0 or limit > SEARCH_RESULT_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {SEARCH_RESULT_LIMIT}'}), 400
+    
+    results = search_books_in_catalog_batch(queries, limit)
+    
+    return jsonify({
+        'results': results,
+        'count': len(results)
+    })
+
+@api_bp.route('/suggest')
+def suggest_api():
+    """
+    Title/author autocomplete for the search box.
+    Returns up to `limit` distinct titles or authors starting with q.
+    """
+    prefix = request.args.get('q', '')
+    suggest_type = request.args.get('type', 'title')
+    limit = request.args.get('limit', SUGGEST_LIMIT, type=int)
+    
+    if limit <= 0 or limit > MAX_SUGGEST_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SUGGEST_LIMIT}'}), 400
+    
+    try:
+        suggestions = suggest(prefix, suggest_type, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'q': prefix,
+        'type': suggest_type,
+        'suggestions': suggestions
+    })
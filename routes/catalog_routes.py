@@ -3,8 +3,7 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from services.library_service import add_book_to_catalog
+from services.library_service import add_book_to_catalog, get_catalog_page, CATALOG_PAGE_SIZE
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -16,11 +15,21 @@ def index():
 @catalog_bp.route('/catalog')
 def catalog():
     """
-    Display all books in the catalog.
+    Display the books in the catalog, one page at a time.
     Implements R2: Book Catalog Display
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    cursor = request.args.get('cursor', '').strip() or None
+    per_page = request.args.get('per_page', CATALOG_PAGE_SIZE, type=int)
+    
+    try:
+        books, next_cursor = get_catalog_page(cursor, per_page)
+    except ValueError as e:
+        flash(str(e), 'error')
+        books, next_cursor = get_catalog_page(None, CATALOG_PAGE_SIZE)
+        cursor, per_page = None, CATALOG_PAGE_SIZE
+    
+    return render_template('catalog.html', books=books, next_cursor=next_cursor,
+                           cursor=cursor, per_page=per_page)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
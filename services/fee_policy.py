@@ -0,0 +1,150 @@
+"""
+Fee Policy Module - Declarative late-fee schedule
+Per-material-type loan periods, grace days, daily-rate tiers and caps,
+compiled once into days-overdue -> fee lookup tables
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Material type used for books without one and for types the schedule lacks
+DEFAULT_MATERIAL_TYPE = 'book'
+
+# R5: due 14 days after borrowing, $0.50/day for the first 7 days overdue,
+# $1.00/day after that, at most $15.00 per loan
+DEFAULT_FEE_SCHEDULE = {
+    'book': {
+        'loan_days': 14,
+        'grace_days': 0,
+        'tiers': [
+            {'days': 7, 'cents_per_day': 50},
+            {'days': None, 'cents_per_day': 100},
+        ],
+        'max_cents': 1500,
+    },
+}
+
+class FeePolicy:
+    """
+    One material type's rules compiled to a table: fee_cents(d) for d days
+    overdue is table[d], or for d past the table, its last entry plus
+    tail_cents per extra day (0 once the cap is reached).
+
+    loan_days sets the due date of new loans; days overdue always count
+    from a loan's stored due date. Overdue days 1..grace_days are free;
+    tiers start counting after them.
+    """
+
+    __slots__ = ('loan_days', 'grace_days', 'table', 'tail_cents', '_fees')
+
+    def __init__(self, loan_days: int, grace_days: int = 0, tiers: List[Dict] = (),
+                 max_cents: Optional[int] = None):
+        for name, value in (('loan_days', loan_days), ('grace_days', grace_days)):
+            if not isinstance(value, int) or value < 0:
+                raise ValueError(f'{name} must be a non-negative integer')
+        if max_cents is not None and (not isinstance(max_cents, int) or max_cents < 0):
+            raise ValueError('max_cents must be a non-negative integer or null')
+        self.loan_days = loan_days
+        self.grace_days = grace_days
+        self._fees, self.tail_cents = self._compile(grace_days, tiers, max_cents)
+        self.table = np.array(self._fees, dtype=np.int64)
+
+    @staticmethod
+    def _compile(grace_days: int, tiers: List[Dict], max_cents: Optional[int]) -> Tuple[List[int], int]:
+        fees = [0] * (grace_days + 1)
+        fee = 0
+        for i, tier in enumerate(tiers):
+            days, rate = tier.get('days'), tier.get('cents_per_day')
+            if not isinstance(rate, int) or rate < 0:
+                raise ValueError('cents_per_day must be a non-negative integer')
+            if days is None and i != len(tiers) - 1:
+                raise ValueError('Only the last tier may be open-ended (days: null)')
+            if days is not None and (not isinstance(days, int) or days <= 0):
+                raise ValueError('Tier days must be a positive integer or null')
+            if days is None and (max_cents is None or rate == 0):
+                return fees, rate
+            # An open-ended tier under a cap runs until the cap is reached
+            for _ in range(days if days is not None else max_cents // rate + 1):
+                fee += rate
+                if max_cents is not None and fee >= max_cents:
+                    fees.append(max_cents)
+                    return fees, 0
+                fees.append(fee)
+        return fees, 0
+
+    def fee_cents(self, days_overdue: int) -> int:
+        """Fee in cents for a loan days_overdue days late: one table lookup."""
+        last = len(self._fees) - 1
+        if days_overdue <= last:
+            return self._fees[days_overdue]
+        return self._fees[last] + (days_overdue - last) * self.tail_cents
+
+    def padded(self, width: int) -> np.ndarray:
+        """The table extended to width entries along its tail."""
+        extra = np.arange(1, width - len(self.table) + 1, dtype=np.int64) * self.tail_cents
+        return np.concatenate([self.table, self.table[-1] + extra])
+
+class FeeSchedule:
+    """
+    Every material type's FeePolicy. For batch work the policies get small
+    integer codes and their tables are stacked into one 2-D array, so fees
+    for many loans of mixed types are a single fancy-indexing lookup.
+    """
+
+    def __init__(self, spec: Dict[str, Dict]):
+        if DEFAULT_MATERIAL_TYPE not in spec:
+            raise ValueError(f'Fee schedule must define {DEFAULT_MATERIAL_TYPE!r}')
+        # Names this schedule's rows in the database fee tables (see fee_table_rows)
+        self.digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+        self.policies: Dict[str, FeePolicy] = {}
+        for material_type, rules in spec.items():
+            try:
+                self.policies[material_type] = FeePolicy(**rules)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'Fee schedule {material_type!r}: {e}') from e
+        self.material_types = list(self.policies)
+        self._codes = {material_type: code for code, material_type in enumerate(self.material_types)}
+        policies = list(self.policies.values())
+        width = max(len(policy.table) for policy in policies)
+        self.tables = np.stack([policy.padded(width) for policy in policies])
+        self.tail_cents = np.array([policy.tail_cents for policy in policies], dtype=np.int64)
+
+    def fee_table_rows(self) -> Tuple[List[Tuple[str, int, int]], Iterator[Tuple[str, int, int]]]:
+        """
+        The compiled tables as rows for SQL: (material_type, last table day,
+        tail_cents) per policy and (material_type, days_overdue, fee_cents)
+        per table entry.
+        """
+        policies = [(material_type, len(policy.table) - 1, policy.tail_cents)
+                    for material_type, policy in self.policies.items()]
+        fees = ((material_type, days, int(cents))
+                for material_type, policy in self.policies.items() for days, cents in enumerate(policy.table))
+        return policies, fees
+
+    def policy(self, material_type: Optional[str] = None) -> FeePolicy:
+        return self.policies.get(material_type) or self.policies[DEFAULT_MATERIAL_TYPE]
+
+    def code(self, material_type: Optional[str]) -> int:
+        """Batch code of a material type; unknown types use the default policy."""
+        code = self._codes.get(material_type)
+        return code if code is not None else self._codes[DEFAULT_MATERIAL_TYPE]
+
+    def fee_cents(self, codes: np.ndarray, due_days: np.ndarray, as_of_day: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (fee in cents, days overdue) arrays for loans with the given policy codes and due days."""
+        days_overdue = np.maximum(as_of_day - due_days, 0)
+        index = np.minimum(days_overdue, self.tables.shape[1] - 1)
+        cents = self.tables[codes, index] + (days_overdue - index) * self.tail_cents[codes]
+        return cents, days_overdue
+
+_schedule = FeeSchedule(DEFAULT_FEE_SCHEDULE)
+
+def configure_fee_schedule(spec: Dict[str, Dict] = DEFAULT_FEE_SCHEDULE):
+    """Compile and install a fee schedule; raises ValueError if it is invalid."""
+    global _schedule
+    _schedule = FeeSchedule(spec)
+
+def get_fee_schedule() -> FeeSchedule:
+    return _schedule
@@ -0,0 +1,242 @@
+"""
+Fee Service Module - Batch late-fee computation
+Computes late fees (see services/fee_policy.py) for many loans at once with
+NumPy, for library-wide reports where looping _compute_late_fee over every
+loan is too slow, and keeps the fee_ledger table of accrued fees up to date
+"""
+
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import (
+    get_books_by_ids, iter_active_loans, get_fee_ledger_state, start_fee_ledger_refresh,
+    get_loans_due_before, write_fee_ledger_batch, get_patron_ledger_fees, get_patron_late_fees,
+    get_active_loans_for_pairs, store_fee_schedule, register_reset_hook
+)
+from services.fee_policy import DEFAULT_MATERIAL_TYPE, FeeSchedule, get_fee_schedule
+
+# Overdue report: default and maximum number of loans listed
+OVERDUE_REPORT_LIMIT = 100
+MAX_OVERDUE_REPORT_LIMIT = 1000
+
+# Largest list of (patron, book) pairs accepted by POST /api/late_fees
+MAX_LATE_FEE_PAIRS = 1000
+
+# Fee ledger refresh: loans per committed batch, and seconds one run may take
+# before it stops and leaves the rest for the next run
+FEE_LEDGER_BATCH_SIZE = 5000
+FEE_LEDGER_TIME_BUDGET = 30.0
+
+# One row per active loan; due_day is the stored due date as days since
+# 1970-01-01 and policy is the FeeSchedule code of the book's material type
+LOAN_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('patron_id', 'U6'),
+    ('book_id', np.int64),
+    ('due_day', np.int64),
+    ('policy', np.int16),
+])
+
+# Fee schedule whose tables were last written to the database (see
+# _stored_fee_schedule); forgotten whenever the connections are reset
+_stored_schedule: Optional[FeeSchedule] = None
+
+def _forget_stored_schedule():
+    global _stored_schedule
+    _stored_schedule = None
+
+register_reset_hook(_forget_stored_schedule)
+
+_EPOCH_DATE = date(1970, 1, 1)
+_SECONDS_PER_DAY = 86400
+
+def epoch_day(dt: datetime) -> int:
+    """Calendar day of dt as days since 1970-01-01."""
+    return (dt.date() - _EPOCH_DATE).days
+
+def load_active_loans() -> np.ndarray:
+    """Every active loan as a LOAN_DTYPE array, in record id order."""
+    code = get_fee_schedule().code
+    rows = ((record_id, patron_id, book_id, due_ts // _SECONDS_PER_DAY, code(material_type))
+            for record_id, patron_id, book_id, due_ts, material_type in iter_active_loans())
+    return np.fromiter(rows, dtype=LOAN_DTYPE)
+
+def get_overdue_report(as_of: Optional[datetime] = None, limit: int = OVERDUE_REPORT_LIMIT) -> Dict:
+    """
+    Library-wide overdue report over every active loan.
+
+    Args:
+        as_of: when fees are computed (default: now)
+        limit: number of loans listed, most days overdue first
+
+    Returns:
+        dict: as_of, active_loans, overdue_loans, total_late_fees and
+        loans ({'patron_id', 'book_id', 'title', 'due_date', 'days_overdue', 'fee_amount'})
+    """
+    as_of = as_of or datetime.now()
+    loans = load_active_loans()
+    schedule = get_fee_schedule()
+    cents, days_overdue = schedule.fee_cents(loans['policy'], loans['due_day'], epoch_day(as_of))
+
+    overdue = np.flatnonzero(days_overdue)
+    if len(overdue) > limit:
+        overdue = overdue[np.argpartition(-days_overdue[overdue], limit - 1)[:limit]]
+    # Most overdue first, oldest record first among equals
+    listed = overdue[np.lexsort((loans['id'][overdue], -days_overdue[overdue]))]
+
+    book_ids = [int(book_id) for book_id in np.unique(loans['book_id'][listed])]
+    titles = {book.id: book.title for book in get_books_by_ids(book_ids)}
+    rows = []
+    for i in listed:
+        due_day = int(loans['due_day'][i])
+        rows.append({
+            'patron_id': str(loans['patron_id'][i]),
+            'book_id': int(loans['book_id'][i]),
+            'title': titles.get(int(loans['book_id'][i])),
+            'due_date': date.fromordinal(_EPOCH_DATE.toordinal() + due_day).strftime('%Y-%m-%d'),
+            'days_overdue': int(days_overdue[i]),
+            'fee_amount': int(cents[i]) / 100,
+        })
+
+    return {
+        'as_of': as_of.strftime('%Y-%m-%d'),
+        'active_loans': len(loans),
+        'overdue_loans': int(np.count_nonzero(days_overdue)),
+        'total_late_fees': int(cents.sum()) / 100,
+        'loans': rows,
+    }
+
+def get_late_fees_for_loans(pairs: List[Tuple[str, int]], as_of: Optional[datetime] = None) -> Dict[str, Dict]:
+    """
+    R5 late fees for many (patron_id, book_id) loans at once: one joined
+    query resolves every active record with its book, and one batch lookup
+    prices them. Each pair gets the status calculate_late_fee_for_book
+    would give it.
+
+    Returns:
+        dict: '<patron_id>/<book_id>' -> {'patron_id', 'book_id', 'title',
+        'fee_amount', 'days_overdue', 'status'}
+    """
+    as_of = as_of or datetime.now()
+    results = {}
+    lookup = []
+    for patron_id, book_id in pairs:
+        result = {'patron_id': patron_id, 'book_id': book_id, 'title': None,
+                  'fee_amount': 0.00, 'days_overdue': 0, 'status': 'ok'}
+        results[f'{patron_id}/{book_id}'] = result
+        if not patron_id.isdigit() or len(patron_id) != 6:
+            result['status'] = 'Invalid patron ID'
+        else:
+            lookup.append((patron_id, book_id))
+
+    found = get_active_loans_for_pairs(lookup)
+    active = []
+    for patron_id, book_id in lookup:
+        result = results[f'{patron_id}/{book_id}']
+        if (patron_id, book_id) not in found:
+            result['status'] = 'Book not found'
+            continue
+        result['title'], material_type, due_ts = found[(patron_id, book_id)]
+        if due_ts is None:
+            result['status'] = 'No active borrow found'
+        else:
+            active.append((result, material_type, due_ts))
+
+    if active:
+        schedule = get_fee_schedule()
+        policies = np.array([schedule.code(material_type) for _, material_type, _ in active], dtype=np.int16)
+        due_days = np.array([due_ts for _, _, due_ts in active], dtype=np.int64) // _SECONDS_PER_DAY
+        cents, days_overdue = schedule.fee_cents(policies, due_days, epoch_day(as_of))
+        for (result, _, _), fee, days in zip(active, cents.tolist(), days_overdue.tolist()):
+            result['fee_amount'] = fee / 100
+            result['days_overdue'] = days
+    return results
+
+def refresh_fee_ledger(as_of: Optional[datetime] = None, time_budget: float = FEE_LEDGER_TIME_BUDGET,
+                       batch_size: int = FEE_LEDGER_BATCH_SIZE) -> Dict:
+    """
+    Bring fee_ledger up to date for the day of as_of (default: today).
+
+    Only loans due before that day are visited, the only ones whose day
+    count changed, in (due_ts, id) order, and priced with the current fee
+    schedule. Each batch commits together with the resume cursor. The run
+    stops after the batch that crosses time_budget seconds, and the next
+    run picks up from the cursor. A run for a new day or a different fee
+    schedule, a loan already overdue on the ledger's day that the cursor
+    may have passed, or a book changing material type restarts from the
+    beginning.
+
+    Returns:
+        dict: {'as_of', 'updated': ledger rows written, 'complete': bool}
+    """
+    as_of = as_of or datetime.now()
+    as_of_day = epoch_day(as_of)
+    deadline = time.monotonic() + time_budget
+    schedule = get_fee_schedule()
+    overdue_before_ts = as_of_day * _SECONDS_PER_DAY
+    updated = 0
+
+    state_day, run, cursor, complete_day, state_schedule = get_fee_ledger_state()
+    current = state_day == as_of_day and state_schedule == schedule.digest
+    if current and complete_day == as_of_day:
+        return {'as_of': as_of.strftime('%Y-%m-%d'), 'updated': 0, 'complete': True}
+    if not current:
+        run, cursor = start_fee_ledger_refresh(as_of_day, schedule.digest), None
+
+    while True:
+        loans = get_loans_due_before(overdue_before_ts, cursor, batch_size)
+        complete = len(loans) < batch_size
+        rows = []
+        if loans:
+            due_ts, record_ids, material_types = zip(*loans)
+            policies = np.array([schedule.code(material_type) for material_type in material_types], dtype=np.int16)
+            cents, days_overdue = schedule.fee_cents(
+                policies, np.array(due_ts, dtype=np.int64) // _SECONDS_PER_DAY, as_of_day)
+            rows = [row for row in zip(record_ids, days_overdue.tolist(), cents.tolist()) if row[1]]
+            cursor = loans[-1][:2]
+        if write_fee_ledger_batch(as_of_day, run, rows, cursor, complete):
+            updated += len(rows)
+        else:
+            # An overdue loan behind the cursor reset the refresh (start
+            # over), or a run for another day or fee schedule took over (stop)
+            state_day, run, cursor, _, state_schedule = get_fee_ledger_state()
+            complete = False
+            if state_day != as_of_day or state_schedule != schedule.digest:
+                break
+        if complete or time.monotonic() >= deadline:
+            break
+
+    return {'as_of': as_of.strftime('%Y-%m-%d'), 'updated': updated, 'complete': complete}
+
+def _stored_fee_schedule() -> FeeSchedule:
+    """The current fee schedule, its compiled tables written to the database once."""
+    global _stored_schedule
+    schedule = get_fee_schedule()
+    if _stored_schedule is not schedule:
+        store_fee_schedule(schedule.digest, *schedule.fee_table_rows())
+        _stored_schedule = schedule
+    return schedule
+
+def patron_late_fees(patron_id: str, as_of: datetime) -> Tuple[int, int, float]:
+    """
+    Return (active loans, overdue loans, total late fee) for a patron, summed
+    in one SQL aggregate over the fee schedule's compiled tables.
+    """
+    schedule = _stored_fee_schedule()
+    return get_patron_late_fees(patron_id, epoch_day(as_of), schedule.digest, DEFAULT_MATERIAL_TYPE)
+
+def patron_late_fee_total(patron_id: str, as_of: Optional[datetime] = None) -> float:
+    """
+    Late fees owed on a patron's active loans. One indexed fee_ledger lookup
+    when the ledger is complete for as_of's day under the current fee
+    schedule, else priced from the loans.
+    """
+    as_of = as_of or datetime.now()
+    as_of_day = epoch_day(as_of)
+    _, _, _, complete_day, schedule = get_fee_ledger_state()
+    if complete_day == as_of_day and schedule == get_fee_schedule().digest:
+        return get_patron_ledger_fees(patron_id, as_of_day)[1]
+    return patron_late_fees(patron_id, as_of)[2]
@@ -0,0 +1,104 @@
+"""
+Import Service Module - Bulk Catalog Import
+Streams CSV / JSONL vendor feeds into the catalog in large batches
+"""
+
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from database import get_existing_isbns, insert_books_many, transaction
+from services.library_service import validate_book_fields
+
+# Rows per executemany() batch
+IMPORT_BATCH_SIZE = 5000
+
+DUPLICATE_ISBN_MESSAGE = "A book with this ISBN already exists."
+
+def read_book_records(path: str) -> Iterator[Optional[Dict]]:
+    """
+    Stream book records from a .csv (header: title,author,isbn,total_copies)
+    or .jsonl file (one JSON object per line). Lines that are not valid
+    JSON are yielded as None so the importer can reject them by row number.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8-sig') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    else:
+        raise ValueError("Unsupported file type; use .csv or .jsonl.")
+
+def _parse_copies(value) -> Optional[int]:
+    """total_copies arrives as text from CSV; accept integers and integer strings."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+def import_books(records: Iterable[Optional[Dict]], batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """
+    Validate and insert book records in executemany batches, all inside a
+    single transaction. Invalid rows and duplicate ISBNs (already in the
+    catalog or repeated in the feed) are rejected without stopping the load.
+
+    Args:
+        records: dicts with title, author, isbn, total_copies (e.g. from read_book_records)
+        batch_size: rows per executemany() batch
+
+    Returns:
+        dict: {'inserted': int, 'rejected': [{'row': int, 'isbn': str, 'error': str}]}
+              'row' is the 1-based position of the record in the feed
+    """
+    inserted = 0
+    rejected: List[Dict] = []
+    seen_isbns = set()
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        existing = get_existing_isbns([book[3] for book in batch])
+        rows = []
+        for row_number, title, author, isbn, copies in batch:
+            if isbn in existing:
+                rejected.append({'row': row_number, 'isbn': isbn, 'error': DUPLICATE_ISBN_MESSAGE})
+            else:
+                rows.append((title, author, isbn, copies, copies))
+        insert_books_many(rows)
+        inserted += len(rows)
+        batch.clear()
+
+    with transaction():
+        for row_number, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                rejected.append({'row': row_number, 'isbn': None, 'error': "Row is not a valid book record."})
+                continue
+
+            title, author, isbn = record.get('title'), record.get('author'), record.get('isbn')
+            isbn = isbn.strip() if isinstance(isbn, str) else isbn
+            copies = _parse_copies(record.get('total_copies'))
+            error = validate_book_fields(title, author, isbn, copies)
+            if not error and isbn in seen_isbns:
+                error = DUPLICATE_ISBN_MESSAGE
+            if error:
+                rejected.append({'row': row_number, 'isbn': isbn, 'error': error})
+                continue
+
+            seen_isbns.add(isbn)
+            batch.append((row_number, title.strip(), author.strip(), isbn, copies))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    # Catalog duplicates are only found at flush time; report in feed order
+    rejected.sort(key=lambda item: item['row'])
+    return {'inserted': inserted, 'rejected': rejected}
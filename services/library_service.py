@@ -3,14 +3,72 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
+import base64
+import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from cache import MISSING, LRUCache
 from database import (
-    get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books
+    get_book_by_id, get_book_by_isbn, insert_book, get_all_books, get_books_page,
+    checkout_book, checkin_book, fulltext_search_available, search_books_fulltext,
+    search_books_substring, search_key, get_books_by_isbns,
+    get_existing_isbns, insert_books_many, transaction, catalog_version, register_cache,
+    search_books_page, SEARCH_SORTS
 )
+from models import Book
+from services.fee_policy import get_fee_schedule
+from services.fee_service import patron_late_fee_total
 from services.payment_service import PaymentGateway
+from services.search_service import fuzzy_search_books
+
+# Maximum number of results returned by a title/author search
+SEARCH_RESULT_LIMIT = 50
+
+# Maximum number of queries accepted by one batch search
+MAX_BATCH_SEARCH_QUERIES = 100
+
+# Title/author search result cache: entries live at most SEARCH_CACHE_TTL
+# seconds and are dropped as soon as the catalog version changes
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 300.0
+_search_cache = LRUCache(SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+_search_cache_version = None
+register_cache(_search_cache)
+
+# Catalog listing page sizes
+CATALOG_PAGE_SIZE = 50
+MAX_CATALOG_PAGE_SIZE = 200
+
+# Largest array accepted by POST /api/books/bulk
+MAX_BULK_BOOKS = 5000
+
+def validate_book_fields(title: str, author: str, isbn: str, total_copies: int) -> Optional[str]:
+    """
+    Check new-book fields against the R1 rules.
+    Shared by add_book_to_catalog and the bulk import paths.
+    
+    Returns:
+        str: the error message for the first failing rule, or None if valid
+    """
+    if not isinstance(title, str) or not title.strip():
+        return "Title is required."
+    
+    if len(title.strip()) > 200:
+        return "Title must be less than 200 characters."
+    
+    if not isinstance(author, str) or not author.strip():
+        return "Author is required."
+    
+    if len(author.strip()) > 100:
+        return "Author must be less than 100 characters."
+    
+    if not isinstance(isbn, str) or len(isbn) != 13 or not isbn.isdigit(): #making sure it all all digits, can't contain letters
+        return "ISBN must be exactly 13 digits."
+    
+    if not isinstance(total_copies, int) or isinstance(total_copies, bool) or total_copies <= 0:
+        return "Total copies must be a positive integer."
+    
+    return None
 
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
@@ -27,23 +85,9 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
         tuple: (success: bool, message: str)
     """
     # Input validation
-    if not title or not title.strip():
-        return False, "Title is required."
-    
-    if len(title.strip()) > 200:
-        return False, "Title must be less than 200 characters."
-    
-    if not author or not author.strip():
-        return False, "Author is required."
-    
-    if len(author.strip()) > 100:
-        return False, "Author must be less than 100 characters."
-    
-    if len(isbn) != 13 or not isbn.isdigit(): #making sure it all all digits, can't contain letters
-        return False, "ISBN must be exactly 13 digits."
-    
-    if not isinstance(total_copies, int) or total_copies <= 0:
-        return False, "Total copies must be a positive integer."
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return False, error
     
     # Check for duplicate ISBN
     existing = get_book_by_isbn(isbn)
@@ -57,6 +101,61 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     else:
         return False, "Database error occurred while adding the book."
 
+def add_books_to_catalog(books: List[Dict]) -> List[Dict]:
+    """
+    Add many books in one transaction.
+    Applies the add_book_to_catalog (R1) rules to every payload, finds
+    existing ISBNs with batched IN queries, and inserts the valid books
+    together. Invalid items are reported without failing the others.
+    
+    Args:
+        books: list of dicts with title, author, isbn, total_copies
+        
+    Returns:
+        list: one {'index', 'isbn', 'success', 'message'} dict per input item, in order
+    """
+    results = []
+    valid = []
+    seen_isbns = set()
+    
+    for index, book in enumerate(books):
+        if not isinstance(book, dict):
+            results.append({'index': index, 'isbn': None, 'success': False, 'message': "Book must be a JSON object."})
+            continue
+        
+        title, author, isbn = book.get('title'), book.get('author'), book.get('isbn')
+        total_copies = book.get('total_copies')
+        error = validate_book_fields(title, author, isbn, total_copies)
+        if not error and isbn in seen_isbns:
+            error = "A book with this ISBN already exists."
+        result = {'index': index, 'isbn': isbn, 'success': False, 'message': error}
+        results.append(result)
+        if not error:
+            seen_isbns.add(isbn)
+            valid.append((result, title.strip(), author.strip(), isbn, total_copies))
+    
+    if not valid:
+        return results
+    
+    try:
+        with transaction():
+            existing = get_existing_isbns([isbn for _, _, _, isbn, _ in valid])
+            rows = []
+            for result, title, author, isbn, total_copies in valid:
+                if isbn in existing:
+                    result['message'] = "A book with this ISBN already exists."
+                else:
+                    rows.append((title, author, isbn, total_copies, total_copies))
+                    result['success'] = True
+                    result['message'] = f'Book "{title}" has been successfully added to the catalog.'
+            insert_books_many(rows)
+    except Exception:
+        for result, *_ in valid:
+            result['success'] = False
+            result['message'] = "Database error occurred while adding the book."
+    
+    return results
+
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -73,41 +172,35 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
-    # Check if book exists and is available
+    # Check if book exists
     book = get_book_by_id(book_id)
     if not book:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
-        return False, "This book is currently not available."
-    
-    # Check patron's current borrowed books count
-    current_borrowed = get_patron_borrow_count(patron_id)
-    
-    if current_borrowed >= 5: #Eliminating the bug where a user with 5 borrwed books can still borrow one more.
-        return False, "You have reached the maximum borrowing limit of 5 books."
-    
-    # Create borrow record
+    # Create borrow record; the loan period comes from the fee policy
     borrow_date = datetime.now()
-    due_date = borrow_date + timedelta(days=14)
+    loan_days = get_fee_schedule().policy(book.material_type).loan_days
+    due_date = borrow_date + timedelta(days=loan_days)
     
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    # Availability and the 5-book limit are enforced inside one transaction,
+    # so concurrent requests cannot both take the last copy.
+    status = checkout_book(patron_id, book_id, borrow_date, due_date, max_borrowed=5)
+    if status == 'not_found':
+        return False, "Book not found."
+    if status == 'unavailable':
+        return False, "This book is currently not available."
+    if status == 'limit_reached':
+        return False, "You have reached the maximum borrowing limit of 5 books."
+    if status != 'ok':
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron (R4).
     - verify active borrow exists
-    - set return date
-    - increment availability
+    - set return date and increment availability (one transaction)
     - calculate & display late fee
     """
     # Validate patron ID
@@ -119,28 +212,17 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not book:
         return False, "Book not found."
 
-    # Get active borrow record (return_date IS NULL)
-    try:
-        from database import get_active_borrow_record
-    except Exception:
-        return False, "Database function missing."
-
-    record = get_active_borrow_record(patron_id, book_id)
-    if not record:
-        return False, "No active borrow record found for this patron and book."
-
     now = datetime.now()
 
-    # Compute late fee using the shared helper from R5
-    fee_amount, days_overdue = _compute_late_fee(record['borrow_date'], now)
-
-    # Update DB: set return date
-    if not update_borrow_record_return_date(patron_id, book_id, now):
+    # Close the active borrow record and restore availability atomically
+    status, due_date = checkin_book(patron_id, book_id, now)
+    if status == 'no_active_borrow':
+        return False, "No active borrow record found for this patron and book."
+    if status != 'ok':
         return False, "Database error occurred while recording the return."
 
-    # Update DB: increment availability
-    if not update_book_availability(book_id, +1):
-        return False, "Database error occurred while updating book availability."
+    # Compute late fee using the shared helper from R5
+    fee_amount, days_overdue = _loan_late_fee(due_date, now, book.material_type)
 
     # Build user-facing message
     if fee_amount > 0:
@@ -173,13 +255,25 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     if not record:
         return {'fee_amount': 0.00, 'days_overdue': 0, 'status': 'No active borrow found'}
 
-    borrow_date = record.get('borrow_date')
-    if not borrow_date:
-        return {'fee_amount': 0.00, 'days_overdue': 0, 'status': 'Borrow date missing'}
+    due_date = record.get('due_date')
+    if not due_date:
+        return {'fee_amount': 0.00, 'days_overdue': 0, 'status': 'Due date missing'}
 
-    fee, days = _compute_late_fee(borrow_date, datetime.now())
+    fee, days = _loan_late_fee(due_date, datetime.now(), book.material_type)
     return {'fee_amount': fee, 'days_overdue': days, 'status': 'ok'}
 
+def _loan_late_fee(due_date: datetime, as_of: datetime, material_type: str) -> tuple[float, int]:
+    """
+    Return (fee_amount, days_overdue) for a loan due on due_date, under the
+    fee policy for material_type (see services/fee_policy.py). Days overdue
+    count from the stored due date, so they agree with is_overdue and the
+    displayed due date even after the schedule's loan period changes.
+    """
+    days_overdue = max(0, (as_of.date() - due_date.date()).days)
+    if days_overdue == 0:
+        return 0.00, 0
+    return get_fee_schedule().policy(material_type).fee_cents(days_overdue) / 100, days_overdue
+
 def _compute_late_fee(borrow_date: datetime, as_of: datetime) -> tuple[float, int]:
     """
     Return (fee_amount, days_overdue) using R5 rules.
@@ -187,6 +281,9 @@ def _compute_late_fee(borrow_date: datetime, as_of: datetime) -> tuple[float, in
     - $0.50/day for first 7 days overdue
     - $1.00/day each day after 7
     - Max $15.00
+
+    Reference implementation: the default fee schedule
+    (services/fee_policy.py) and its SQL and batch forms are tested against it.
     """
     due_date = borrow_date + timedelta(days=14)
     days_overdue = max(0, (as_of.date() - due_date.date()).days)
@@ -199,33 +296,209 @@ def _compute_late_fee(borrow_date: datetime, as_of: datetime) -> tuple[float, in
     fee = min(fee, 15.00)
     return round(fee, 2), days_overdue
 
-def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
+def _encode_cursor(key: Tuple) -> str:
+    """Encode a keyset pagination key as an opaque URL-safe token."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(token: str) -> Tuple:
+    """Decode a token from _encode_cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(key, list):
+        raise ValueError("Invalid cursor.")
+    return tuple(key)
+
+def _is_row_id(value) -> bool:
+    """True for an int SQLite can bind as a row id (JSON true/false excluded)."""
+    return isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63
+
+def get_catalog_page(cursor: Optional[str] = None, per_page: int = CATALOG_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
     """
-    Search for books in the catalog.
-    
-    TODO: Implement R6 as per requirements
+    Get one page of the catalog (R2) ordered by title.
+
+    Args:
+        cursor: token from the previous page's next_cursor, None for the first page
+        per_page: books per page (1 to MAX_CATALOG_PAGE_SIZE)
+
+    Returns:
+        tuple: (books, next_cursor or None on the last page)
+
+    Raises:
+        ValueError: if per_page is out of range or the cursor is invalid
+    """
+    if not isinstance(per_page, int) or not 1 <= per_page <= MAX_CATALOG_PAGE_SIZE:
+        raise ValueError(f"Page size must be between 1 and {MAX_CATALOG_PAGE_SIZE}.")
+
+    after = None
+    if cursor:
+        after = _decode_cursor(cursor)
+        if len(after) != 2 or not isinstance(after[0], str) or not _is_row_id(after[1]):
+            raise ValueError("Invalid cursor.")
+
+    books, next_key = get_books_page(per_page, after)
+    return books, _encode_cursor(next_key) if next_key else None
+
+def search_catalog(title: Optional[str] = None, author: Optional[str] = None, available_only: bool = False,
+                   sort: str = "title", cursor: Optional[str] = None,
+                   per_page: int = SEARCH_RESULT_LIMIT) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Combined search: every given criterion must match (title AND author,
+    optionally only available books), one page at a time.
+
+    Args:
+        title, author: word-prefix terms (either may be omitted)
+        available_only: skip books with no available copies
+        sort: 'title', 'author' or 'newest'
+        cursor: token from the previous page's next_cursor, None for the first page
+        per_page: results per page (1 to SEARCH_RESULT_LIMIT)
+
+    Returns:
+        tuple: (books, next_cursor or None on the last page)
+
+    Raises:
+        ValueError: on an unknown sort, bad page size or invalid cursor
+    """
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"Sort must be one of: {', '.join(SEARCH_SORTS)}.")
+    if not isinstance(per_page, int) or not 1 <= per_page <= SEARCH_RESULT_LIMIT:
+        raise ValueError(f"Page size must be between 1 and {SEARCH_RESULT_LIMIT}.")
+
+    after = None
+    if cursor:
+        # Cursors carry their sort so a page key is never applied to another order
+        key = _decode_cursor(cursor)
+        columns = SEARCH_SORTS[sort][0]
+        checks = [_is_row_id if column == "id" else (lambda v: isinstance(v, str)) for column in columns]
+        if (len(key) != len(columns) + 1 or key[0] != sort
+                or not all(check(v) for v, check in zip(key[1:], checks))):
+            raise ValueError("Invalid cursor.")
+        after = key[1:]
+
+    books, next_key = search_books_page((title or "").strip() or None, (author or "").strip() or None,
+                                        available_only, sort, per_page, after)
+    return books, _encode_cursor((sort, *next_key)) if next_key else None
+
+def configure_search_cache(capacity: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL):
+    """Set the search result cache capacity (0 disables it) and entry lifetime in seconds."""
+    _search_cache.resize(capacity, ttl)
+
+def search_cache_stats() -> Dict:
+    """Return search result cache metrics: hits, misses, hit_rate, evictions, expirations, size, capacity."""
+    return _search_cache.stats()
+
+def _search_cache_token() -> int:
+    """Drop cached results from an older catalog version; return a fill token."""
+    global _search_cache_version
+    version = catalog_version()
+    if version != _search_cache_version:
+        _search_cache.clear()
+        _search_cache_version = version
+    return _search_cache.token()
+
+def search_books_in_catalog(search_term: str, search_type: str, limit: int = SEARCH_RESULT_LIMIT) -> List[Dict]:
+    """
+    Search for books in the catalog (R6).
+    - title/author: word-prefix match via the FTS5 index, best (BM25) match first;
+      substring match when SQLite lacks FTS5. Both ignore case and accents.
+    - isbn: exact match, must be exactly 13 digits
+    - fuzzy: typo-tolerant title/author match, most similar first
+    At most `limit` results are returned. Title/author results are cached
+    per (type, search_key(term), limit) until the catalog changes.
     """
     q = (search_term or "").strip()
     if not q:
         return []
 
     stype = (search_type or "title").lower()
-    if stype not in {"title", "author", "isbn"}:
+    if stype not in {"title", "author", "isbn", "fuzzy"}:
         stype = "title"
 
-    # Fetch all books (same shape the catalog uses)
-    books = get_all_books() or []
-
-    # ISBN: exact match, must be exactly 13 digits
+    # ISBN: exact match, must be exactly 13 digits (single UNIQUE-index lookup)
     if stype == "isbn":
         if len(q) != 13 or not q.isdigit():
             return []
-        return [b for b in books if str(b.get("isbn", "")) == q]
+        book = get_book_by_isbn(q)
+        return [book] if book else []
+
+    field = stype
+    # Every search path matches on search_key(), so equal keys give equal results
+    key = (field, search_key(q), limit)
+    token = _search_cache_token()
+    cached = _search_cache.get(key)
+    if cached is not MISSING:
+        return [Book(*values) for values in cached]
+
+    if field == "fuzzy":
+        books = fuzzy_search_books(q, limit)
+    elif fulltext_search_available():
+        books = search_books_fulltext(q, field, limit)
+    else:
+        # Fallback without FTS5 - Title/Author: partial (substring) match on the key column
+        books = search_books_substring(q, field, limit)
 
-    # Title/Author: partial (substring), case-insensitive
-    field = "title" if stype == "title" else "author"
-    q_lower = q.lower()
-    return [b for b in books if q_lower in str(b.get(field, "")).lower()]
+    _search_cache.put(key, tuple(tuple(b.values()) for b in books), token)
+    return books
+
+def search_books_in_catalog_batch(queries: List[Dict], limit: int = SEARCH_RESULT_LIMIT) -> List[Dict]:
+    """
+    Run many R6 searches at once.
+    Each query is a {'q', 'type'} dict searched like search_books_in_catalog;
+    all ISBNs are resolved together with batched IN queries and repeated
+    title/author/fuzzy queries are searched once. Invalid items are reported
+    without failing the others.
+    
+    Args:
+        queries: list of {'q': term, 'type': 'title'|'author'|'isbn'|'fuzzy'} dicts
+        limit: maximum number of results per query
+        
+    Returns:
+        list: one {'index', 'q', 'type', 'results', 'count'} dict per query, in
+        order ('error' instead of results/count for an invalid query)
+    """
+    results = []
+    isbn_results = []
+    searched = {}
+    
+    for index, query in enumerate(queries):
+        if not isinstance(query, dict):
+            query = {'q': None}
+        q, stype = query.get('q'), query.get('type') or 'title'
+        if not isinstance(q, str) or not isinstance(stype, str):
+            results.append({'index': index, 'q': q, 'type': stype,
+                            'error': "Query must be a JSON object with string q and type."})
+            continue
+        
+        q = q.strip()
+        stype = stype.lower()
+        if stype not in {"title", "author", "isbn", "fuzzy"}:
+            stype = "title"
+        result = {'index': index, 'q': q, 'type': stype}
+        results.append(result)
+        if not q:
+            result['error'] = "Search term is required"
+        elif stype == "isbn":
+            isbn_results.append(result)
+        else:
+            key = (stype, search_key(q))
+            if key not in searched:
+                searched[key] = search_books_in_catalog(q, stype, limit)
+            result['results'] = searched[key]
+    
+    # ISBN: exact match on exactly 13 digits, like search_books_in_catalog
+    valid_isbns = [r['q'] for r in isbn_results if len(r['q']) == 13 and r['q'].isdigit()]
+    books_by_isbn = get_books_by_isbns(list(dict.fromkeys(valid_isbns))) if valid_isbns else {}
+    for result in isbn_results:
+        book = books_by_isbn.get(result['q'])
+        result['results'] = [book] if book else []
+    
+    for result in results:
+        if 'results' in result:
+            result['count'] = len(result['results'])
+    return results
 
 def get_patron_status_report(patron_id: str) -> Dict:
     """
@@ -261,15 +534,12 @@ def get_patron_status_report(patron_id: str) -> Dict:
 
     history = get_patron_borrow_history(patron_id) or []
 
-    # Build active list + compute total fees using the same fee logic as R5
-    now = datetime.now()
-    active = []
-    total_fees = 0.0
+    # From the fee ledger when it is current, else summed in SQL under the fee schedule
+    total_fees = patron_late_fee_total(patron_id, datetime.now())
 
+    active = []
     for rec in history:
         if rec.get('return_date') is None:  # active borrow
-            fee_amt, _days = _compute_late_fee(rec['borrow_date'], now)
-            total_fees += fee_amt
             active.append({
                 'book_id': rec['book_id'],
                 'title': rec['title'],
@@ -0,0 +1,261 @@
+"""
+Search Service Module - In-memory search indexes
+Typo-tolerant (fuzzy) title/author search over a word trigram index and
+prefix autocomplete over sorted title/author keys
+"""
+
+import bisect
+import heapq
+from abc import ABC, abstractmethod
+import itertools
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from database import (
+    catalog_version, get_books_by_ids, iter_book_search_keys_after, register_reset_hook, search_key
+)
+from models import Book
+
+# A query word matches an indexed word when their trigram Jaccard
+# similarity is at least this (one typo in a 7-letter word scores ~0.33)
+FUZZY_MIN_SIMILARITY = 0.3
+
+# Books scored for the rarest query word; bounds work for very common words
+FUZZY_MAX_CANDIDATES = 5000
+
+# Other query words whose postings exceed this are too common to help ranking
+FUZZY_MAX_SCORED_POSTINGS = 50000
+
+# Autocomplete: default and maximum number of suggestions returned
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 25
+
+_WORD_RE = re.compile(r'\w+')
+
+# Leading articles also indexed without, so "hobb" suggests "The Hobbit"
+_ARTICLES = ('the ', 'a ', 'an ')
+
+def _words(key: str) -> List[str]:
+    """Words of a search_key() value."""
+    return _WORD_RE.findall(key)
+
+def _trigrams(word: str) -> set:
+    """Trigrams of the word padded like pg_trgm: two spaces before, one after."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _BookIndex(ABC):
+    """
+    Base for in-memory indexes fed from the books table. refresh() adds only
+    books inserted since the last refresh (the catalog version says when to
+    look); title/author edits are picked up after database.close_all_connections()
+    or a restart, which reset every index.
+    """
+
+    def __init__(self):
+        self.last_id = 0
+        self.size = 0
+        self._version: Optional[int] = None
+
+    @abstractmethod
+    def add(self, book_id: int, title: str, author: str, title_key: str, author_key: str):
+        """Index one book; the keys are its books.title_key / author_key (search_key())."""
+
+    def refresh(self):
+        version = catalog_version()
+        if version == self._version:
+            return
+        for row in iter_book_search_keys_after(self.last_id):
+            self.add(*row)
+            self.last_id = row[0]
+            self.size += 1
+        self._version = version
+
+class TrigramIndex(_BookIndex):
+    """
+    Word-level trigram index over book titles and authors.
+
+    Every distinct word gets an id. trigram -> word ids finds words that look
+    like a (possibly misspelled) query word; word id -> book ids then finds the
+    books using those words. Postings are compact arrays, append-only, so new
+    books are added incrementally with add().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._word_ids: Dict[str, int] = {}
+        self._word_sizes = array('H')          # word id -> trigram count
+        self._trigram_words: Dict[str, array] = {}
+        self._word_books: List[array] = []     # word id -> book ids
+
+    def add(self, book_id: int, title: str, author: str, title_key: str, author_key: str):
+        """Index one book. Ids must be added in increasing order."""
+        for word in set(_words(title_key) + _words(author_key)):
+            word_id = self._word_ids.get(word)
+            if word_id is None:
+                word_id = len(self._word_books)
+                self._word_ids[word] = word_id
+                grams = _trigrams(word)
+                self._word_sizes.append(len(grams))
+                for gram in grams:
+                    postings = self._trigram_words.get(gram)
+                    if postings is None:
+                        postings = self._trigram_words[gram] = array('I')
+                    postings.append(word_id)
+                self._word_books.append(array('I'))
+            self._word_books[word_id].append(book_id)
+
+    def match_words(self, word: str, min_similarity: float = FUZZY_MIN_SIMILARITY) -> List[Tuple[int, float]]:
+        """Return (word id, similarity) for indexed words similar to `word`, best first."""
+        grams = _trigrams(word)
+        postings = [self._trigram_words[gram] for gram in grams if gram in self._trigram_words]
+        shared_counts = Counter(itertools.chain.from_iterable(postings))
+
+        size = len(grams)
+        # Jaccard = shared / (size + other - shared) >= m  needs  shared >= m * size
+        min_shared = min_similarity * size
+        matches = []
+        for word_id, shared in shared_counts.items():
+            if shared < min_shared:
+                continue
+            similarity = shared / (size + self._word_sizes[word_id] - shared)
+            if similarity >= min_similarity:
+                matches.append((word_id, similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        Rank books against the query words.
+        Score = mean over query words of the best similarity among the book's
+        words; candidates come from the most selective query word.
+        """
+        words = list(dict.fromkeys(_words(search_key(query))))
+        if not words:
+            return []
+
+        matched = []
+        for word in words:
+            matches = self.match_words(word)
+            if matches:
+                postings = sum(len(self._word_books[word_id]) for word_id, _ in matches)
+                matched.append((postings, matches))
+        if not matched:
+            return []
+        matched.sort(key=lambda item: item[0])
+
+        # Seed candidates from the rarest word, closest spellings first
+        scores: Dict[int, float] = {}
+        for word_id, similarity in matched[0][1]:
+            for book_id in self._word_books[word_id][:FUZZY_MAX_CANDIDATES - len(scores)]:
+                scores.setdefault(book_id, similarity)
+            if len(scores) >= FUZZY_MAX_CANDIDATES:
+                break
+
+        for postings, matches in matched[1:]:
+            if postings > FUZZY_MAX_SCORED_POSTINGS:
+                continue
+            best: Dict[int, float] = {}
+            for word_id, similarity in matches:
+                for book_id in self._word_books[word_id]:
+                    if book_id in scores and similarity > best.get(book_id, 0.0):
+                        best[book_id] = similarity
+            for book_id, similarity in best.items():
+                scores[book_id] += similarity
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(book_id, score / len(words)) for book_id, score in top]
+
+class PrefixIndex(_BookIndex):
+    """
+    Sorted arrays of distinct title and author keys (search_key()) for autocomplete.
+    A prefix query is one bisect plus a short scan. New values are insort-ed,
+    which is cheap for the handful of books a refresh usually brings.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # field -> sorted list of distinct (key, display value)
+        self._entries: Dict[str, List[Tuple[str, str]]] = {'title': [], 'author': []}
+
+    @staticmethod
+    def _entries_for(title: str, author: str, title_key: str, author_key: str):
+        """Yield (field, (key, value)) pairs: titles also without a leading article."""
+        yield 'title', (title_key, title)
+        for article in _ARTICLES:
+            if title_key.startswith(article) and len(title_key) > len(article):
+                yield 'title', (title_key[len(article):], title)
+        yield 'author', (author_key, author)
+
+    def add(self, book_id: int, title: str, author: str, title_key: str, author_key: str):
+        for field, entry in self._entries_for(title, author, title_key, author_key):
+            entries = self._entries[field]
+            i = bisect.bisect_left(entries, entry)
+            if i == len(entries) or entries[i] != entry:
+                entries.insert(i, entry)
+
+    def refresh(self):
+        if self._version is not None:
+            return super().refresh()
+        # First use: append everything, then sort and de-duplicate once
+        self._version = catalog_version()
+        for row in iter_book_search_keys_after(self.last_id):
+            for field, entry in self._entries_for(*row[1:]):
+                self._entries[field].append(entry)
+            self.last_id = row[0]
+            self.size += 1
+        for field, entries in self._entries.items():
+            self._entries[field] = [entry for entry, _ in itertools.groupby(sorted(entries))]
+
+    def complete(self, prefix: str, field: str, limit: int) -> List[str]:
+        """Distinct titles/authors whose key starts with prefix, alphabetically."""
+        key = search_key(prefix)
+        entries = self._entries[field]
+        results = []
+        for i in range(bisect.bisect_left(entries, (key,)), len(entries)):
+            entry_key, value = entries[i]
+            if not entry_key.startswith(key):
+                break
+            if value not in results:
+                results.append(value)
+                if len(results) == limit:
+                    break
+        return results
+
+_index_lock = threading.Lock()
+_fuzzy_index = TrigramIndex()
+_prefix_index = PrefixIndex()
+
+def _reset_indexes():
+    global _fuzzy_index, _prefix_index
+    with _index_lock:
+        _fuzzy_index = TrigramIndex()
+        _prefix_index = PrefixIndex()
+
+register_reset_hook(_reset_indexes)
+
+def fuzzy_search_books(query: str, limit: int) -> List[Book]:
+    """
+    Typo-tolerant title/author search (search_type=fuzzy).
+    Returns up to `limit` books, most similar first.
+    """
+    with _index_lock:
+        _fuzzy_index.refresh()
+        ranked = _fuzzy_index.search(query, limit)
+    return get_books_by_ids([book_id for book_id, _ in ranked])
+
+def suggest(prefix: str, field: str = 'title', limit: int = SUGGEST_LIMIT) -> List[str]:
+    """
+    Autocomplete: up to `limit` distinct titles or authors starting with
+    prefix (ignoring case and accents; leading "The/A/An" optional for titles).
+    """
+    if field not in ('title', 'author'):
+        raise ValueError("type must be 'title' or 'author'.")
+    if not prefix.strip():
+        return []
+    with _index_lock:
+        _prefix_index.refresh()
+        return _prefix_index.complete(prefix, field, limit)
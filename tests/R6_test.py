@@ -53,3 +53,13 @@ def test_search_isbn_partial_should_not_match():
 
     assert results == []
     assert "[]" in str(results).lower()
+
+
+def test_search_isbn_does_not_scan_catalog(mocker):
+    """ISBN search is a direct indexed lookup, never a full catalog load."""
+    add_book_to_catalog("1984", "George Orwell", "9780451524935", 1)
+    mocker.patch("services.library_service.get_all_books", side_effect=AssertionError("full scan"))
+
+    results = search_books_in_catalog("9780451524935", "isbn")
+
+    assert [r["isbn"] for r in results] == ["9780451524935"]
@@ -0,0 +1,123 @@
+"""
+Benchmark: concurrent borrow/return throughput and inventory invariants.
+
+Worker threads borrow and return a small pool of scarce books as fast as
+they can. Afterwards the invariants are checked for every book:
+  - available_copies >= 0
+  - total_copies - available_copies == number of active borrow records
+
+The "legacy" mode replays the old read/count/insert/update sequence (one
+commit per step) to show the race it had; "atomic" uses checkout_book /
+checkin_book.
+
+RUN WITH: python -m tests.bench_borrow_contention [--threads N] [--seconds S]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import database
+from database import (
+    checkin_book, checkout_book, get_book_by_id, get_patron_borrow_count,
+    insert_book, insert_borrow_record, update_book_availability,
+    update_borrow_record_return_date
+)
+
+
+def legacy_borrow(patron_id, book_id, now):
+    book = get_book_by_id(book_id)
+    if not book or book['available_copies'] <= 0:
+        return False
+    if get_patron_borrow_count(patron_id) >= 5:
+        return False
+    insert_borrow_record(patron_id, book_id, now, now + timedelta(days=14))
+    update_book_availability(book_id, -1)
+    return True
+
+
+def legacy_return(patron_id, book_id, now):
+    update_borrow_record_return_date(patron_id, book_id, now)
+    update_book_availability(book_id, +1)
+
+
+def atomic_borrow(patron_id, book_id, now):
+    return checkout_book(patron_id, book_id, now, now + timedelta(days=14)) == 'ok'
+
+
+def atomic_return(patron_id, book_id, now):
+    checkin_book(patron_id, book_id, now)
+
+
+def check_invariants():
+    conn = database.get_db_connection()
+    rows = conn.execute('''
+        SELECT b.id, b.total_copies, b.available_copies,
+               (SELECT COUNT(*) FROM borrow_records br
+                WHERE br.book_id = b.id AND br.return_date IS NULL) AS active
+        FROM books b
+    ''').fetchall()
+    conn.close()
+    violations = []
+    for r in rows:
+        if r['available_copies'] < 0 or r['total_copies'] - r['available_copies'] != r['active']:
+            violations.append(dict(r))
+    return violations
+
+
+def run(mode, n_threads, seconds, n_books, copies):
+    database.close_all_connections()
+    if os.path.exists(database.DATABASE):
+        os.remove(database.DATABASE)
+    database.init_database()
+    for i in range(n_books):
+        insert_book(f'Book {i}', 'Author', f'{9000000000000 + i}', copies, copies)
+
+    borrow, give_back = (atomic_borrow, atomic_return) if mode == 'atomic' else (legacy_borrow, legacy_return)
+    deadline = time.perf_counter() + seconds
+    ops = [0] * n_threads
+
+    def worker(idx):
+        rng = random.Random(idx)
+        patron_id = f'{100000 + idx}'
+        held = []
+        while time.perf_counter() < deadline:
+            now = datetime.now()
+            if held and (len(held) >= 3 or rng.random() < 0.5):
+                give_back(patron_id, held.pop(rng.randrange(len(held))), now)
+            else:
+                book_id = rng.randint(1, n_books)
+                if book_id not in held and borrow(patron_id, book_id, now):
+                    held.append(book_id)
+            ops[idx] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    database.close_all_connections()
+    return sum(ops) / seconds, check_invariants()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--books', type=int, default=5)
+    parser.add_argument('--copies', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        for mode in ('legacy', 'atomic'):
+            throughput, violations = run(mode, args.threads, args.seconds, args.books, args.copies)
+            print(f'{mode:7} ops/s={throughput:8.0f}  invariant violations={len(violations)}')
+
+
+if __name__ == '__main__':
+    main()
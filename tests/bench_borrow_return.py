@@ -0,0 +1,75 @@
+"""
+Benchmark: borrow/return/fee hot path with and without the book cache.
+
+Runs --rounds cycles of borrow_book_by_patron, calculate_late_fee_for_book
+and return_book_by_patron against a throwaway catalog, then a read-only
+run of late fee checks, first with the book lookup cache disabled and then
+enabled. Prints per-call latency and the cache hit rate.
+
+RUN WITH: python -m tests.bench_borrow_return [--books N] [--rounds N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import database
+from services.library_service import (
+    borrow_book_by_patron, calculate_late_fee_for_book, return_book_by_patron
+)
+
+
+def run(rounds: int, books: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        book_id = i % books + 1
+        patron_id = f'{100000 + i % 97}'
+        assert borrow_book_by_patron(patron_id, book_id)[0]
+        calculate_late_fee_for_book(patron_id, book_id)
+        assert return_book_by_patron(patron_id, book_id)[0]
+    return time.perf_counter() - start
+
+
+def run_fee_lookups(rounds: int, books: int) -> float:
+    """Read-only part of the path: late fee checks with no writes in between."""
+    start = time.perf_counter()
+    for i in range(rounds):
+        calculate_late_fee_for_book('100000', i % books + 1)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.configure_connections(profile='production')
+        database.init_database()
+        conn = database.get_db_connection()
+        conn.executemany(
+            'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+            ((f'Title {i}', 'Author', f'{9000000000000 + i}', 3, 3) for i in range(args.books))
+        )
+        conn.commit()
+        conn.close()
+
+        for label, capacity in (('cache off', 0), ('cache on ', database.BOOK_CACHE_SIZE)):
+            database.configure_book_cache(capacity)
+            database._book_cache.clear()
+            database._book_cache.reset_stats()
+            elapsed = run(args.rounds, args.books)
+            reads = run_fee_lookups(args.rounds, args.books)
+            stats = database.book_cache_stats()
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / lookups if lookups and capacity else 0.0
+            print(f'{label}  borrow/fee/return {elapsed / args.rounds * 1e6:8.1f} us/cycle  '
+                  f'fee lookup {reads / args.rounds * 1e6:6.1f} us  hit rate {hit_rate:6.1%}')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: bulk catalog import throughput.
+
+Writes a synthetic JSONL vendor feed of --rows titles and loads it with
+import_books() into a throwaway database, then compares against the
+per-book add_book_to_catalog() path on a small sample.
+
+RUN WITH: python -m tests.bench_bulk_import [--rows N] [--batch-size N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import database
+from services.import_service import IMPORT_BATCH_SIZE, import_books, read_book_records
+from services.library_service import add_book_to_catalog
+
+
+def write_feed(path: str, rows: int):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            f.write(json.dumps({'title': f'Title {i}', 'author': f'Author {i % 5000}',
+                                'isbn': f'{9000000000000 + i}', 'total_copies': 3}) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--sample', type=int, default=2000, help='rows for the per-book baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.configure_connections(profile='production')
+        database.init_database()
+        feed = os.path.join(tmp, 'feed.jsonl')
+        write_feed(feed, args.rows)
+
+        start = time.perf_counter()
+        result = import_books(read_book_records(feed), batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        assert result['inserted'] == args.rows and not result['rejected']
+        print(f'import_books:        {args.rows:>9,} rows  {elapsed:7.2f} s  {args.rows / elapsed:>10,.0f} rows/s')
+
+        start = time.perf_counter()
+        for i in range(args.sample):
+            add_book_to_catalog(f'Single {i}', 'Author', f'{8000000000000 + i}', 3)
+        elapsed = time.perf_counter() - start
+        print(f'add_book_to_catalog: {args.sample:>9,} rows  {elapsed:7.2f} s  {args.sample / elapsed:>10,.0f} rows/s')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: SQLite connections opened per request, with and without pooling.
+
+Drives borrow/return requests through the Flask test client against a
+throwaway database and reports connections/request and requests/second.
+
+RUN WITH: python -m tests.bench_connections [--requests N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import database
+from app import create_app
+
+
+def run(pooling: bool, n_requests: int) -> dict:
+    database.configure_connections(pooling=pooling)
+    app = create_app()
+    client = app.test_client()
+
+    opened_before = database.connection_stats()['opened']
+    start = time.perf_counter()
+    for i in range(n_requests // 2):
+        client.post('/borrow', data={'patron_id': '222222', 'book_id': '1'})
+        client.post('/return', data={'patron_id': '222222', 'book_id': '1'})
+    elapsed = time.perf_counter() - start
+    opened = database.connection_stats()['opened'] - opened_before
+
+    return {
+        'pooling': pooling,
+        'connections_per_request': opened / n_requests,
+        'requests_per_second': n_requests / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        for pooling in (False, True):
+            r = run(pooling, args.requests)
+            print(f"pooling={str(r['pooling']):5}  "
+                  f"connections/request={r['connections_per_request']:.2f}  "
+                  f"requests/s={r['requests_per_second']:.0f}")
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
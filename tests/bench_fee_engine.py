@@ -0,0 +1,97 @@
+"""
+Benchmark: library-wide late fees, per-loan Python loop vs the NumPy batch engine.
+
+Fills a throwaway database with --loans active loans borrowed over the last
+--days days, loads them once with fee_service.load_active_loans, then
+computes every fee with library_service._compute_late_fee in a loop and
+with FeeSchedule.fee_cents in one pass. Checks that both agree and
+prints load, compute and full get_overdue_report timings.
+
+RUN WITH: python -m tests.bench_fee_engine [--loans N] [--days N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import database
+from services.fee_policy import get_fee_schedule
+from services.fee_service import epoch_day, get_overdue_report, load_active_loans
+from services.library_service import _compute_late_fee
+
+BOOKS = 10000
+
+
+def fill(loans: int, days: int, now: datetime):
+    rng = random.Random(1)
+    conn = database.get_db_connection()
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i}', 'Author', f'{9000000000000 + i}', 3, 3) for i in range(BOOKS))
+    )
+
+    def rows():
+        for i in range(loans):
+            borrow_date = (now - timedelta(days=rng.randrange(days))).replace(microsecond=0)
+            due_date = borrow_date + timedelta(days=14)
+            yield (f'{100000 + i % 900000}', i % BOOKS + 1, borrow_date.isoformat(), due_date.isoformat(),
+                   database._to_epoch(borrow_date), database._to_epoch(due_date))
+
+    conn.executemany(
+        'INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts) '
+        'VALUES (?, ?, ?, ?, ?, ?)', rows()
+    )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=5_000_000)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+    now = datetime.now()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.configure_connections(profile='production')
+        database.init_database()
+
+        start = time.perf_counter()
+        fill(args.loans, args.days, now)
+        print(f'fill          {time.perf_counter() - start:8.2f} s  ({args.loans:,} active loans)')
+
+        start = time.perf_counter()
+        loans = load_active_loans()
+        print(f'load arrays   {time.perf_counter() - start:8.2f} s')
+
+        epoch = datetime(1970, 1, 1)
+        loan_days = get_fee_schedule().policy('book').loan_days
+        borrow_dates = [epoch + timedelta(days=int(day) - loan_days) for day in loans['due_day']]
+        start = time.perf_counter()
+        loop_fees = [_compute_late_fee(borrow_date, now)[0] for borrow_date in borrow_dates]
+        loop = time.perf_counter() - start
+        del borrow_dates
+
+        start = time.perf_counter()
+        cents, _ = get_fee_schedule().fee_cents(loans['policy'], loans['due_day'], epoch_day(now))
+        batch = time.perf_counter() - start
+
+        assert np.array_equal(cents / 100, np.array(loop_fees)), 'batch fees differ from _compute_late_fee'
+        print(f'python loop   {loop:8.3f} s  ({loop / len(loans) * 1e9:6.0f} ns/loan)')
+        print(f'numpy batch   {batch:8.3f} s  ({batch / len(loans) * 1e9:6.0f} ns/loan, {loop / batch:.0f}x)')
+        del loans, loop_fees
+
+        start = time.perf_counter()
+        report = get_overdue_report(now)
+        print(f'full report   {time.perf_counter() - start:8.2f} s  '
+              f'({report["overdue_loans"]:,} overdue, ${report["total_late_fees"]:,.2f})')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: fuzzy (trigram) search latency at catalog scale.
+
+Fills a throwaway catalog with --books synthetic titles/authors drawn from a
+Zipf-like vocabulary, builds the trigram index, then times fuzzy searches
+for words with one random typo. Prints build time and median / p99 latency.
+
+RUN WITH: python -m tests.bench_fuzzy_search [--books N] [--queries N]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+import database
+from services.search_service import fuzzy_search_books
+
+STOP_WORDS = ['the', 'of', 'and', 'a', 'in', 'to', 'for', 'on']
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def typo(rng: random.Random, word: str) -> str:
+    i = rng.randrange(len(word))
+    edit = rng.choice(('drop', 'swap', 'replace'))
+    if edit == 'drop' and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if edit == 'swap' and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng, 60_000)
+    surnames = make_vocabulary(rng, 20_000)
+    # Zipf-like: low ranks are drawn far more often
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.configure_connections(profile='production')
+        database.init_database()
+        conn = database.get_db_connection()
+        rows = []
+        for i in range(args.books):
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(1, 5))
+            if rng.random() < 0.4:
+                words.insert(0, rng.choice(STOP_WORDS))
+            author = f'{rng.choice(surnames).title()} {rng.choice(surnames).title()}'
+            rows.append((' '.join(words).title(), author, f'{9000000000000 + i}', 1, 1))
+        conn.executemany('INSERT INTO books (title, author, isbn, total_copies, available_copies) '
+                         'VALUES (?, ?, ?, ?, ?)', rows)
+        conn.commit()
+        conn.close()
+        # Keep only what the queries need; a 1M-tuple list would slow every GC pass
+        sample = [rng.choice(row[0].split() + row[1].split()).lower()
+                  for row in rng.sample(rows, args.queries)]
+        del rows
+
+        start = time.perf_counter()
+        fuzzy_search_books('warmup', 10)
+        print(f'books={args.books:,}  index build {time.perf_counter() - start:6.2f} s')
+
+        latencies = []
+        for word in sample:
+            query = typo(rng, word)
+            start = time.perf_counter()
+            fuzzy_search_books(query, 20)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f'median={statistics.median(latencies) * 1000:6.2f} ms  '
+              f'p99={latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
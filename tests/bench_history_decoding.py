@@ -0,0 +1,146 @@
+"""
+Benchmark: decoding a 10k-loan patron history into Python rows.
+
+Compares
+  - legacy:  fetchall + fromisoformat per date, due_date parsed twice and
+             datetime.now() called per row (the pre-epoch-column code)
+  - current: get_patron_borrow_history / get_patron_borrowed_books
+             (is_overdue compared in SQL on due_ts, one clock read)
+  - epoch:   rebuilding datetimes from the integer *_ts columns instead of
+             the ISO text; kept for reference, CPython's fromisoformat is faster
+and the SQL-side overdue count against counting in Python.
+
+RUN WITH: python -m tests.bench_history_decoding [--loans N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import database
+from database import (
+    PATRON_BORROW_HISTORY_SQL, _EPOCH, _ONE_SECOND, _to_epoch,
+    get_patron_borrow_history, get_patron_borrowed_books
+)
+
+PATRON = '555555'
+
+
+def populate(n_loans):
+    conn = database.get_db_connection()
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i}', 'Author', f'{9000000000000 + i}', n_loans, n_loans) for i in range(100))
+    )
+    start = datetime.now() - timedelta(days=n_loans // 24 + 30)
+    rows = []
+    for i in range(n_loans):
+        borrow = start + timedelta(hours=i)
+        due = borrow + timedelta(days=14)
+        # Every other loan is still active
+        ret = None if i % 2 else borrow + timedelta(days=7)
+        rows.append((PATRON, i % 100 + 1, borrow.isoformat(), due.isoformat(),
+                     ret.isoformat() if ret else None,
+                     _to_epoch(borrow), _to_epoch(due), _to_epoch(ret) if ret else None))
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date,
+                                    borrow_ts, due_ts, return_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def legacy_borrowed_books():
+    conn = database.get_db_connection()
+    records = conn.execute('''
+        SELECT br.*, b.title, b.author FROM borrow_records br JOIN books b ON br.book_id = b.id
+        WHERE br.patron_id = ? AND br.return_date IS NULL ORDER BY br.borrow_date
+    ''', (PATRON,)).fetchall()
+    conn.close()
+    return [{
+        'book_id': r['book_id'], 'title': r['title'], 'author': r['author'],
+        'borrow_date': datetime.fromisoformat(r['borrow_date']),
+        'due_date': datetime.fromisoformat(r['due_date']),
+        'is_overdue': datetime.now() > datetime.fromisoformat(r['due_date'])
+    } for r in records]
+
+
+def legacy_history():
+    conn = database.get_db_connection()
+    rows = conn.execute(PATRON_BORROW_HISTORY_SQL, (PATRON,)).fetchall()
+    conn.close()
+    return [{
+        'book_id': r['book_id'], 'title': r['title'], 'author': r['author'],
+        'borrow_date': datetime.fromisoformat(r['borrow_date']),
+        'due_date': datetime.fromisoformat(r['due_date']),
+        'return_date': datetime.fromisoformat(r['return_date']) if r['return_date'] else None,
+    } for r in rows]
+
+
+def epoch_history():
+    with database._connection() as conn:
+        rows = conn.execute('''
+            SELECT br.book_id, br.borrow_ts, br.due_ts, br.return_ts, b.title, b.author
+            FROM borrow_records br JOIN books b ON br.book_id = b.id
+            WHERE br.patron_id = ? ORDER BY br.borrow_date DESC
+        ''', (PATRON,)).fetchall()
+    return [{
+        'book_id': r['book_id'], 'title': r['title'], 'author': r['author'],
+        'borrow_date': _EPOCH + _ONE_SECOND * r['borrow_ts'],
+        'due_date': _EPOCH + _ONE_SECOND * r['due_ts'],
+        'return_date': _EPOCH + _ONE_SECOND * r['return_ts'] if r['return_ts'] is not None else None,
+    } for r in rows]
+
+
+def overdue_count_python():
+    now = datetime.now()
+    return sum(1 for r in legacy_history() if r['return_date'] is None and now > r['due_date'])
+
+
+def overdue_count_sql():
+    with database._connection() as conn:
+        return conn.execute('''
+            SELECT COUNT(*) FROM borrow_records
+            WHERE patron_id = ? AND return_date IS NULL AND due_ts < ?
+        ''', (PATRON, _to_epoch(datetime.now()))).fetchone()[0]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--loans', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.init_database()
+        populate(args.loans)
+
+        cases = [
+            ('borrowed books (legacy)', legacy_borrowed_books),
+            ('borrowed books (current)', lambda: get_patron_borrowed_books(PATRON)),
+            ('history (legacy)', legacy_history),
+            ('history (current)', lambda: get_patron_borrow_history(PATRON)),
+            ('history (epoch decode)', epoch_history),
+            ('overdue count (python)', overdue_count_python),
+            ('overdue count (sql)', overdue_count_sql),
+        ]
+        for name, fn in cases:
+            print(f'{name:26} {best_of(fn, args.repeat) * 1000:8.2f} ms')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
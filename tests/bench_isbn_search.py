@@ -0,0 +1,64 @@
+"""
+Benchmark: /api/search?type=isbn latency as the catalog grows.
+
+Grows a throwaway catalog step by step up to --max-books titles and times
+ISBN searches through the Flask test client at each size. With the
+indexed lookup the median latency should stay flat.
+
+RUN WITH: python -m tests.bench_isbn_search [--max-books N] [--queries N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import database
+from app import create_app
+
+
+def grow_catalog(start: int, stop: int):
+    conn = database.get_db_connection()
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i}', f'Author {i % 5000}', f'{9000000000000 + i}', 3, 3) for i in range(start, stop))
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-books', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        client = create_app().test_client()
+        rng = random.Random(0)
+
+        size = 0
+        target = 1000
+        while size < args.max_books:
+            target = min(target, args.max_books)
+            grow_catalog(size, target)
+            size = target
+
+            latencies = []
+            for _ in range(args.queries):
+                isbn = f'{9000000000000 + rng.randrange(size)}'
+                start = time.perf_counter()
+                response = client.get('/api/search', query_string={'q': isbn, 'type': 'isbn'})
+                latencies.append(time.perf_counter() - start)
+                assert response.get_json()['count'] == 1
+            print(f'books={size:>9,}  median={statistics.median(latencies) * 1000:6.3f} ms  '
+                  f'p99={sorted(latencies)[int(len(latencies) * 0.99)] * 1000:6.3f} ms')
+            target *= 10
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: mixed read/write workload under each PRAGMA profile.
+
+Reader threads page through the catalog and look up single books while
+writer threads borrow and return copies. Reports read and write
+throughput plus p99 read latency for every profile in PRAGMA_PROFILES.
+
+RUN WITH: python -m tests.bench_pragma_profiles [--readers N] [--writers N] [--seconds S]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import database
+from database import checkin_book, checkout_book, get_all_books, get_book_by_id, insert_book
+
+
+def run(profile, n_readers, n_writers, seconds, n_books, tmp):
+    database.configure_connections(profile=profile)
+    database.DATABASE = os.path.join(tmp, f'{profile}.db')
+    database.init_database()
+    for i in range(n_books):
+        insert_book(f'Book {i:05d}', f'Author {i % 97}', f'{9000000000000 + i}', 50, 50)
+
+    deadline = time.perf_counter() + seconds
+    read_latencies = [[] for _ in range(n_readers)]
+    writes = [0] * n_writers
+
+    def reader(idx):
+        rng = random.Random(idx)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < 0.1:
+                get_all_books()
+            else:
+                get_book_by_id(rng.randint(1, n_books))
+            read_latencies[idx].append(time.perf_counter() - start)
+
+    def writer(idx):
+        rng = random.Random(1000 + idx)
+        patron_id = f'{100000 + idx}'
+        while time.perf_counter() < deadline:
+            book_id = rng.randint(1, n_books)
+            now = datetime.now()
+            if checkout_book(patron_id, book_id, now, now + timedelta(days=14)) == 'ok':
+                checkin_book(patron_id, book_id, now)
+            writes[idx] += 2
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(n_readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(n_writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    database.close_all_connections()
+
+    latencies = sorted(l for per_thread in read_latencies for l in per_thread)
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    return len(latencies) / seconds, sum(writes) / seconds, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--books', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in database.PRAGMA_PROFILES:
+            reads, writes, p99 = run(profile, args.readers, args.writers, args.seconds, args.books, tmp)
+            print(f'{profile:10} reads/s={reads:8.0f}  writes/s={writes:7.0f}  p99 read={p99 * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: memory and build time per 100k rows, dicts vs record types.
+
+Loads --rows books and --rows history entries once as the old per-row
+dicts (sqlite3.Row -> dict) and once as Book / BorrowRecord built by the
+row factories, measuring retained memory with tracemalloc.
+
+RUN WITH: python -m tests.bench_record_memory [--rows N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import database
+from database import PATRON_BORROW_HISTORY_SQL, get_all_books, get_patron_borrow_history
+
+
+def populate(n_rows):
+    conn = database.get_db_connection()
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i:07d}', f'Author {i % 5000}', f'{9000000000000 + i}', 3, 3) for i in range(n_rows))
+    )
+    start = datetime(2020, 1, 1)
+    conn.executemany(
+        'INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date) VALUES (?, ?, ?, ?, ?)',
+        (('555555', i + 1, (start + timedelta(minutes=i)).isoformat(),
+          (start + timedelta(minutes=i, days=14)).isoformat(),
+          (start + timedelta(minutes=i, days=7)).isoformat()) for i in range(n_rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def dict_books():
+    with database._connection() as conn:
+        return [dict(row) for row in conn.execute('SELECT * FROM books ORDER BY title')]
+
+
+def dict_history():
+    with database._connection() as conn:
+        rows = conn.execute(PATRON_BORROW_HISTORY_SQL, ('555555',)).fetchall()
+    return [{
+        'book_id': r['book_id'], 'title': r['title'], 'author': r['author'],
+        'borrow_date': datetime.fromisoformat(r['borrow_date']),
+        'due_date': datetime.fromisoformat(r['due_date']),
+        'return_date': datetime.fromisoformat(r['return_date']) if r['return_date'] else None,
+    } for r in rows]
+
+
+def measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = load()
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.init_database()
+        populate(args.rows)
+
+        cases = [
+            ('books as dict', dict_books),
+            ('books as Book', get_all_books),
+            ('history as dict', dict_history),
+            ('history as BorrowRecord', lambda: get_patron_borrow_history('555555')),
+        ]
+        for name, load in cases:
+            n, retained, elapsed = measure(load)
+            per_100k = retained / n * 100_000 / 1024 / 1024
+            print(f'{name:24} {per_100k:7.2f} MiB per 100k rows  build={elapsed * 1000:7.1f} ms')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
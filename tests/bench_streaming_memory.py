@@ -0,0 +1,72 @@
+"""
+Benchmark: peak Python memory of list vs streaming database helpers.
+
+Consumes every book (and a large patron history) once via the list
+helpers and once via their iter_* generators, measuring peak traced
+allocations with tracemalloc.
+
+RUN WITH: python -m tests.bench_streaming_memory [--books N] [--loans N]
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import database
+from database import (
+    get_all_books, get_patron_borrow_history, iter_all_books, iter_patron_borrow_history
+)
+
+
+def populate(n_books, n_loans):
+    conn = database.get_db_connection()
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i:07d}', f'Author {i % 5000}', f'{9000000000000 + i}', 3, 3) for i in range(n_books))
+    )
+    start = datetime(2020, 1, 1)
+    conn.executemany(
+        'INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date) VALUES (?, ?, ?, ?, ?)',
+        (('555555', i % n_books + 1,
+          (start + timedelta(hours=i)).isoformat(),
+          (start + timedelta(hours=i, days=14)).isoformat(),
+          (start + timedelta(hours=i, days=7)).isoformat()) for i in range(n_loans))
+    )
+    conn.commit()
+    conn.close()
+
+
+def peak_memory(consume):
+    tracemalloc.start()
+    consume()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=200_000)
+    parser.add_argument('--loans', type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        database.init_database()
+        populate(args.books, args.loans)
+
+        cases = [
+            ('books (list)', lambda: sum(b['available_copies'] for b in get_all_books())),
+            ('books (stream)', lambda: sum(b['available_copies'] for b in iter_all_books())),
+            ('history (list)', lambda: sum(1 for r in get_patron_borrow_history('555555') if r['return_date'])),
+            ('history (stream)', lambda: sum(1 for r in iter_patron_borrow_history('555555') if r['return_date'])),
+        ]
+        for name, consume in cases:
+            print(f'{name:18} peak={peak_memory(consume) / 1024 / 1024:8.2f} MiB')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: /api/suggest per-keystroke latency at catalog scale.
+
+Fills a throwaway catalog with --books synthetic titles, then replays typing
+sampled titles one character at a time against /api/suggest through the
+Flask test client. Prints index build time and median / p99 latency.
+
+RUN WITH: python -m tests.bench_suggest [--books N] [--words N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+import database
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=1_000_000)
+    parser.add_argument('--words', type=int, default=200, help='titles to "type"')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    syllables = [a + b for a in string.ascii_lowercase for b in 'aeiou']
+
+    def title():
+        return ' '.join(''.join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(rng.randint(1, 4))).title()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'bench.db')
+        client = create_app().test_client()
+        conn = database.get_db_connection()
+        titles = [title() for _ in range(args.books)]
+        conn.executemany(
+            'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+            ((t, f'Author {i % 5000}', f'{9000000000000 + i}', 1, 1) for i, t in enumerate(titles))
+        )
+        conn.commit()
+        conn.close()
+        sample = rng.sample(titles, args.words)
+        del titles
+
+        start = time.perf_counter()
+        client.get('/api/suggest', query_string={'q': 'a'})
+        print(f'books={args.books:,}  index build {time.perf_counter() - start:6.2f} s')
+
+        latencies = []
+        for typed in sample:
+            for end in range(1, min(len(typed), 12) + 1):
+                start = time.perf_counter()
+                response = client.get('/api/suggest', query_string={'q': typed[:end]})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+        latencies.sort()
+        print(f'keystrokes={len(latencies):,}  median={statistics.median(latencies) * 1000:6.3f} ms  '
+              f'p99={latencies[int(len(latencies) * 0.99)] * 1000:6.3f} ms')
+        database.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
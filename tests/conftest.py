@@ -0,0 +1,19 @@
+import pytest
+import database
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the data layer at a fresh, initialized database file for one test."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "library.db"))
+    database.configure_connections(pragmas={}, pooling=True)
+    database.init_database()
+    yield str(tmp_path / "library.db")
+    database.configure_connections(pragmas={}, pooling=True)
+
+@pytest.fixture
+def client(temp_db):
+    """Flask test client backed by the temp_db database (includes the sample books)."""
+    from app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
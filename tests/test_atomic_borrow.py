@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+from database import get_book_by_isbn, get_db_connection
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, return_book_by_patron
+)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file."""
+
+def _active_loans(book_id):
+    conn = get_db_connection()
+    count = conn.execute(
+        'SELECT COUNT(*) FROM borrow_records WHERE book_id = ? AND return_date IS NULL',
+        (book_id,)
+    ).fetchone()[0]
+    conn.close()
+    return count
+
+def test_concurrent_borrows_take_last_copy_once():
+    """Only one of many concurrent borrowers may take a single-copy book."""
+    add_book_to_catalog("Last Copy", "Author", "5555555555551", 1)
+    book = get_book_by_isbn("5555555555551")
+
+    results = []
+    def borrow(patron_id):
+        results.append(borrow_book_by_patron(patron_id, book['id']))
+
+    threads = [threading.Thread(target=borrow, args=(f"{100000 + i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(1 for success, _ in results if success) == 1
+    assert all("not available" in msg.lower() for success, msg in results if not success)
+    assert get_book_by_isbn("5555555555551")['available_copies'] == 0
+    assert _active_loans(book['id']) == 1
+
+def test_limit_reached_leaves_copy_available():
+    """A borrow rejected by the 5-book limit must not consume a copy."""
+    for i in range(6):
+        add_book_to_catalog(f"Limit Book {i}", "Author", f"555555555556{i}", 1)
+    books = [get_book_by_isbn(f"555555555556{i}") for i in range(6)]
+    for book in books[:5]:
+        assert borrow_book_by_patron("777777", book['id'])[0]
+
+    success, message = borrow_book_by_patron("777777", books[5]['id'])
+
+    assert success is False
+    assert "maximum borrowing limit" in message.lower()
+    assert get_book_by_isbn("5555555555565")['available_copies'] == 1
+
+def test_return_restores_copy_and_closes_loan():
+    """Returning closes the active record and gives the copy back in one step."""
+    add_book_to_catalog("Round Trip", "Author", "5555555555571", 1)
+    book = get_book_by_isbn("5555555555571")
+    borrow_book_by_patron("888888", book['id'])
+
+    success, message = return_book_by_patron("888888", book['id'])
+
+    assert success is True
+    assert "no late fee" in message.lower()
+    assert get_book_by_isbn("5555555555571")['available_copies'] == 1
+    assert _active_loans(book['id']) == 0
+
+    success, message = return_book_by_patron("888888", book['id'])
+    assert success is False
+    assert "no active borrow record" in message.lower()
@@ -0,0 +1,82 @@
+import pytest
+from database import connection_stats, insert_book
+from services.library_service import MAX_BATCH_SEARCH_QUERIES, search_books_in_catalog_batch
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with a few well-known books."""
+    insert_book("Dune", "Frank Herbert", "2000000000001", 1, 1)
+    insert_book("Dune Messiah", "Frank Herbert", "2000000000002", 1, 1)
+    insert_book("Emma", "Jane Austen", "2000000000003", 1, 1)
+
+def _titles(result):
+    return [b["title"] for b in result["results"]]
+
+def test_results_in_query_order():
+    results = search_books_in_catalog_batch([
+        {"q": "dune", "type": "title"},
+        {"q": "2000000000003", "type": "isbn"},
+        {"q": "austen", "type": "author"},
+        {"q": "frank herbrt", "type": "fuzzy"},
+        {"q": "9999999999999", "type": "isbn"},
+    ])
+
+    assert [(r["index"], r["q"], r["type"]) for r in results] == [
+        (0, "dune", "title"), (1, "2000000000003", "isbn"), (2, "austen", "author"),
+        (3, "frank herbrt", "fuzzy"), (4, "9999999999999", "isbn"),
+    ]
+    assert set(_titles(results[0])) == {"Dune", "Dune Messiah"}
+    assert _titles(results[1]) == ["Emma"]
+    assert _titles(results[2]) == ["Emma"]
+    assert set(_titles(results[3])) == {"Dune", "Dune Messiah"}
+    assert results[4]["results"] == [] and results[4]["count"] == 0
+
+def test_invalid_queries_reported_per_item():
+    results = search_books_in_catalog_batch([
+        {"q": "  "},
+        "dune",
+        {"q": 42},
+        {"q": "emma"},
+        {"q": "20000000", "type": "isbn"},
+    ])
+    assert results[0]["error"] == "Search term is required"
+    assert "error" in results[1] and "error" in results[2]
+    assert results[3]["type"] == "title" and _titles(results[3]) == ["Emma"]
+    assert results[4]["results"] == []
+
+def test_isbns_resolved_with_one_query(mocker):
+    """ISBN queries never go through per-item get_book_by_isbn lookups."""
+    spy = mocker.patch("services.library_service.get_book_by_isbn")
+    results = search_books_in_catalog_batch(
+        [{"q": f"200000000000{i}", "type": "isbn"} for i in (1, 2, 3, 1)])
+    spy.assert_not_called()
+    assert [_titles(r) for r in results] == [["Dune"], ["Dune Messiah"], ["Emma"], ["Dune"]]
+
+def test_repeated_terms_searched_once(mocker):
+    spy = mocker.patch("services.library_service.search_books_in_catalog", return_value=[])
+    search_books_in_catalog_batch([{"q": "Dune"}, {"q": "dune "}, {"q": "dune", "type": "author"}])
+    assert spy.call_count == 2
+
+def test_batch_uses_one_connection():
+    opened = connection_stats()["opened"]
+    search_books_in_catalog_batch([{"q": "dune"}, {"q": "2000000000001", "type": "isbn"}])
+    assert connection_stats()["opened"] == opened
+
+def test_batch_endpoint(client):
+    response = client.post("/api/search/batch", query_string={"limit": 1},
+                           json=[{"q": "dune"}, {"q": "2000000000003", "type": "isbn"}])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == 2
+    assert data["results"][0]["count"] == 1
+    assert data["results"][1]["results"][0]["title"] == "Emma"
+
+@pytest.mark.parametrize("body, query_string", [
+    ({"q": "dune"}, {}),
+    ([], {}),
+    ([{"q": "dune"}] * (MAX_BATCH_SEARCH_QUERIES + 1), {}),
+    ([{"q": "dune"}], {"limit": 0}),
+])
+def test_batch_endpoint_rejects_bad_requests(client, body, query_string):
+    response = client.post("/api/search/batch", query_string=query_string, json=body)
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import pytest
+from cache import MISSING, LRUCache
+from database import (
+    book_cache_stats, configure_book_cache, get_book_by_id, get_book_by_isbn,
+    insert_book, update_book_availability, BOOK_CACHE_SIZE
+)
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file and an empty book cache."""
+    insert_book("Cached", "Author", "3330000000001", 2, 2)
+    yield
+    configure_book_cache(BOOK_CACHE_SIZE)
+
+def _delta(before, after):
+    return after["hits"] - before["hits"], after["misses"] - before["misses"]
+
+def test_repeated_lookups_hit_cache():
+    get_book_by_id(1)
+    before = book_cache_stats()
+    for _ in range(5):
+        assert get_book_by_id(1)["title"] == "Cached"
+    assert _delta(before, book_cache_stats()) == (5, 0)
+
+def test_isbn_lookup_fills_id_entry():
+    book = get_book_by_isbn("3330000000001")
+    before = book_cache_stats()
+    assert get_book_by_id(book["id"]) == book
+    assert _delta(before, book_cache_stats()) == (1, 0)
+
+def test_insert_invalidates_cached_miss():
+    assert get_book_by_isbn("3330000000002") is None
+    assert get_book_by_id(2) is None
+    insert_book("New", "Author", "3330000000002", 1, 1)
+    assert get_book_by_isbn("3330000000002")["id"] == 2
+    assert get_book_by_id(2)["title"] == "New"
+
+def test_borrow_and_return_update_cached_copies():
+    assert get_book_by_id(1)["available_copies"] == 2
+    assert borrow_book_by_patron("111111", 1)[0]
+    assert get_book_by_id(1)["available_copies"] == 1
+    assert get_book_by_isbn("3330000000001")["available_copies"] == 1
+    assert return_book_by_patron("111111", 1)[0]
+    assert get_book_by_id(1)["available_copies"] == 2
+
+def test_update_availability_invalidates():
+    get_book_by_id(1)
+    update_book_availability(1, -2)
+    assert get_book_by_id(1)["available_copies"] == 0
+
+def test_callers_get_independent_records():
+    book = get_book_by_id(1)
+    book.available_copies = 99
+    assert get_book_by_id(1)["available_copies"] == 2
+
+def test_disabled_cache_still_serves_lookups():
+    configure_book_cache(0)
+    assert get_book_by_id(1)["title"] == "Cached"
+    assert book_cache_stats()["size"] == 0
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_put_with_stale_token_is_dropped():
+    """A read that started before an invalidation must not re-cache the old value."""
+    cache = LRUCache(4)
+    token = cache.token()
+    cache.invalidate("a")
+    cache.put("a", "old row", token)
+    assert cache.get("a") is MISSING
+
+def test_write_through_discards_racing_fill():
+    """A fill that read the row before a write-through must not overwrite it."""
+    cache = LRUCache(4)
+    reader_token = cache.token()
+    cache.update("a", "new row", cache.token())
+    cache.put("a", "old row", reader_token)
+    assert cache.get("a") == "new row"
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+from database import (
+    _to_epoch, get_db_connection, get_patron_borrowed_books, insert_book,
+    checkout_book, checkin_book
+)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with one book."""
+    insert_book("Dated Book", "Author", "9999999999991", 3, 3)
+
+def _epoch_columns(patron_id):
+    conn = get_db_connection()
+    row = conn.execute(
+        "SELECT borrow_ts, due_ts, return_ts FROM borrow_records WHERE patron_id = ?", (patron_id,)
+    ).fetchone()
+    conn.close()
+    return tuple(row)
+
+def test_checkout_and_checkin_write_epoch_columns():
+    borrowed = datetime(2025, 3, 1, 9, 30, 15, 250000)
+    returned = borrowed + timedelta(days=3)
+    checkout_book("135790", 1, borrowed, borrowed + timedelta(days=14))
+    checkin_book("135790", 1, returned)
+
+    assert _epoch_columns("135790") == (
+        _to_epoch(borrowed), _to_epoch(borrowed + timedelta(days=14)), _to_epoch(returned)
+    )
+
+def test_triggers_fill_epoch_columns_for_text_only_writes():
+    """Raw SQL that only sets the ISO text columns still gets *_ts values."""
+    borrowed = datetime(2025, 3, 1, 9, 30, 15, 999999)
+    due = borrowed + timedelta(days=14)
+    returned = borrowed + timedelta(days=2)
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES (?, ?, ?, ?)",
+        ("246802", 1, borrowed.isoformat(), due.isoformat())
+    )
+    conn.execute("UPDATE borrow_records SET return_date = ? WHERE patron_id = ?",
+                 (returned.isoformat(), "246802"))
+    conn.commit()
+    conn.close()
+
+    assert _epoch_columns("246802") == (_to_epoch(borrowed), _to_epoch(due), _to_epoch(returned))
+
+def test_is_overdue_computed_from_due_ts():
+    now = datetime.now()
+    checkout_book("112233", 1, now - timedelta(days=20), now - timedelta(days=6))
+    insert_book("Fresh Book", "Author", "9999999999992", 1, 1)
+    checkout_book("112233", 2, now, now + timedelta(days=14))
+
+    overdue = {b["title"]: b["is_overdue"] for b in get_patron_borrowed_books("112233")}
+
+    assert overdue == {"Dated Book": True, "Fresh Book": False}
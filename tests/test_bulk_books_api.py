@@ -0,0 +1,67 @@
+import pytest
+from database import get_all_books, get_book_by_isbn, insert_book
+from services.library_service import add_books_to_catalog
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with one existing book."""
+    insert_book("Existing", "Author", "5550000000000", 1, 1)
+
+def _book(i, **overrides):
+    book = {"title": f"Bulk {i}", "author": "Vendor", "isbn": f"55500000001{i:02d}", "total_copies": 2}
+    book.update(overrides)
+    return book
+
+def test_add_books_reports_each_item_in_order():
+    results = add_books_to_catalog([
+        _book(1),
+        _book(2, isbn="5550000000000"),
+        _book(3, title=""),
+        _book(4, isbn=_book(1)["isbn"]),
+        "not a book",
+        _book(5, total_copies="2"),
+    ])
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4, 5]
+    assert [r["success"] for r in results] == [True, False, False, False, False, False]
+    assert results[0]["message"] == 'Book "Bulk 1" has been successfully added to the catalog.'
+    assert results[1]["message"] == "A book with this ISBN already exists."
+    assert results[2]["message"] == "Title is required."
+    assert results[3]["message"] == "A book with this ISBN already exists."
+    assert results[5]["message"] == "Total copies must be a positive integer."
+    assert get_book_by_isbn(_book(1)["isbn"])["available_copies"] == 2
+
+def test_boolean_copies_rejected(client):
+    """JSON true is an int to Python; it must not slip in as one copy."""
+    results = add_books_to_catalog([_book(1, total_copies=True)])
+    assert results[0]["message"] == "Total copies must be a positive integer."
+    response = client.post("/api/books/bulk", json=[_book(2, total_copies=True)])
+    assert response.get_json()["rejected"] == 1
+    assert len(get_all_books()) == 1
+
+def test_duplicate_check_uses_one_query_per_chunk(mocker):
+    """Catalog duplicates come from batched IN lookups, never per-book get_book_by_isbn."""
+    spy = mocker.patch("services.library_service.get_book_by_isbn")
+    results = add_books_to_catalog([_book(i) for i in range(50)])
+    assert all(r["success"] for r in results)
+    spy.assert_not_called()
+    assert len(get_all_books()) == 51
+
+def test_database_error_rolls_back_whole_batch(mocker):
+    mocker.patch("services.library_service.insert_books_many", side_effect=RuntimeError("disk full"))
+    results = add_books_to_catalog([_book(1), _book(2)])
+    assert not any(r["success"] for r in results)
+    assert results[0]["message"] == "Database error occurred while adding the book."
+    assert len(get_all_books()) == 1
+
+def test_bulk_endpoint(client):
+    response = client.post("/api/books/bulk", json=[_book(1), _book(2, isbn="123")])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["added"] == 1 and data["rejected"] == 1
+    assert data["results"][1]["message"] == "ISBN must be exactly 13 digits."
+
+@pytest.mark.parametrize("body", [None, {}, []])
+def test_bulk_endpoint_rejects_non_array(client, body):
+    response = client.post("/api/books/bulk", json=body)
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from app import create_app
+from database import get_all_books, get_book_by_isbn, insert_book
+from services.import_service import import_books, read_book_records
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with one existing book."""
+    insert_book("Existing", "Author", "9990000000000", 1, 1)
+
+def _write_csv(path, rows, encoding="utf-8"):
+    lines = ["title,author,isbn,total_copies"] + [",".join(map(str, r)) for r in rows]
+    path.write_text("\n".join(lines) + "\n", encoding=encoding)
+    return str(path)
+
+def test_import_csv_inserts_all_valid_rows(tmp_path):
+    path = _write_csv(tmp_path / "feed.csv", [(f"Book {i}", "Vendor", f"99900000001{i:02d}", 3) for i in range(25)])
+    result = import_books(read_book_records(path), batch_size=7)
+    assert result == {'inserted': 25, 'rejected': []}
+    book = get_book_by_isbn("9990000000112")
+    assert book["title"] == "Book 12" and book["available_copies"] == 3
+
+def test_import_csv_with_byte_order_mark(tmp_path):
+    """Excel's "CSV UTF-8" export starts with a BOM; the title header must still match."""
+    path = _write_csv(tmp_path / "feed.csv", [("BOM Book", "Vendor", "9990000000400", 2)], encoding="utf-8-sig")
+    assert import_books(read_book_records(path)) == {'inserted': 1, 'rejected': []}
+    assert get_book_by_isbn("9990000000400")["title"] == "BOM Book"
+
+def test_import_jsonl_rejects_bad_and_duplicate_rows(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    lines = [
+        json.dumps({"title": "New", "author": "A", "isbn": "9990000000001", "total_copies": 2}),
+        json.dumps({"title": "Dup of existing", "author": "A", "isbn": "9990000000000", "total_copies": 1}),
+        json.dumps({"title": "Dup in feed", "author": "A", "isbn": "9990000000001", "total_copies": 1}),
+        json.dumps({"title": "", "author": "A", "isbn": "9990000000002", "total_copies": 1}),
+        "{not json",
+        json.dumps({"title": "Bad copies", "author": "A", "isbn": "9990000000003", "total_copies": "x"}),
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    result = import_books(read_book_records(str(path)))
+
+    assert result['inserted'] == 1
+    assert [r['row'] for r in result['rejected']] == [2, 3, 4, 5, 6]
+    assert result['rejected'][0]['error'] == "A book with this ISBN already exists."
+    assert result['rejected'][2]['error'] == "Title is required."
+    assert len(get_all_books()) == 2
+
+def test_unsupported_extension_raises():
+    with pytest.raises(ValueError):
+        list(read_book_records("feed.xml"))
+
+def test_failed_import_rolls_back(tmp_path, mocker):
+    """The whole load is one transaction; an error mid-way leaves the catalog untouched."""
+    mocker.patch("services.import_service.insert_books_many", side_effect=[None, RuntimeError("disk full")])
+    records = [{"title": f"T{i}", "author": "A", "isbn": f"99900000002{i:02d}", "total_copies": 1} for i in range(4)]
+    with pytest.raises(RuntimeError):
+        import_books(records, batch_size=2)
+    assert len(get_all_books()) == 1
+
+def test_import_books_cli(tmp_path):
+    path = _write_csv(tmp_path / "feed.csv", [("CLI Book", "Vendor", "9990000000300", 2), ("Dup", "Vendor", "9990000000000", 1)])
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(args=["import-books", path, "--batch-size", "1"])
+    assert result.exit_code == 0
+    assert "Imported 1 book(s); rejected 1." in result.output
+    assert "row 2 (9990000000000)" in result.output
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+import database
+from database import connection_stats, insert_book, insert_borrow_record, update_borrow_record_return_date
+from services.fee_service import MAX_LATE_FEE_PAIRS, get_late_fees_for_loans
+from services.library_service import calculate_late_fee_for_book
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with three books and a few loans."""
+    for i in range(1, 4):
+        insert_book(f"Book {i}", "Author", f"250000000000{i}", 5, 5)
+    now = datetime.now()
+    for patron_id, book_id, days_ago in (("111111", 1, 3), ("111111", 2, 20), ("222222", 1, 40), ("222222", 3, 10)):
+        borrow_date = now - timedelta(days=days_ago)
+        insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+    update_borrow_record_return_date("222222", 3, now)
+
+PAIRS = [("111111", 1), ("111111", 2), ("222222", 1), ("222222", 3),
+         ("111111", 3), ("111111", 99), ("12345", 1), ("abcdef", 2)]
+
+def test_matches_single_loan_endpoint():
+    results = get_late_fees_for_loans(PAIRS)
+
+    assert list(results) == [f"{patron_id}/{book_id}" for patron_id, book_id in PAIRS]
+    for patron_id, book_id in PAIRS:
+        result = results[f"{patron_id}/{book_id}"]
+        single = calculate_late_fee_for_book(patron_id, book_id)
+        assert {key: result[key] for key in single} == single
+        assert (result["patron_id"], result["book_id"]) == (patron_id, book_id)
+
+def test_statuses_and_titles():
+    results = get_late_fees_for_loans(PAIRS)
+
+    assert results["111111/2"]["title"] == "Book 2" and results["111111/2"]["days_overdue"] == 6
+    assert results["222222/1"]["fee_amount"] == 15.0
+    assert results["222222/3"]["status"] == "No active borrow found"
+    assert results["111111/3"]["status"] == "No active borrow found"
+    assert results["111111/99"]["status"] == "Book not found" and results["111111/99"]["title"] is None
+    assert results["12345/1"]["status"] == results["abcdef/2"]["status"] == "Invalid patron ID"
+
+def test_pairs_resolved_with_one_query(mocker, monkeypatch):
+    """No per-pair lookups; pairs past IN_LIST_CHUNK go in further chunks on the same connection."""
+    monkeypatch.setattr(database, "IN_LIST_CHUNK", 2)
+    spy = mocker.patch("database.get_active_borrow_record")
+    opened = connection_stats()["opened"]
+
+    results = get_late_fees_for_loans(PAIRS[:4])
+
+    spy.assert_not_called()
+    assert connection_stats()["opened"] == opened
+    assert [r["status"] for r in results.values()] == ["ok", "ok", "ok", "No active borrow found"]
+
+def test_latest_active_record_wins():
+    insert_borrow_record("111111", 2, datetime.now(), datetime.now() + timedelta(days=14))
+    assert get_late_fees_for_loans([("111111", 2)])["111111/2"]["days_overdue"] == 0
+
+def test_bulk_endpoint(client):
+    response = client.post("/api/late_fees", json=[{"patron_id": "111111", "book_id": 2},
+                                                   {"patron_id": "111111", "book_id": 99}])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == 2
+    assert data["results"]["111111/2"]["fee_amount"] == 3.0
+    assert data["results"]["111111/99"]["status"] == "Book not found"
+
+@pytest.mark.parametrize("body", [
+    {"patron_id": "111111", "book_id": 1},
+    [],
+    [{"patron_id": "111111", "book_id": 1}] * (MAX_LATE_FEE_PAIRS + 1),
+    [["111111", 1]],
+    [{"patron_id": 111111, "book_id": 1}],
+    [{"patron_id": "111111", "book_id": "1"}],
+    [{"patron_id": "111111", "book_id": True}],
+    [{"patron_id": "111111", "book_id": 2**63}],
+    [{"patron_id": "111111", "book_id": -2**63 - 1}],
+])
+def test_bulk_endpoint_rejects_bad_requests(client, body):
+    assert client.post("/api/late_fees", json=body).status_code == 400
+
+def test_bulk_endpoint_pair_repeated_across_chunks(client):
+    """A pair on both sides of an IN_LIST_CHUNK boundary is answered once, not a KeyError."""
+    loans = [{"patron_id": "111111", "book_id": 2}]
+    loans += [{"patron_id": "111111", "book_id": 100 + i} for i in range(database.IN_LIST_CHUNK)]
+    loans += [{"patron_id": "111111", "book_id": 2}]
+    response = client.post("/api/late_fees", json=loans)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == database.IN_LIST_CHUNK + 1
+    assert data["results"]["111111/2"]["days_overdue"] == 6
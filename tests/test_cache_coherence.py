@@ -0,0 +1,68 @@
+import multiprocessing
+
+import pytest
+import database
+from database import (
+    book_cache_stats, get_book_by_id, get_db_connection, insert_book, sync_catalog_version
+)
+from services.library_service import borrow_book_by_patron
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with one three-copy book."""
+    insert_book("Shared", "Author", "2220000000001", 3, 3)
+
+def _borrow_in_worker(db_path, patron_id, book_id, results):
+    """Runs in a separate process, like another Flask worker."""
+    database.DATABASE = db_path
+    database.configure_connections(pragmas={}, pooling=True)
+    results.put(borrow_book_by_patron(patron_id, book_id))
+
+def _borrow_in_other_process(temp_db, patron_id, book_id):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    worker = ctx.Process(target=_borrow_in_worker, args=(temp_db, patron_id, book_id, results))
+    worker.start()
+    result = results.get(timeout=60)
+    worker.join(timeout=60)
+    return result
+
+def test_no_stale_read_after_borrow_in_other_process(temp_db):
+    assert get_book_by_id(1)["available_copies"] == 3
+    assert get_book_by_id(1)["available_copies"] == 3  # now cached
+
+    for expected in (2, 1):
+        success, _ = _borrow_in_other_process(temp_db, f"11111{expected}", 1)
+        assert success
+        assert get_book_by_id(1)["available_copies"] == expected
+
+def test_own_writes_keep_cache_warm():
+    """Write-through updates move the version without dropping the cache."""
+    get_book_by_id(1)
+    assert borrow_book_by_patron("123123", 1)[0]
+    before = book_cache_stats()
+    assert get_book_by_id(1)["available_copies"] == 2
+    assert book_cache_stats()["hits"] == before["hits"] + 1
+
+def test_raw_sql_write_is_detected():
+    """Writes that bypass the helpers still bump the version through triggers."""
+    version = sync_catalog_version()
+    get_book_by_id(1)
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET available_copies = 0 WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert get_book_by_id(1)["available_copies"] == 0
+    assert sync_catalog_version() > version
+
+def test_request_checks_version_once(client):
+    """Inside a request the version is read once, up front."""
+    with client.application.test_request_context():
+        client.application.preprocess_request()
+        get_book_by_id(1)
+        conn = get_db_connection()
+        conn.execute("UPDATE books SET title = 'Renamed' WHERE id = 1")
+        conn.commit()
+        conn.close()
+        assert get_book_by_id(1)["title"] == "Shared"
+    assert get_book_by_id(1)["title"] == "Renamed"
@@ -0,0 +1,58 @@
+import pytest
+from database import insert_book
+from services.library_service import _encode_cursor, get_catalog_page
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with a few duplicate titles."""
+    for i in range(7):
+        insert_book(f"Title {i % 3}", "Author", f"777777777770{i}", 1, 1)
+
+def test_pages_cover_catalog_once_in_title_order():
+    """Following next_cursor visits every book exactly once, in (title, id) order."""
+    seen, cursor = [], None
+    while True:
+        books, cursor = get_catalog_page(cursor, per_page=2)
+        seen.extend(books)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert [(b["title"], b["id"]) for b in seen] == sorted((b["title"], b["id"]) for b in seen)
+
+def test_last_page_has_no_cursor():
+    books, cursor = get_catalog_page(None, per_page=7)
+    assert len(books) == 7
+    assert cursor is None
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd", "e30"])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(ValueError):
+        get_catalog_page(cursor, per_page=2)
+
+@pytest.mark.parametrize("key", [("a", 2**70), ("a", -2**63 - 1), ("a", True)])
+def test_cursor_id_must_be_a_row_id(client, key):
+    with pytest.raises(ValueError):
+        get_catalog_page(_encode_cursor(key), per_page=2)
+    assert client.get("/api/books", query_string={"cursor": _encode_cursor(key)}).status_code == 400
+
+def test_page_size_bounds():
+    with pytest.raises(ValueError):
+        get_catalog_page(None, per_page=0)
+
+def test_api_books_returns_next_cursor(client):
+    first = client.get("/api/books?per_page=4").get_json()
+    assert first["count"] == 4 and first["next_cursor"]
+
+    second = client.get(f"/api/books?per_page=4&cursor={first['next_cursor']}").get_json()
+    ids = {b["id"] for b in first["books"]} | {b["id"] for b in second["books"]}
+    assert len(ids) == 7
+    assert second["next_cursor"] is None
+
+def test_api_books_bad_cursor(client):
+    response = client.get("/api/books?cursor=bogus")
+    assert response.status_code == 400
+
+def test_catalog_page_links_to_next_page(client):
+    html = client.get("/catalog?per_page=3").get_data(as_text=True)
+    assert "Next Page" in html
@@ -0,0 +1,107 @@
+import pytest
+import database
+from database import get_db_connection, insert_book
+from services.library_service import _encode_cursor, search_catalog
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with overlapping titles and authors."""
+    insert_book("Dune", "Frank Herbert", "1300000000001", 2, 2)
+    insert_book("Dune Messiah", "Frank Herbert", "1300000000002", 1, 0)
+    insert_book("Children of Dune", "Frank Herbert", "1300000000003", 1, 1)
+    insert_book("Dune Road", "Brian Herbert", "1300000000004", 1, 1)
+    insert_book("Emma", "Jane Austen", "1300000000005", 1, 1)
+
+def _titles(books):
+    return [b["title"] for b in books]
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def fulltext(request, mocker):
+    """Run a test with and without the FTS5 index."""
+    if not request.param:
+        mocker.patch("database.fulltext_search_available", return_value=False)
+
+def test_title_and_author_combine(fulltext):
+    books, cursor = search_catalog(title="dune", author="frank")
+    assert _titles(books) == ["Children of Dune", "Dune", "Dune Messiah"]
+    assert cursor is None
+
+def test_available_only(fulltext):
+    books, _ = search_catalog(title="dune", available_only=True)
+    assert "Dune Messiah" not in _titles(books)
+    assert all(b["available_copies"] > 0 for b in books)
+
+@pytest.mark.parametrize("sort, expected", [
+    ("title", ["Children of Dune", "Dune", "Dune Messiah", "Dune Road"]),
+    ("author", ["Dune Road", "Dune", "Dune Messiah", "Children of Dune"]),
+    ("newest", ["Dune Road", "Children of Dune", "Dune Messiah", "Dune"]),
+])
+def test_pages_follow_sort_order(sort, expected):
+    seen, cursor = [], None
+    while True:
+        books, cursor = search_catalog(title="dune", sort=sort, cursor=cursor, per_page=1)
+        seen.extend(books)
+        if cursor is None:
+            break
+    assert _titles(seen) == expected
+
+def test_cursor_from_other_sort_rejected():
+    _, cursor = search_catalog(title="dune", sort="title", per_page=1)
+    with pytest.raises(ValueError):
+        search_catalog(title="dune", sort="author", cursor=cursor)
+
+@pytest.mark.parametrize("kwargs", [{"sort": "rating"}, {"per_page": 0}, {"cursor": "bogus"}])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        search_catalog(title="dune", **kwargs)
+
+@pytest.mark.parametrize("key", [("newest", 2**70), ("newest", True), ("title", "Dune", -2**63 - 1)])
+def test_cursor_id_must_be_a_row_id(client, key):
+    sort = key[0]
+    with pytest.raises(ValueError):
+        search_catalog(title="dune", sort=sort, cursor=_encode_cursor(key))
+    response = client.get("/api/search", query_string={"title": "x", "sort": sort, "cursor": _encode_cursor(key)})
+    assert response.status_code == 400
+
+def test_like_fallback_escapes_wildcards(mocker):
+    mocker.patch("database.fulltext_search_available", return_value=False)
+    assert search_catalog(title="%")[0] == []
+
+def test_only_one_page_is_fetched(mocker):
+    """The page is sorted and limited inside SQLite, using the sort index."""
+    spy = mocker.spy(database, "_query")
+    search_catalog(available_only=True, sort="author", per_page=2)
+    sql, params = spy.call_args.args[1], spy.call_args.args[2]
+    assert params[-1] == 3
+
+    conn = get_db_connection()
+    plan = [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    conn.close()
+    assert any("idx_books_author" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+def test_combined_search_endpoint(client):
+    response = client.get("/api/search", query_string={"title": "dune", "author": "herbert",
+                                                       "available_only": "1", "limit": 2})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["count"] == 2 and data["next_cursor"]
+
+    response = client.get("/api/search", query_string={"title": "dune", "author": "herbert",
+                                                       "available_only": "1", "limit": 2,
+                                                       "cursor": data["next_cursor"]})
+    assert _titles(response.get_json()["results"]) == ["Dune Road"]
+
+def test_combined_search_endpoint_needs_a_criterion(client):
+    assert client.get("/api/search", query_string={"sort": "title"}).status_code == 400
+
+@pytest.mark.parametrize("extra", [{"sort": "title"}, {"cursor": "bogus"}])
+def test_single_search_ignores_paging_params(client, extra):
+    response = client.get("/api/search", query_string={"q": "dune messiah", **extra})
+    assert response.status_code == 200
+    assert _titles(response.get_json()["results"]) == ["Dune Messiah"]
+
+def test_q_mixed_with_combined_criteria_rejected(client):
+    response = client.get("/api/search", query_string={"q": "dune", "author": "herbert"})
+    assert response.status_code == 400
+    assert "not both" in response.get_json()["error"]
@@ -0,0 +1,81 @@
+import gc
+import sqlite3
+import threading
+
+import pytest
+from database import (
+    get_all_books, get_book_by_id, get_pooled_connection, configure_connections, connection_stats
+)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Run each test against its own database file with default pool settings."""
+
+def test_helpers_reuse_pooled_connection():
+    """Repeated helper calls on one thread should not open new connections."""
+    get_book_by_id(1)
+    opened = connection_stats()["opened"]
+    for _ in range(10):
+        get_book_by_id(1)
+    assert connection_stats()["opened"] == opened
+
+def test_each_thread_gets_its_own_connection():
+    """Pooled connections are thread-local."""
+    conns = []
+    t = threading.Thread(target=lambda: conns.append(get_pooled_connection()))
+    t.start()
+    t.join()
+    assert conns[0] is not get_pooled_connection()
+
+def test_pooling_disabled_opens_per_call():
+    """With pooling off every helper call opens its own connection."""
+    configure_connections(pooling=False)
+    opened = connection_stats()["opened"]
+    for _ in range(3):
+        get_all_books()  # get_book_by_id would be served from the book cache
+    assert connection_stats()["opened"] == opened + 3
+
+def test_configured_pragmas_are_applied():
+    """PRAGMAs passed to configure_connections are set on new connections."""
+    configure_connections(pragmas={"cache_size": -4096})
+    conn = get_pooled_connection()
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -4096
+
+def test_invalid_pragma_name_rejected():
+    """PRAGMA names are interpolated into SQL, so they must be plain identifiers."""
+    with pytest.raises(ValueError):
+        configure_connections(pragmas={"cache_size; DROP TABLE books": 1})
+
+def test_production_profile_enables_wal():
+    """The production profile switches the database to WAL with relaxed syncs."""
+    configure_connections(profile="production")
+    conn = get_pooled_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+def test_explicit_pragmas_override_profile():
+    """Values passed alongside a profile take precedence over the profile's."""
+    configure_connections(profile="production", pragmas={"busy_timeout": 250})
+    conn = get_pooled_connection()
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 250
+
+def test_unknown_profile_rejected():
+    with pytest.raises(ValueError):
+        configure_connections(profile="turbo")
+
+def test_short_lived_threads_do_not_leak_connections():
+    """A thread's pooled connection is closed when the thread ends (one thread per request)."""
+    conns = []
+    def request():
+        conn = get_pooled_connection()
+        conn.execute("SELECT 1")
+        conns.append(conn)
+    for _ in range(50):
+        t = threading.Thread(target=request)
+        t.start()
+        t.join()
+    gc.collect()
+    assert connection_stats()["pooled"] <= 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[0].execute("SELECT 1")
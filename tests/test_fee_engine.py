@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from database import insert_book, insert_borrow_record, update_borrow_record_return_date
+from services.fee_policy import get_fee_schedule
+from services.fee_service import epoch_day, get_overdue_report, load_active_loans
+from services.library_service import _compute_late_fee
+
+NOW = datetime(2024, 3, 20, 15, 30)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with three books and no loans."""
+    for i in range(1, 4):
+        insert_book(f"Book {i}", "Author", f"210000000000{i}", 5, 5)
+
+def _borrow(patron_id, book_id, days_ago):
+    borrow_date = NOW - timedelta(days=days_ago)
+    insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+
+def test_matches_compute_late_fee_for_every_day_count():
+    """Batch fees equal the per-loan reference, across tiers, the cap and times of day."""
+    borrow_dates = [NOW - timedelta(days=days, hours=hours)
+                    for days in range(-3, 80) for hours in (0, 7, 16, 23)]
+    schedule = get_fee_schedule()
+    codes = np.full(len(borrow_dates), schedule.code(None), dtype=np.int16)
+    due_days = np.array([epoch_day(borrow_date + timedelta(days=14)) for borrow_date in borrow_dates])
+    cents, days_overdue = schedule.fee_cents(codes, due_days, epoch_day(NOW))
+    expected = [_compute_late_fee(borrow_date, NOW) for borrow_date in borrow_dates]
+    assert (cents / 100).tolist() == [fee for fee, _ in expected]
+    assert days_overdue.tolist() == [days for _, days in expected]
+
+def test_load_active_loans_skips_returned():
+    _borrow("111111", 1, 20)
+    _borrow("222222", 2, 3)
+    update_borrow_record_return_date("222222", 2, NOW)
+    loans = load_active_loans()
+    assert loans["patron_id"].tolist() == ["111111"]
+    assert loans["book_id"].tolist() == [1]
+
+def test_empty_catalog_report():
+    report = get_overdue_report(NOW)
+    assert report["active_loans"] == 0 and report["overdue_loans"] == 0
+    assert report["total_late_fees"] == 0.0 and report["loans"] == []
+
+def test_report_totals_and_order():
+    _borrow("111111", 1, 16)   # 2 days overdue: $1.00
+    _borrow("222222", 2, 40)   # 26 days overdue: capped $15.00
+    _borrow("333333", 3, 25)   # 11 days overdue: $7.50
+    _borrow("444444", 1, 5)    # not due yet
+
+    report = get_overdue_report(NOW)
+
+    assert report["as_of"] == "2024-03-20"
+    assert report["active_loans"] == 4
+    assert report["overdue_loans"] == 3
+    assert report["total_late_fees"] == 23.5
+    assert [(r["patron_id"], r["days_overdue"], r["fee_amount"]) for r in report["loans"]] == [
+        ("222222", 26, 15.0), ("333333", 11, 7.5), ("111111", 2, 1.0)
+    ]
+    assert report["loans"][0]["title"] == "Book 2"
+    assert report["loans"][0]["due_date"] == (NOW - timedelta(days=26)).strftime("%Y-%m-%d")
+
+def test_report_limit_keeps_most_overdue():
+    for i, days_ago in enumerate([15, 30, 20, 18]):
+        _borrow(f"50000{i}", 1, days_ago)
+    report = get_overdue_report(NOW, limit=2)
+    assert [r["days_overdue"] for r in report["loans"]] == [16, 6]
+    assert report["overdue_loans"] == 4
+
+def test_report_total_matches_reference_sum():
+    days_ago = np.random.default_rng(7).integers(0, 60, size=200).tolist()
+    for i, days in enumerate(days_ago):
+        _borrow(f"{100000 + i}", i % 3 + 1, days)
+    report = get_overdue_report(NOW)
+    reference = sum(_compute_late_fee(NOW - timedelta(days=days), NOW)[0] for days in days_ago)
+    assert report["total_late_fees"] == pytest.approx(reference, abs=1e-9)
+
+def test_overdue_report_endpoint(client):
+    _borrow("111111", 1, 30)
+    response = client.get("/api/reports/overdue", query_string={"limit": 5})
+    assert response.status_code == 200
+    assert response.get_json()["overdue_loans"] == 1
+    assert client.get("/api/reports/overdue", query_string={"limit": 0}).status_code == 400
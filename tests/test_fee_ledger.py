@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+
+import pytest
+import services.fee_service as fee_service
+from app import create_app
+from database import (
+    PATRON_LEDGER_FEES_SQL, get_db_connection, get_fee_ledger_state,
+    insert_book, insert_borrow_record, update_borrow_record_return_date
+)
+from services.fee_policy import DEFAULT_FEE_SCHEDULE, configure_fee_schedule
+from services.fee_service import epoch_day, patron_late_fee_total, patron_late_fees, refresh_fee_ledger
+from services.library_service import _compute_late_fee
+
+NOW = datetime(2024, 3, 20, 15, 30)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with five books and no loans."""
+    for i in range(1, 6):
+        insert_book(f"Book {i}", "Author", f"230000000000{i}", 5, 5)
+
+def _borrow(patron_id, book_id, days_ago):
+    borrow_date = NOW - timedelta(days=days_ago, hours=3)
+    insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+    return borrow_date
+
+def _ledger():
+    rows = get_db_connection().execute(
+        "SELECT patron_id, book_id, days_overdue, fee_cents FROM fee_ledger ORDER BY record_id")
+    return [tuple(row) for row in rows]
+
+def test_refresh_records_overdue_loans_only():
+    dates = {book_id: _borrow("111111", book_id, days_ago) for book_id, days_ago in ((1, 5), (2, 16), (3, 40))}
+
+    result = refresh_fee_ledger(NOW)
+
+    assert result == {"as_of": "2024-03-20", "updated": 2, "complete": True}
+    expected = [("111111", book_id, _compute_late_fee(dates[book_id], NOW)[1],
+                 round(_compute_late_fee(dates[book_id], NOW)[0] * 100)) for book_id in (2, 3)]
+    assert _ledger() == expected
+
+def test_same_day_rerun_touches_nothing():
+    _borrow("111111", 1, 20)
+    refresh_fee_ledger(NOW)
+    assert refresh_fee_ledger(NOW + timedelta(hours=2))["updated"] == 0
+
+def test_next_day_updates_day_counts():
+    _borrow("111111", 1, 20)
+    _borrow("111111", 2, 14)   # due today, overdue tomorrow
+    refresh_fee_ledger(NOW)
+    assert _ledger() == [("111111", 1, 6, 300)]
+
+    result = refresh_fee_ledger(NOW + timedelta(days=1))
+    assert result["updated"] == 2
+    assert _ledger() == [("111111", 1, 7, 350), ("111111", 2, 1, 50)]
+
+def test_bounded_run_resumes_from_cursor():
+    for book_id in range(1, 6):
+        _borrow(f"{100000 + book_id}", book_id, 15 + book_id)
+
+    first = refresh_fee_ledger(NOW, time_budget=0, batch_size=2)
+    assert first == {"as_of": "2024-03-20", "updated": 2, "complete": False}
+    assert get_fee_ledger_state()[3] is None
+
+    second = refresh_fee_ledger(NOW, time_budget=0, batch_size=2)
+    third = refresh_fee_ledger(NOW, time_budget=0, batch_size=2)
+    assert second["updated"] == 2 and third["updated"] == 1 and third["complete"]
+    assert len(_ledger()) == 5
+    assert get_fee_ledger_state()[3] == epoch_day(NOW)
+
+def test_returned_loan_leaves_ledger():
+    _borrow("111111", 1, 30)
+    refresh_fee_ledger(NOW)
+    update_borrow_record_return_date("111111", 1, NOW)
+    assert _ledger() == []
+
+def test_backdated_loan_restarts_refresh():
+    _borrow("111111", 1, 30)
+    refresh_fee_ledger(NOW)
+    _borrow("111111", 2, 25)
+    assert get_fee_ledger_state()[3] is None
+    # Until the next refresh, totals come from the loans themselves
+    assert patron_late_fee_total("111111", NOW) == 12.5 + 7.5
+
+    refresh_fee_ledger(NOW)
+    assert [row[1] for row in _ledger()] == [1, 2]
+
+def test_new_loan_today_keeps_ledger_current():
+    refresh_fee_ledger(NOW)
+    insert_borrow_record("222222", 1, NOW + timedelta(minutes=1), NOW + timedelta(days=14))
+    assert get_fee_ledger_state()[3] == epoch_day(NOW)
+
+def test_patron_total_reads_ledger_when_current(mocker):
+    _borrow("111111", 1, 30)
+    _borrow("111111", 2, 17)
+    _borrow("222222", 3, 30)
+    live = patron_late_fees("111111", NOW)[2]
+    refresh_fee_ledger(NOW)
+
+    spy = mocker.spy(fee_service, "patron_late_fees")
+    assert patron_late_fee_total("111111", NOW) == live == 12.5 + 1.5
+    spy.assert_not_called()
+    # A later day the ledger has not been refreshed for falls back to the loans
+    assert patron_late_fee_total("111111", NOW + timedelta(days=1)) == 13.5 + 2.0
+
+def test_refresh_for_another_day_stops_serving_totals():
+    """A run for an earlier day rewrites rows; until a run completes, totals come from the loans."""
+    _borrow("111111", 1, 30)
+    _borrow("111111", 2, 20)
+    refresh_fee_ledger(NOW)
+    live = patron_late_fees("111111", NOW)[2]
+
+    refresh_fee_ledger(NOW - timedelta(days=3), time_budget=0, batch_size=1)
+
+    assert get_fee_ledger_state()[3] is None
+    assert patron_late_fee_total("111111", NOW) == live
+    assert patron_late_fee_total("111111", NOW - timedelta(days=3)) == patron_late_fees("111111", NOW - timedelta(days=3))[2]
+
+def test_ledger_ignores_rows_of_another_day():
+    _borrow("111111", 1, 30)
+    _borrow("111111", 2, 20)
+    refresh_fee_ledger(NOW)
+    conn = get_db_connection()
+    conn.execute("UPDATE fee_ledger SET as_of_day = as_of_day - 1 WHERE book_id = 2")
+    conn.commit()
+    conn.close()
+    assert patron_late_fee_total("111111", NOW) == patron_late_fees("111111", NOW)[2] - 3.0
+
+def test_ledger_total_is_an_index_lookup():
+    plan = [row["detail"] for row in get_db_connection().execute(
+        "EXPLAIN QUERY PLAN " + PATRON_LEDGER_FEES_SQL, ("111111", epoch_day(NOW)))]
+    assert any("USING COVERING INDEX idx_fee_ledger_patron" in step for step in plan), plan
+
+def test_refresh_command():
+    _borrow("111111", 1, 30)
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(args=["refresh-fee-ledger", "--as-of", "2024-03-20", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    assert "Fee ledger as of 2024-03-20: 1 loan(s) updated (complete)." in result.output
+
+def test_ledger_not_served_under_another_fee_schedule():
+    _borrow("111111", 1, 20)
+    refresh_fee_ledger(NOW)
+    assert patron_late_fee_total("111111", NOW) == 3.0
+    try:
+        configure_fee_schedule({"book": {"loan_days": 14, "tiers": [{"days": None, "cents_per_day": 500}]}})
+        assert patron_late_fee_total("111111", NOW) == patron_late_fees("111111", NOW)[2] == 30.0
+
+        assert refresh_fee_ledger(NOW)["updated"] == 1
+        assert _ledger() == [("111111", 1, 6, 3000)]
+        assert patron_late_fee_total("111111", NOW) == 30.0
+    finally:
+        configure_fee_schedule(DEFAULT_FEE_SCHEDULE)
+    assert patron_late_fee_total("111111", NOW) == 3.0
+
+def test_material_type_change_restarts_refresh():
+    _borrow("111111", 1, 20)
+    refresh_fee_ledger(NOW)
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET material_type = 'dvd' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert get_fee_ledger_state()[3] is None
+    assert refresh_fee_ledger(NOW)["complete"]
@@ -0,0 +1,166 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from app import create_app
+from database import (
+    get_active_borrow_record, get_book_by_id, get_db_connection, get_pooled_connection, get_patron_borrowed_books,
+    insert_book, insert_borrow_record
+)
+from services.fee_policy import (
+    DEFAULT_FEE_SCHEDULE, FeePolicy, FeeSchedule, configure_fee_schedule, get_fee_schedule
+)
+from services.fee_service import get_overdue_report, patron_late_fees, refresh_fee_ledger
+from services.library_service import (
+    _compute_late_fee, _loan_late_fee, borrow_book_by_patron, calculate_late_fee_for_book, return_book_by_patron
+)
+
+NOW = datetime(2024, 3, 20, 15, 30)
+
+DVD_SCHEDULE = {
+    **DEFAULT_FEE_SCHEDULE,
+    "dvd": {"loan_days": 7, "grace_days": 2, "tiers": [{"days": None, "cents_per_day": 100}], "max_cents": 1000},
+}
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file; the default fee schedule is restored afterwards."""
+    insert_book("Book", "Author", "2400000000001", 5, 5)
+    insert_book("Film", "Director", "2400000000002", 5, 5)
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET material_type = 'dvd' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    yield
+    configure_fee_schedule(DEFAULT_FEE_SCHEDULE)
+
+def _r5_fee(days_overdue):
+    """Today's R5 rules, written out independently of the policy engine."""
+    fee = min(days_overdue, 7) * 0.50 + max(days_overdue - 7, 0) * 1.00
+    return round(min(fee, 15.00), 2)
+
+def test_default_policy_reproduces_r5():
+    policy = get_fee_schedule().policy("book")
+    assert policy.loan_days == 14
+    assert [policy.fee_cents(days) / 100 for days in range(400)] == [_r5_fee(days) for days in range(400)]
+    assert len(policy.table) == 20  # capped at 19 days overdue; everything later is the last entry
+
+def test_default_policy_reproduces_compute_late_fee():
+    rng = random.Random(3)
+    for _ in range(500):
+        borrow_date = NOW - timedelta(days=rng.randrange(-5, 120), seconds=rng.randrange(86400))
+        due_date = borrow_date + timedelta(days=get_fee_schedule().policy("book").loan_days)
+        assert _loan_late_fee(due_date, NOW, "book") == _compute_late_fee(borrow_date, NOW)
+
+def test_grace_days_and_uncapped_tail():
+    policy = FeePolicy(loan_days=7, grace_days=2, tiers=[{"days": 3, "cents_per_day": 25},
+                                                         {"days": None, "cents_per_day": 40}])
+    assert [policy.fee_cents(days) for days in range(8)] == [0, 0, 0, 25, 50, 75, 115, 155]
+    assert policy.fee_cents(1000) == 75 + (1000 - 5) * 40
+
+def test_bounded_tiers_stop_accruing():
+    policy = FeePolicy(loan_days=14, tiers=[{"days": 2, "cents_per_day": 100}])
+    assert [policy.fee_cents(days) for days in (1, 2, 3, 50)] == [100, 200, 200, 200]
+
+@pytest.mark.parametrize("spec", [
+    {"dvd": DVD_SCHEDULE["dvd"]},
+    {"book": {"loan_days": -1}},
+    {"book": {"loan_days": 14, "tiers": [{"days": None, "cents_per_day": 50}, {"days": 3, "cents_per_day": 10}]}},
+    {"book": {"loan_days": 14, "tiers": [{"days": 0, "cents_per_day": 50}]}},
+    {"book": {"loan_days": 14, "max_cents": "15"}},
+    {"book": {"loan_days": 14, "fine": 1}},
+])
+def test_invalid_schedules_rejected(spec):
+    with pytest.raises(ValueError):
+        configure_fee_schedule(spec)
+
+def test_batch_lookup_matches_per_loan_lookup():
+    schedule = FeeSchedule(DVD_SCHEDULE)
+    rng = np.random.default_rng(5)
+    codes = rng.integers(0, 2, size=2000).astype(np.int16)
+    due_days = rng.integers(19700, 19830, size=2000)
+    cents, days_overdue = schedule.fee_cents(codes, due_days, 19800)
+    for code, due_day, fee, days in zip(codes, due_days, cents, days_overdue):
+        assert days == max(19800 - due_day, 0)
+        assert fee == schedule.policy(schedule.material_types[code]).fee_cents(int(days))
+
+def test_unknown_material_type_uses_default_policy():
+    schedule = get_fee_schedule()
+    assert schedule.policy("microfiche") is schedule.policy("book")
+
+def test_material_type_policy_applies_everywhere():
+    configure_fee_schedule(DVD_SCHEDULE)
+    borrow_date = NOW - timedelta(days=12)    # dvd: 5 days overdue, 3 past grace
+    insert_borrow_record("111111", 2, borrow_date, borrow_date + timedelta(days=7))
+    insert_borrow_record("111111", 1, borrow_date, borrow_date + timedelta(days=14))
+
+    assert _loan_late_fee(borrow_date + timedelta(days=7), NOW, "dvd") == (3.0, 5)
+    assert patron_late_fees("111111", NOW) == (2, 1, 3.0)
+    report = get_overdue_report(NOW)
+    assert [(r["book_id"], r["fee_amount"], r["due_date"]) for r in report["loans"]] == [
+        (2, 3.0, (borrow_date + timedelta(days=7)).strftime("%Y-%m-%d"))
+    ]
+    refresh_fee_ledger(NOW)
+    rows = get_db_connection().execute("SELECT record_id, days_overdue, fee_cents FROM fee_ledger").fetchall()
+    assert [tuple(row) for row in rows] == [(1, 5, 300)]
+
+def test_loan_period_comes_from_policy():
+    configure_fee_schedule(DVD_SCHEDULE)
+    assert borrow_book_by_patron("222222", 2)[0]
+    record = get_active_borrow_record("222222", 2)
+    assert (record["due_date"] - record["borrow_date"]).days == 7
+    assert calculate_late_fee_for_book("222222", 2) == {"fee_amount": 0.0, "days_overdue": 0, "status": "ok"}
+
+def test_app_loads_schedule_file(tmp_path, monkeypatch):
+    path = tmp_path / "fees.json"
+    path.write_text(json.dumps(DVD_SCHEDULE))
+    monkeypatch.setenv("FEE_SCHEDULE_FILE", str(path))
+    app = create_app()
+    assert app.config["FEE_SCHEDULE"] == DVD_SCHEDULE
+    assert get_fee_schedule().policy("dvd").loan_days == 7
+
+def test_sql_total_matches_per_loan_fees():
+    """The SQL aggregate over the stored tables equals pricing each loan, unknown types included."""
+    configure_fee_schedule(DVD_SCHEDULE)
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET material_type = 'microfiche' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    rng = random.Random(11)
+    for days_ago in rng.sample(range(0, 80), 10):
+        borrow_date = NOW - timedelta(days=days_ago)
+        insert_borrow_record("111111", 1 + days_ago % 2, borrow_date, borrow_date + timedelta(days=7 + days_ago % 3))
+        conn = get_db_connection()
+        loans = conn.execute("SELECT b.material_type, br.due_date FROM borrow_records br "
+                             "JOIN books b ON b.id = br.book_id").fetchall()
+        conn.close()
+        fees = [_loan_late_fee(datetime.fromisoformat(due), NOW, material_type) for material_type, due in loans]
+        assert patron_late_fees("111111", NOW) == (
+            len(fees), sum(1 for _, days in fees if days), pytest.approx(sum(fee for fee, _ in fees), abs=1e-9))
+
+def test_fees_follow_stored_due_date_after_schedule_change():
+    borrow_date = NOW - timedelta(days=10)
+    insert_borrow_record("111111", 1, borrow_date, borrow_date + timedelta(days=7))   # 3 days overdue
+    configure_fee_schedule(DVD_SCHEDULE)   # books keep their 14-day loan period
+
+    assert patron_late_fees("111111", NOW) == (1, 1, 1.5)
+    assert get_overdue_report(NOW)["loans"][0]["days_overdue"] == 3
+    assert get_patron_borrowed_books("111111")[0]["is_overdue"]
+    fee = calculate_late_fee_for_book("111111", 1)
+    assert fee["days_overdue"] >= 3 and fee["fee_amount"] > 0
+
+def test_borrow_and_fee_paths_read_material_type_from_cached_book():
+    """The material type rides on the cached Book: no extra SELECT from books per call."""
+    configure_fee_schedule(DVD_SCHEDULE)
+    assert get_book_by_id(2).material_type == "dvd"
+    statements = []
+    get_pooled_connection().set_trace_callback(statements.append)
+    try:
+        assert borrow_book_by_patron("222222", 2)[0]
+        calculate_late_fee_for_book("222222", 2)
+        assert return_book_by_patron("222222", 2)[0]
+    finally:
+        get_pooled_connection().set_trace_callback(None)
+    assert not [sql for sql in statements if sql.lstrip().startswith("SELECT") and "FROM books" in sql]
@@ -0,0 +1,47 @@
+import pytest
+from database import get_db_connection
+from services.library_service import add_book_to_catalog, search_books_in_catalog
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file."""
+    add_book_to_catalog("Harry Potter and the Chamber of Secrets", "J.K. Rowling", "4444444444441", 2)
+    add_book_to_catalog("Harry Potter", "J.K. Rowling", "4444444444442", 2)
+    add_book_to_catalog("Dirty Harry Returns", "Some Writer", "4444444444443", 2)
+    add_book_to_catalog("Potions for Beginners", "Harriet Vane", "4444444444444", 2)
+
+def test_prefix_query_matches_word_starts():
+    """Each query word matches as a prefix of a word in the field."""
+    results = search_books_in_catalog("harr pot", "title")
+    assert {r["isbn"] for r in results} == {"4444444444441", "4444444444442"}
+
+def test_results_ranked_by_relevance():
+    """The tighter (shorter) title match ranks first."""
+    results = search_books_in_catalog("harry potter", "title")
+    assert results[0]["title"] == "Harry Potter"
+
+def test_author_search_only_matches_author_column():
+    results = search_books_in_catalog("harr", "author")
+    assert [r["author"] for r in results] == ["Harriet Vane"]
+
+def test_result_limit():
+    assert len(search_books_in_catalog("harry", "title", limit=1)) == 1
+
+def test_index_follows_title_updates():
+    """Triggers keep books_fts in sync with direct changes to books."""
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET title = 'Goblet of Fire' WHERE isbn = '4444444444442'")
+    conn.commit()
+    conn.close()
+
+    assert [r["isbn"] for r in search_books_in_catalog("goblet", "title")] == ["4444444444442"]
+    assert "4444444444442" not in {r["isbn"] for r in search_books_in_catalog("potter", "title")}
+
+def test_punctuation_only_query_returns_nothing():
+    assert search_books_in_catalog('"*', "title") == []
+
+def test_substring_fallback_without_fts5(mocker):
+    """Without FTS5 the original case-insensitive substring semantics apply."""
+    mocker.patch("services.library_service.fulltext_search_available", return_value=False)
+    results = search_books_in_catalog("otter", "title")
+    assert {r["isbn"] for r in results} == {"4444444444441", "4444444444442"}
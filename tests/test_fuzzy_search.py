@@ -0,0 +1,58 @@
+import pytest
+from database import configure_connections
+from services.library_service import add_book_to_catalog, search_books_in_catalog
+from services.search_service import TrigramIndex
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with a few well-known books."""
+    add_book_to_catalog("The Hobbit", "J.R.R. Tolkien", "1000000000001", 2)
+    add_book_to_catalog("The Fellowship of the Ring", "J.R.R. Tolkien", "1000000000002", 1)
+    add_book_to_catalog("Dune", "Frank Herbert", "1000000000003", 1)
+    add_book_to_catalog("One Hundred Years of Solitude", "Gabriel Marquez", "1000000000004", 1)
+
+def _titles(query, limit=50):
+    return [b["title"] for b in search_books_in_catalog(query, "fuzzy", limit)]
+
+def test_misspelled_author_is_found():
+    assert set(_titles("tolkein")) == {"The Hobbit", "The Fellowship of the Ring"}
+
+def test_misspelled_title_words_rank_best_match_first():
+    assert _titles("felowship ring")[0] == "The Fellowship of the Ring"
+    assert _titles("hobit")[0] == "The Hobbit"
+
+def test_title_and_author_words_combine():
+    assert _titles("marqez solitude") == ["One Hundred Years of Solitude"]
+
+def test_no_similar_words_returns_nothing():
+    assert _titles("xyzzy") == []
+
+def test_limit_is_respected():
+    assert len(_titles("tolkien", limit=1)) == 1
+
+def test_new_books_are_indexed_incrementally():
+    assert _titles("herbrt") == ["Dune"]
+    add_book_to_catalog("Dune Messiah", "Frank Herbert", "1000000000005", 1)
+    assert set(_titles("herbrt")) == {"Dune", "Dune Messiah"}
+
+def test_index_rebuilt_for_new_database(tmp_path, monkeypatch):
+    """Repointing DATABASE must not serve books from the old file."""
+    assert _titles("dune") == ["Dune"]
+    import database
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "other.db"))
+    configure_connections(pragmas={}, pooling=True)
+    database.init_database()
+    assert _titles("dune") == []
+
+def test_index_scores_similarity():
+    index = TrigramIndex()
+    index.add(1, "Colour", "A", "colour", "a")
+    index.add(2, "Color", "A", "color", "a")
+    ranked = index.search("color", limit=2)
+    assert [book_id for book_id, _ in ranked] == [2, 1]
+    assert ranked[0][1] == 1.0 and 0 < ranked[1][1] < 1.0
+
+def test_api_fuzzy_search(client):
+    response = client.get("/api/search", query_string={"q": "tolkein hobit", "type": "fuzzy"})
+    assert response.status_code == 200
+    assert response.get_json()["results"][0]["title"] == "The Hobbit"
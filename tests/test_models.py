@@ -0,0 +1,30 @@
+import json
+from datetime import datetime
+
+import pytest
+from models import Book, BorrowRecord
+
+def test_book_dict_view():
+    """Books still behave like the old row dicts for existing callers."""
+    book = Book(1, "Title", "Author", "1234567890123", 3, 2)
+
+    assert book["title"] == "Title"
+    assert book.get("isbn") == "1234567890123"
+    assert book.get("missing", "x") == "x"
+    assert "available_copies" in book
+    assert dict(book) == {"id": 1, "title": "Title", "author": "Author",
+                          "isbn": "1234567890123", "total_copies": 3, "available_copies": 2,
+                          "material_type": "book"}
+    with pytest.raises(KeyError):
+        book["to_dict"]
+
+def test_records_have_no_instance_dict():
+    """__slots__ keeps each record free of a per-instance __dict__."""
+    record = BorrowRecord(1, datetime(2025, 1, 1), datetime(2025, 1, 15))
+    assert not hasattr(record, "__dict__")
+    assert record.to_dict()["return_date"] is None
+
+def test_book_is_json_serializable(client):
+    """jsonify handles Book records (Flask serializes dataclasses)."""
+    payload = json.loads(client.get("/api/books").get_data(as_text=True))
+    assert {"id", "title", "author", "isbn", "total_copies", "available_copies"} <= set(payload["books"][0])
@@ -0,0 +1,64 @@
+import re
+
+import pytest
+import database
+from database import get_db_connection, init_database, migrate, MIGRATIONS
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own freshly migrated database file."""
+
+def _plan(sql):
+    conn = get_db_connection()
+    names = re.findall(r":(\w+)", sql)
+    params = {name: "000000" for name in names} if names else ("000000",) * sql.count("?")
+    details = [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    conn.close()
+    return details
+
+@pytest.mark.parametrize("sql_name", [
+    "PATRON_BORROWED_BOOKS_SQL",
+    "PATRON_BORROW_COUNT_SQL",
+    "ACTIVE_BORROW_RECORD_SQL",
+    "PATRON_BORROW_HISTORY_SQL",
+    "PATRON_LATE_FEES_SQL",
+])
+def test_hot_borrow_queries_use_an_index(sql_name):
+    """Hot borrow_records queries must not fall back to a full table scan or sort."""
+    plan = _plan(getattr(database, sql_name))
+
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+    assert any("USING INDEX idx_borrow_records" in step for step in plan), plan
+
+def test_migrations_set_user_version():
+    """user_version records the number of applied migrations."""
+    conn = get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    conn.close()
+
+def test_migrate_is_idempotent():
+    """Running init_database again must not re-apply migrations."""
+    init_database()
+    conn = get_db_connection()
+    assert migrate(conn) == len(MIGRATIONS)
+    conn.close()
+
+def test_unversioned_database_is_upgraded(tmp_path, monkeypatch):
+    """A database created before migrations existed gets the new indexes."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "old.db"))
+    conn = get_db_connection()
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                 "author TEXT NOT NULL, isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, "
+                 "available_copies INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE borrow_records (id INTEGER PRIMARY KEY AUTOINCREMENT, patron_id TEXT NOT NULL, "
+                 "book_id INTEGER NOT NULL, borrow_date TEXT NOT NULL, due_date TEXT NOT NULL, return_date TEXT)")
+    conn.commit()
+    conn.close()
+
+    init_database()
+
+    conn = get_db_connection()
+    indexes = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert "idx_borrow_records_active" in indexes
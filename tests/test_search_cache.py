@@ -0,0 +1,71 @@
+import pytest
+from database import get_db_connection
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, configure_search_cache,
+    search_books_in_catalog, search_cache_stats, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file and an empty search cache."""
+    add_book_to_catalog("Dune", "Frank Herbert", "1110000000001", 2)
+    add_book_to_catalog("Dune Messiah", "Frank Herbert", "1110000000002", 1)
+    yield
+    configure_search_cache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+def _counts():
+    stats = search_cache_stats()
+    return stats["hits"], stats["misses"]
+
+def test_repeated_search_is_served_from_cache():
+    first = search_books_in_catalog("dune", "title")
+    hits, misses = _counts()
+    assert search_books_in_catalog("  DUNE ", "title") == first
+    assert _counts() == (hits + 1, misses)
+    assert search_cache_stats()["hit_rate"] > 0
+
+def test_type_and_limit_are_part_of_the_key():
+    search_books_in_catalog("herbert", "author")
+    hits, _ = _counts()
+    search_books_in_catalog("herbert", "title")
+    search_books_in_catalog("herbert", "author", limit=1)
+    assert _counts()[0] == hits
+
+def test_catalog_write_invalidates():
+    assert len(search_books_in_catalog("dune", "title")) == 2
+    add_book_to_catalog("Dune Chronicles", "Frank Herbert", "1110000000003", 1)
+    assert len(search_books_in_catalog("dune", "title")) == 3
+
+def test_borrow_refreshes_availability():
+    search_books_in_catalog("messiah", "title")
+    assert borrow_book_by_patron("123456", 2)[0]
+    assert search_books_in_catalog("messiah", "title")[0]["available_copies"] == 0
+
+def test_raw_sql_write_invalidates():
+    search_books_in_catalog("dune", "title")
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET title = 'Arrakis' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    assert [b["title"] for b in search_books_in_catalog("dune", "title")] == ["Dune"]
+
+def test_cached_results_are_independent_copies():
+    search_books_in_catalog("dune", "title")[0].title = "Mutated"
+    assert "Mutated" not in {b["title"] for b in search_books_in_catalog("dune", "title")}
+
+def test_capacity_bounds_cache_and_counts_evictions():
+    configure_search_cache(capacity=2)
+    for term in ("a", "b", "c", "d"):
+        search_books_in_catalog(term, "title")
+    stats = search_cache_stats()
+    assert stats["size"] == 2 and stats["evictions"] >= 2
+
+def test_expired_entries_are_recomputed(mocker):
+    configure_search_cache(ttl=10)
+    clock = mocker.patch("cache.time.monotonic", return_value=1000.0)
+    search_books_in_catalog("dune", "title")
+    clock.return_value = 1011.0
+    _, misses = _counts()
+    search_books_in_catalog("dune", "title")
+    assert _counts()[1] == misses + 1
+    assert search_cache_stats()["expirations"] >= 1
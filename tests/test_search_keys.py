@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+from database import get_db_connection, insert_book, search_key, sync_catalog_version
+from services.library_service import search_books_in_catalog, search_cache_stats, search_catalog
+from services.search_service import suggest
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with accented titles and authors."""
+    insert_book("Cien años de soledad", "Gabriel García Márquez", "1900000000001", 1, 1)
+    insert_book("Les Misérables", "Victor Hugo", "1900000000002", 1, 1)
+    insert_book("Straße der Ölsardinen", "Ｊｏｈｎ Steinbeck", "1900000000003", 1, 1)
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def fulltext(request, mocker):
+    """Run a test with and without the FTS5 index."""
+    if not request.param:
+        mocker.patch("database.fulltext_search_available", return_value=False)
+        mocker.patch("services.library_service.fulltext_search_available", return_value=False)
+
+def _titles(books):
+    return [b["title"] for b in books]
+
+@pytest.mark.parametrize("text, expected", [
+    ("García  Márquez", "garcia marquez"),
+    ("STRASSE", "strasse"),
+    ("Straße", "strasse"),
+    ("Ｊｏｈｎ", "john"),
+    ("  Les\tMisérables ", "les miserables"),
+    (None, None),
+])
+def test_search_key(text, expected):
+    assert search_key(text) == expected
+
+def test_keys_are_stored():
+    row = get_db_connection().execute(
+        "SELECT title_key, author_key FROM books WHERE isbn = '1900000000001'").fetchone()
+    assert tuple(row) == ("cien anos de soledad", "gabriel garcia marquez")
+
+def test_plain_sqlite_clients_can_write_books(temp_db, fulltext):
+    """No trigger needs search_key(); keys of rows written without them are filled at the next sync."""
+    conn = sqlite3.connect(temp_db)
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                 "VALUES ('Éclair', 'Zoë', '1900000000009', 1, 1)")
+    conn.execute("UPDATE books SET author = 'Émile Zola' WHERE isbn = '1900000000002'")
+    conn.execute("DELETE FROM books WHERE isbn = '1900000000003'")
+    conn.commit()
+    rows = conn.execute("SELECT title_key, author_key FROM books WHERE isbn IN "
+                        "('1900000000009', '1900000000002') ORDER BY isbn").fetchall()
+    assert rows == [(None, None), (None, None)]
+
+    sync_catalog_version()
+    rows = conn.execute("SELECT title_key, author_key FROM books WHERE isbn IN "
+                        "('1900000000009', '1900000000002') ORDER BY isbn").fetchall()
+    conn.close()
+    assert rows == [("les miserables", "emile zola"), ("eclair", "zoe")]
+    assert _titles(search_books_in_catalog("zola", "author")) == ["Les Misérables"]
+    assert _titles(search_books_in_catalog("eclair", "title")) == ["Éclair"]
+    assert search_books_in_catalog("steinbeck", "author") == []
+
+@pytest.mark.parametrize("term, search_type, expected", [
+    ("garcia marquez", "author", ["Cien años de soledad"]),
+    ("GARCÍA", "author", ["Cien años de soledad"]),
+    ("miserables", "title", ["Les Misérables"]),
+    ("strasse", "title", ["Straße der Ölsardinen"]),
+    ("john", "author", ["Straße der Ölsardinen"]),
+])
+def test_title_author_search_ignores_accents(fulltext, term, search_type, expected):
+    assert _titles(search_books_in_catalog(term, search_type)) == expected
+
+def test_fuzzy_search_ignores_accents():
+    assert _titles(search_books_in_catalog("garcia markez", "fuzzy"))[0] == "Cien años de soledad"
+
+def test_suggest_ignores_accents():
+    assert suggest("les mise", "title") == ["Les Misérables"]
+    assert suggest("GABRIEL GARC", "author") == ["Gabriel García Márquez"]
+
+def test_combined_search_ignores_accents(fulltext):
+    books, _ = search_catalog(title="anos", author="marquez")
+    assert _titles(books) == ["Cien años de soledad"]
+
+def test_cache_shares_equivalent_terms():
+    search_books_in_catalog("Márquez", "author")
+    hits = search_cache_stats()["hits"]
+    assert _titles(search_books_in_catalog("marquez", "author")) == ["Cien años de soledad"]
+    assert search_cache_stats()["hits"] == hits + 1
@@ -0,0 +1,57 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+import services.fee_service as fee_service
+from database import insert_book, insert_borrow_record, update_borrow_record_return_date
+from services.fee_service import patron_late_fees
+from services.library_service import _compute_late_fee, get_patron_status_report
+
+NOW = datetime(2024, 3, 20, 15, 30)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with ten books and no loans."""
+    for i in range(1, 11):
+        insert_book(f"Book {i}", "Author", f"220000000000{i - 1}", 5, 5)
+
+def test_no_loans():
+    assert patron_late_fees("111111", NOW) == (0, 0, 0.0)
+
+def test_tiers_and_cap():
+    for book_id, days_ago in enumerate((10, 15, 21, 24, 60), start=1):
+        borrow_date = NOW - timedelta(days=days_ago)
+        insert_borrow_record("111111", book_id, borrow_date, borrow_date + timedelta(days=14))
+    # 0 + 0.50 + 3.50 + 6.50 + 15.00 (capped)
+    assert patron_late_fees("111111", NOW) == (5, 4, 25.5)
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_compute_late_fee(seed):
+    """Property: the SQL total equals summing _compute_late_fee over the same active loans."""
+    rng = random.Random(seed)
+    as_of = NOW + timedelta(days=rng.randrange(-30, 30), minutes=rng.randrange(24 * 60))
+    expected = {}
+    for patron_id in ("111111", "222222"):
+        borrow_dates = []
+        for book_id in rng.sample(range(1, 11), rng.randrange(0, 10)):
+            borrow_date = as_of - timedelta(days=rng.randrange(-5, 90), seconds=rng.randrange(86400),
+                                            microseconds=rng.randrange(10 ** 6))
+            insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+            if rng.random() < 0.2:
+                update_borrow_record_return_date(patron_id, book_id, as_of)
+            else:
+                borrow_dates.append(borrow_date)
+        fees = [_compute_late_fee(borrow_date, as_of) for borrow_date in borrow_dates]
+        expected[patron_id] = (len(fees), sum(1 for _, days in fees if days),
+                               round(sum(fee for fee, _ in fees), 2))
+
+    for patron_id, (active, overdue, total) in expected.items():
+        assert patron_late_fees(patron_id, as_of) == (active, overdue, pytest.approx(total, abs=1e-9))
+
+def test_status_report_uses_sql_total(mocker):
+    borrow_date = NOW - timedelta(days=30)
+    insert_borrow_record("111111", 1, borrow_date, borrow_date + timedelta(days=14))
+    spy = mocker.spy(fee_service, "patron_late_fees")
+    report = get_patron_status_report("111111")
+    spy.assert_called_once()
+    assert report["total_late_fees"] == 15.0
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+import pytest
+from database import (
+    get_all_books, get_patron_borrow_history, insert_book, insert_borrow_record,
+    iter_all_books, iter_patron_borrow_history, iter_patron_borrowed_books,
+    get_patron_borrowed_books
+)
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with five books and loans."""
+    now = datetime.now()
+    for i in range(5):
+        insert_book(f"Stream {i}", "Author", f"888888888880{i}", 2, 2)
+        insert_borrow_record("246810", i + 1, now - timedelta(days=i), now + timedelta(days=14 - i))
+
+def test_iter_all_books_matches_list_across_batches():
+    """Batch boundaries must not drop or duplicate rows."""
+    assert list(iter_all_books(batch_size=2)) == get_all_books()
+
+def test_iter_history_matches_list():
+    assert list(iter_patron_borrow_history("246810", batch_size=3)) == get_patron_borrow_history("246810")
+
+def test_iter_borrowed_books_matches_list():
+    assert list(iter_patron_borrowed_books("246810", batch_size=1)) == get_patron_borrowed_books("246810")
+
+def test_iterators_are_lazy():
+    """Abandoning a generator early is fine and leaves the connection usable."""
+    books = iter_all_books(batch_size=1)
+    assert next(books)["title"] == "Stream 0"
+    books.close()
+    assert len(get_all_books()) == 5
@@ -0,0 +1,48 @@
+import pytest
+from services.library_service import add_book_to_catalog
+from services.search_service import PrefixIndex, suggest
+
+@pytest.fixture(autouse=True)
+def setup_test_db(temp_db):
+    """Each test gets its own database file with a few titles."""
+    add_book_to_catalog("The Hobbit", "J.R.R. Tolkien", "1200000000001", 1)
+    add_book_to_catalog("Hamlet", "William Shakespeare", "1200000000002", 1)
+    add_book_to_catalog("Harry Potter", "J.K. Rowling", "1200000000003", 1)
+    add_book_to_catalog("Harry Potter", "J.K. Rowling", "1200000000004", 1)
+
+def test_title_prefix_is_case_insensitive_and_sorted():
+    assert suggest("HA") == ["Hamlet", "Harry Potter"]
+
+def test_leading_article_is_optional():
+    assert suggest("hob") == ["The Hobbit"]
+    assert suggest("the h") == ["The Hobbit"]
+
+def test_author_suggestions():
+    assert suggest("j.", "author") == ["J.K. Rowling", "J.R.R. Tolkien"]
+
+def test_limit():
+    assert suggest("h", limit=1) == ["Hamlet"]
+
+def test_new_titles_are_added_incrementally():
+    assert suggest("dun") == []
+    add_book_to_catalog("Dune", "Frank Herbert", "1200000000005", 1)
+    assert suggest("dun") == ["Dune"]
+
+def test_unknown_type_rejected():
+    with pytest.raises(ValueError):
+        suggest("h", "isbn")
+
+def test_index_deduplicates_entries():
+    index = PrefixIndex()
+    index.add(1, "Emma", "Jane Austen", "emma", "jane austen")
+    index.add(2, "Emma", "Jane Austen", "emma", "jane austen")
+    assert index.complete("em", "title", 10) == ["Emma"]
+
+def test_suggest_endpoint(client):
+    response = client.get("/api/suggest", query_string={"q": "har", "type": "title"})
+    assert response.status_code == 200
+    assert response.get_json()["suggestions"] == ["Harry Potter"]
+
+@pytest.mark.parametrize("params", [{"q": "h", "type": "isbn"}, {"q": "h", "limit": 0}, {"q": "h", "limit": 500}])
+def test_suggest_endpoint_rejects_bad_params(client, params):
+    assert client.get("/api/suggest", query_string=params).status_code == 400